@@ -0,0 +1,121 @@
+"""
+Execução de Código Bloqueante fora do Event Loop
+Pool limitado de threads para chamadas MT5, SQLite e arquivos feitas pela API,
+com limite de concorrência e timeout por endpoint
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+class BlockingExecutor:
+    """
+    Despacha funções bloqueantes para um pool dedicado
+
+    - Cada endpoint tem (limite de execuções simultâneas, timeout em segundos);
+      pedidos além do limite esperam a vaga dentro do mesmo timeout
+    - Sem vaga no prazo: HTTP 503; execução além do prazo: HTTP 504
+    - Threads não podem ser interrompidas: após um 504 a função continua até
+      terminar e só então libera a vaga do endpoint, então o limite vale para
+      o trabalho realmente em execução
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        limits: Optional[Dict[str, Tuple[int, float]]] = None,
+        default_limit: Tuple[int, float] = (4, 30.0)
+    ):
+        self.max_workers = max_workers
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api-blocking")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    async def run(self, name: str, func: Callable, *args, **kwargs):
+        """
+        Executa func(*args, **kwargs) no pool sem bloquear o event loop
+
+        Args:
+            name: Endpoint (chave de limites e estatísticas)
+            func: Função bloqueante
+
+        Returns:
+            Retorno da função (exceções da função são propagadas)
+        """
+        limit, timeout = self.limits.get(name, self.default_limit)
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            semaphore = self._semaphores.setdefault(name, asyncio.Semaphore(limit))
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._count(name, "busy")
+            raise HTTPException(status_code=503, detail=f"Endpoint ocupado ({name}): limite de {limit} execuções simultâneas")
+
+        try:
+            future = self._executor.submit(self._timed, name, func, args, kwargs)
+        except Exception:
+            semaphore.release()
+            raise
+        future.add_done_callback(lambda _: self._release(loop, semaphore))
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), max(0.0, timeout - (loop.time() - start)))
+        except asyncio.TimeoutError:
+            self._count(name, "timeouts")
+            raise HTTPException(status_code=504, detail=f"Tempo esgotado ({name}) após {timeout:.0f}s")
+
+    @staticmethod
+    def _release(loop: asyncio.AbstractEventLoop, semaphore: asyncio.Semaphore):
+        """Libera a vaga no event loop (chamado da thread do pool ao terminar)"""
+        if loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            pass  # event loop encerrado entre a verificação e a chamada (shutdown)
+
+    def _timed(self, name: str, func: Callable, args: tuple, kwargs: dict):
+        """Executa na thread do pool, registrando execuções e duração"""
+        self._count(name, "running")
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                stats = self._stats[name]
+                stats["running"] -= 1
+                stats["calls"] += 1
+                stats["total_ms"] += elapsed_ms
+                stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def _count(self, name: str, field: str):
+        with self._lock:
+            stats = self._stats.setdefault(name, {"calls": 0, "running": 0, "busy": 0, "timeouts": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats[field] += 1
+
+    def get_stats(self) -> Dict:
+        """Execuções, em andamento, rejeições (503), timeouts (504) e duração por endpoint"""
+        with self._lock:
+            stats = {}
+            for name, value in self._stats.items():
+                item = dict(value)
+                total_ms = item.pop("total_ms")
+                item["avg_ms"] = round(total_ms / item["calls"], 2) if item["calls"] else 0.0
+                item["max_ms"] = round(item["max_ms"], 2)
+                stats[name] = item
+            return {"max_workers": self.max_workers, "endpoints": stats}
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
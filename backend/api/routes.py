@@ -2,37 +2,66 @@
 Rotas da API - Endpoints obrigatórios
 """
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Header, Query, WebSocket
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
-from services.bot_service import bot_service
-from services.asset_service import AssetService
-from services.candle_collector import CandleCollector
-from mt5.connector import MT5Connector
+from api.blocking import BlockingExecutor
+from services.container import container
+from services.event_hub import TOPICS, event_hub
 from models.schemas import BotConfig, Trade, LogEntry, MonitoredAsset
 
 router = APIRouter(prefix="/api", tags=["trading"])
 
-# Instâncias dos serviços
-asset_service = AssetService()
-mt5_connector = MT5Connector()
-candle_collector = CandleCollector(mt5_connector, asset_service)
+# Chamadas MT5/SQLite/arquivos rodam fora do event loop: (execuções simultâneas, timeout em s) por endpoint
+blocking = BlockingExecutor(max_workers=8, limits={
+    "status": (4, 10.0),
+    "bot_control": (1, 60.0),
+    # Kill switch com vaga própria: um start travado não impede o stop
+    "bot_stop": (1, 30.0),
+    "config": (1, 10.0),
+    "config_read": (4, 10.0),
+    "logs": (4, 10.0),
+    "trades": (4, 10.0),
+    "decisions": (4, 10.0),
+    "mt5_test": (1, 30.0),
+    "assets": (4, 10.0),
+    "assets_update": (1, 10.0),
+    "collect": (1, 300.0),
+    "backfill": (1, 1800.0),
+    "candles": (4, 30.0),
+    "backtest": (2, 120.0),
+})
 
 @router.get("/status")
 async def get_status():
     """Retorna o status atual do sistema"""
-    return bot_service.get_status()
+    try:
+        # O primeiro acesso constrói o BotService (banco, migrações) e get_status lê disco
+        status = await blocking.run("status", lambda: container.bot_service.get_status())
+        status["services"] = container.get_stats()
+        status["api_executor"] = blocking.get_stats()
+        return status
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/bot/start")
 async def start_bot():
     """Inicia o robô de trading"""
     try:
-        result = bot_service.start()
+        result = await blocking.run("bot_control", lambda: container.bot_service.start())
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["message"])
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -40,8 +69,10 @@ async def start_bot():
 async def stop_bot():
     """Para o robô de trading (kill switch)"""
     try:
-        result = bot_service.stop()
+        result = await blocking.run("bot_stop", lambda: container.bot_service.stop())
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -49,28 +80,67 @@ async def stop_bot():
 async def update_config(config: BotConfig):
     """Atualiza configurações do bot"""
     try:
-        result = bot_service.update_config(config.dict())
+        result = await blocking.run("config", lambda: container.bot_service.update_config(config.dict()))
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["message"])
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/config")
 async def get_config():
     """Retorna configurações atuais"""
-    return bot_service.get_config()
+    try:
+        return await blocking.run("config_read", lambda: container.bot_service.get_config())
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/trades")
-async def get_trades(limit: int = 50):
-    """Retorna histórico de trades"""
+async def get_trades(limit: int = 50, cursor: Optional[str] = None, symbol: Optional[str] = None):
+    """Retorna histórico de trades (mais recentes primeiro; próxima página com next_cursor)"""
     try:
-        trades = bot_service.get_trades(limit)
+        page = await blocking.run("trades", lambda: container.bot_service.get_trades_page(limit, cursor, symbol))
         return {
-            "trades": trades,
-            "count": len(trades),
+            "trades": page["items"],
+            "count": len(page["items"]),
+            "next_cursor": page["next_cursor"],
             "timestamp": datetime.now().isoformat()
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/decisions")
+async def get_decisions(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    symbol: Optional[str] = None,
+    filter: Optional[List[str]] = Query(None)
+):
+    """
+    Retorna decisões da IA (mais recentes primeiro; próxima página com next_cursor)
+    
+    filter (repetível) filtra por indicador no banco, ex: ?filter=rsi<30&filter=macd_diff>0
+    """
+    try:
+        page = await blocking.run("decisions", lambda: container.bot_service.get_decisions_page(limit, cursor, symbol, filter))
+        return {
+            "decisions": page["items"],
+            "count": len(page["items"]),
+            "next_cursor": page["next_cursor"],
+            "timestamp": datetime.now().isoformat()
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -78,12 +148,14 @@ async def get_trades(limit: int = 50):
 async def get_logs(limit: int = 100):
     """Retorna logs do sistema"""
     try:
-        logs = bot_service.get_logs(limit)
+        logs = await blocking.run("logs", lambda: container.bot_service.get_logs(limit))
         return {
             "logs": logs,
             "count": len(logs),
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -91,8 +163,10 @@ async def get_logs(limit: int = 100):
 async def test_mt5_connection():
     """Testa conexão com MetaTrader 5"""
     try:
-        result = bot_service.test_mt5_connection()
+        result = await blocking.run("mt5_test", lambda: container.bot_service.test_mt5_connection())
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -100,12 +174,14 @@ async def test_mt5_connection():
 async def get_assets():
     """Retorna lista de ativos monitorados"""
     try:
-        assets = asset_service.get_assets()
+        assets = await blocking.run("assets", lambda: container.asset_service.get_assets())
         return {
             "success": True,
             "assets": assets,
             "count": len(assets)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -113,25 +189,55 @@ async def get_assets():
 async def update_assets(assets: List[Dict]):
     """Atualiza lista de ativos monitorados"""
     try:
-        result = asset_service.update_assets(assets)
+        result = await blocking.run("assets_update", lambda: container.asset_service.update_assets(assets))
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["message"])
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _ensure_mt5_connected():
+    """Conecta ao MT5 se necessário (executado no pool)"""
+    if not container.mt5_connector.is_connected():
+        connection = container.mt5_connector.connect()
+        if not connection.get("connected"):
+            raise HTTPException(status_code=400, detail="MT5 não está conectado")
+
+def _collect_candles() -> Dict:
+    _ensure_mt5_connected()
+    result = container.candle_collector.collect_all_active_assets()
+    container.candle_collector.flush_state(force=True)
+    return result
+
 @router.post("/assets/collect")
 async def collect_candles():
     """Coleta velas de todos os ativos ativos"""
     try:
-        # Garantir que MT5 está conectado
-        if not mt5_connector.is_connected():
-            connection = mt5_connector.connect()
-            if not connection.get("connected"):
-                raise HTTPException(status_code=400, detail="MT5 não está conectado")
-        
-        result = candle_collector.collect_all_active_assets()
-        return result
+        return await blocking.run("collect", _collect_candles)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _backfill_candles(months: int, symbol: Optional[str], timeframe: str) -> Dict:
+    _ensure_mt5_connected()
+    date_from = datetime.now(timezone.utc) - timedelta(days=30 * months)
+    if symbol:
+        result = container.candle_collector.backfill(symbol, timeframe, date_from)
+        container.candle_collector.flush_state(force=True)
+    else:
+        result = container.candle_collector.backfill_all_active_assets(date_from)
+    return result
+
+@router.post("/assets/backfill")
+async def backfill_candles(months: int = 3, symbol: Optional[str] = None, timeframe: str = "H1"):
+    """Preenche histórico de velas dos ativos ativos (ou de um símbolo)"""
+    try:
+        return await blocking.run("backfill", _backfill_candles, months, symbol, timeframe)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -139,7 +245,7 @@ async def collect_candles():
 async def get_asset_candles(symbol: str, timeframe: str = "H1", limit: int = 100):
     """Retorna velas de um ativo específico"""
     try:
-        candles = asset_service.get_candles(symbol, timeframe, limit=limit)
+        candles = await blocking.run("candles", lambda: container.asset_service.get_candles(symbol, timeframe, limit=limit))
         return {
             "success": True,
             "symbol": symbol,
@@ -147,5 +253,140 @@ async def get_asset_candles(symbol: str, timeframe: str = "H1", limit: int = 100
             "candles": candles,
             "count": len(candles)
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _run_backtest(symbol: str, timeframe: str, spread: float, point: float, trades_limit: int) -> Dict:
+    config = container.bot_service.config
+    candles = container.asset_service.get_candle_array(symbol, timeframe)
+    result = container.backtester.run(
+        candles,
+        stop_loss=config.stop_loss,
+        take_profit=config.take_profit,
+        max_simultaneous_trades=config.max_simultaneous_trades,
+        spread=spread,
+        point=point,
+        volume=config.volume
+    )
+    
+    trades = result["trades"][-trades_limit:] if trades_limit > 0 else result["trades"][:0]
+    equity = result["equity_curve"]
+    # Reduzir a curva de capital para no máximo 500 pontos
+    step = max(1, len(equity) // 500)
+    return {
+        "success": True,
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "summary": result["summary"],
+        "trades": [
+            {name: trade[name].item() for name in trades.dtype.names}
+            for trade in trades
+        ],
+        "equity_curve": [
+            {"time": int(item["time"]), "balance": round(float(item["balance"]), 2)}
+            for item in equity[::step]
+        ]
+    }
+
+@router.get("/backtest/{symbol}")
+async def run_backtest(
+    symbol: str,
+    timeframe: str = "H1",
+    spread: float = 10,
+    point: float = 0.00001,
+    trades_limit: int = 100
+):
+    """Backtest das regras da IA sobre o histórico salvo (SL/TP/volume da configuração atual)"""
+    try:
+        return await blocking.run("backtest", _run_backtest, symbol, timeframe, spread, point, trades_limit)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# Intervalo (s) de heartbeat do streaming quando não há eventos
+STREAM_HEARTBEAT = 15.0
+
+def _stream_topics(topics: Optional[str]) -> List[str]:
+    """Tópicos pedidos (separados por vírgula); padrão: todos"""
+    if not topics:
+        return list(TOPICS)
+    selected = [topic.strip() for topic in topics.split(",") if topic.strip()]
+    unknown = [topic for topic in selected if topic not in TOPICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Tópicos inválidos: {', '.join(unknown)} (disponíveis: {', '.join(TOPICS)})")
+    return selected
+
+@router.get("/stream")
+async def stream_events(
+    topics: Optional[str] = None,
+    last_seq: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    Server-Sent Events com logs, decisões, trades, status e velas novas
+    
+    Cada evento traz id = seq; ao reconectar, o navegador reenvia
+    Last-Event-ID e o stream retoma do evento seguinte (ou envia "reset").
+    """
+    selected = _stream_topics(topics)
+    resume = last_seq if last_seq is not None else last_event_id
+    
+    async def events():
+        subscription = event_hub.subscribe(selected, resume)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                batch = await subscription.next_events(STREAM_HEARTBEAT)
+                if not batch:
+                    yield ": heartbeat\n\n"
+                    continue
+                for event in batch:
+                    data = json.dumps(event, default=str)
+                    yield f"id: {event['seq']}\nevent: {event['topic']}\ndata: {data}\n\n"
+        finally:
+            event_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, topics: Optional[str] = None, last_seq: Optional[int] = None):
+    """WebSocket com os mesmos eventos do /stream (mensagens JSON, uma por evento)"""
+    try:
+        selected = _stream_topics(topics)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    
+    await websocket.accept()
+    subscription = event_hub.subscribe(selected, last_seq)
+    
+    async def send_events():
+        while True:
+            batch = await subscription.next_events(STREAM_HEARTBEAT)
+            if not batch:
+                await websocket.send_text(json.dumps({"topic": "heartbeat", "seq": event_hub.seq}))
+                continue
+            for event in batch:
+                await websocket.send_text(json.dumps(event, default=str))
+    
+    async def wait_disconnect():
+        # Mensagens do cliente são ignoradas; serve para liberar a assinatura na hora
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    
+    tasks = [asyncio.create_task(send_events()), asyncio.create_task(wait_disconnect())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.exception()  # envio interrompido pela desconexão não é erro
+    finally:
+        for task in tasks:
+            task.cancel()
+        event_hub.unsubscribe(subscription)
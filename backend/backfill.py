@@ -0,0 +1,66 @@
+"""
+Backfill de Histórico de Velas
+Preenche o armazenamento local com meses de histórico do MT5
+
+Uso:
+    python backfill.py --months 6
+    python backfill.py --months 12 --symbol EURUSD --timeframe M1
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+import pytz
+
+from mt5.connector import MT5Connector
+from services.asset_service import AssetService
+from services.candle_collector import CandleCollector
+
+def print_progress(progress: dict):
+    """Imprime progresso de um bloco de backfill"""
+    print(
+        f"  {progress['symbol']}/{progress['timeframe']} até {progress['until']}: "
+        f"{progress['bars']} velas ({progress['bars_per_second']:.0f} velas/s)"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de histórico de velas do MT5")
+    parser.add_argument("--months", type=int, default=3, help="Meses de histórico (padrão: 3)")
+    parser.add_argument("--symbol", help="Apenas este símbolo (padrão: todos os ativos ativos)")
+    parser.add_argument("--timeframe", default="H1", help="Timeframe quando --symbol é usado (padrão: H1)")
+    args = parser.parse_args()
+
+    mt5_connector = MT5Connector()
+    connection = mt5_connector.connect()
+    if not connection.get("connected"):
+        print(f"❌ Falha ao conectar MT5: {connection.get('message')}")
+        return 1
+
+    collector = CandleCollector(mt5_connector, AssetService())
+    date_from = datetime.now(pytz.UTC) - timedelta(days=30 * args.months)
+    print(f"📥 Backfill desde {date_from.date()}")
+
+    if args.symbol:
+        result = collector.backfill(args.symbol, args.timeframe, date_from, print_progress)
+        collector.flush_state(force=True)
+        details = [result]
+    else:
+        result = collector.backfill_all_active_assets(date_from, print_progress)
+        details = result["details"]
+
+    for detail in details:
+        if not detail.get("success"):
+            print(f"❌ {detail.get('message')}")
+            continue
+        before, first = detail.get("first_bar_before"), detail.get("first_bar")
+        print(f"  {detail['symbol']}/{detail['timeframe']}: início {before or '-'} -> {first or '-'}")
+        # Série que já tinha velas (coleta ao vivo) precisa começar mais cedo depois do backfill
+        if before and first and first >= before and date_from.isoformat() < before:
+            print(f"⚠️ {detail['symbol']}/{detail['timeframe']}: histórico não foi estendido antes de {before}")
+
+    print(f"✅ {result['bars']} velas em {result.get('seconds', 0)}s ({result['bars_per_second']} velas/s)")
+    mt5_connector.disconnect()
+    return 0 if result.get("success") else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,87 @@
+"""
+Teste de Carga da API: /status durante /assets/collect
+Mede a latência de GET /api/status antes e durante coletas de velas para
+verificar que chamadas MT5 lentas não travam o event loop
+
+Requer a API rodando (python main.py) e o MT5 disponível para a coleta.
+
+Uso:
+    python bench_api_load.py
+    python bench_api_load.py --url http://127.0.0.1:8000 --collects 3 --interval 0.05
+"""
+
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+def request(url: str, method: str = "GET", timeout: float = 600.0) -> float:
+    """Executa a requisição e retorna a latência (ms); erros HTTP também contam"""
+    req = urllib.request.Request(url, method=method, data=b"" if method == "POST" else None)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+    except urllib.error.HTTPError as e:
+        e.read()
+    return (time.perf_counter() - start) * 1000
+
+def summary(latencies: List[float]) -> Dict:
+    """Quantidade, p50, p95 e máximo (ms)"""
+    if not latencies:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+def poll_status(url: str, interval: float, stop: threading.Event) -> List[float]:
+    """GET /api/status a cada `interval` segundos até `stop`"""
+    latencies = []
+    while not stop.is_set():
+        latencies.append(request(f"{url}/api/status"))
+        stop.wait(interval)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência de /status enquanto /assets/collect roda")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Endereço da API")
+    parser.add_argument("--collects", type=int, default=3, help="Coletas executadas em sequência")
+    parser.add_argument("--baseline", type=float, default=2.0, help="Segundos medindo /status sem coleta")
+    parser.add_argument("--interval", type=float, default=0.05, help="Intervalo entre GET /status (s)")
+    args = parser.parse_args()
+    url = args.url.rstrip("/")
+
+    request(f"{url}/api/status")  # constrói os serviços antes de medir
+
+    stop = threading.Event()
+    timer = threading.Timer(args.baseline, stop.set)
+    timer.start()
+    baseline = poll_status(url, args.interval, stop)
+
+    collect_ms: List[float] = []
+    def collect():
+        for _ in range(args.collects):
+            collect_ms.append(request(f"{url}/api/assets/collect", "POST"))
+        stop.set()
+
+    stop.clear()
+    worker = threading.Thread(target=collect)
+    worker.start()
+    during = poll_status(url, args.interval, stop)
+    worker.join()
+
+    print(f"coletas: {len(collect_ms)} | duração média {sum(collect_ms) / len(collect_ms):.1f}ms\n")
+    print(f"{'/status':<16} | {'reqs':>5} | {'p50':>9} | {'p95':>9} | {'máx':>9}")
+    for label, latencies in (("sem coleta", baseline), ("durante coleta", during)):
+        stats = summary(latencies)
+        print(f"{label:<16} | {stats['count']:>5} | {stats['p50']:>7.1f}ms | {stats['p95']:>7.1f}ms | {stats['max']:>7.1f}ms")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,142 @@
+"""
+Microbenchmark: DataFrame vs Array Estruturado
+Compara o caminho pandas (get_candles + ta) com o caminho NumPy
+(get_candles(as_array=True) + kernels) em rates sintéticos do MT5,
+confere os kernels contra a biblioteca ta e os indicadores incrementais
+(analyze_stream) contra o cálculo em lote
+
+Uso:
+    python bench_candles.py
+    python bench_candles.py --sizes 100 10000 1000000 --repeat 5
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+import numpy as np
+import ta
+
+from core_ai import kernels
+from core_ai.ai_engine import AIEngine
+from mt5.rates import RATES_DTYPE, rates_to_frame
+
+def synthetic_rates(n: int, seed: int = 0) -> np.ndarray:
+    """Rates no layout do MT5 (passeio aleatório, barras de 1 minuto)"""
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0002, n))
+    rates = np.zeros(n, dtype=RATES_DTYPE)
+    rates["time"] = 1_700_000_000 + np.arange(n) * 60
+    rates["open"] = np.concatenate([[close[0]], close[:-1]])
+    rates["high"] = np.maximum(rates["open"], close) + 0.0001
+    rates["low"] = np.minimum(rates["open"], close) - 0.0001
+    rates["close"] = close
+    rates["tick_volume"] = rng.integers(1, 500, n)
+    return rates
+
+def ta_indicators(engine: AIEngine, df) -> dict:
+    """Indicadores calculados com pandas + ta (implementação de referência)"""
+    close = df['close']
+    macd = ta.trend.MACD(close, window_fast=engine.macd_fast, window_slow=engine.macd_slow, window_sign=engine.macd_signal)
+    return {
+        'rsi': float(ta.momentum.RSIIndicator(close, window=engine.rsi_period).rsi().iloc[-1]),
+        'ma_fast': float(close.rolling(window=engine.ma_fast).mean().iloc[-1]),
+        'ma_slow': float(close.rolling(window=engine.ma_slow).mean().iloc[-1]),
+        'macd': float(macd.macd().iloc[-1]),
+        'macd_signal': float(macd.macd_signal().iloc[-1]),
+        'macd_diff': float(macd.macd_diff().iloc[-1]),
+        'current_price': float(close.iloc[-1]),
+        'price_change': float((close.iloc[-1] - close.iloc[-2]) / close.iloc[-2] * 100),
+        'volume_avg': float(df['volume'].rolling(window=20).mean().iloc[-1]),
+        'volume_current': float(df['volume'].iloc[-1]),
+    }
+
+def check_kernels(df):
+    """Confere as séries completas dos kernels contra ta (falha com AssertionError)"""
+    close, high, low = df['close'], df['high'], df['low']
+    c, h, l = close.to_numpy(), high.to_numpy(), low.to_numpy()
+    macd = ta.trend.MACD(close)
+    bands = ta.volatility.BollingerBands(close)
+    atr = ta.volatility.AverageTrueRange(high, low, close).average_true_range().to_numpy()
+    pairs = [
+        ("rsi", kernels.rsi(c), ta.momentum.RSIIndicator(close).rsi()),
+        ("sma", kernels.sma(c, 20), ta.trend.SMAIndicator(close, 20).sma_indicator()),
+        ("ema", kernels.ema_span(c, 20), ta.trend.EMAIndicator(close, 20).ema_indicator()),
+        ("macd", kernels.macd(c)[0], macd.macd()),
+        ("macd_signal", kernels.macd(c)[1], macd.macd_signal()),
+        ("bollinger_h", kernels.bollinger(c)[1], bands.bollinger_hband()),
+        ("bollinger_l", kernels.bollinger(c)[2], bands.bollinger_lband()),
+        # ta preenche o aquecimento do ATR com 0; os kernels usam NaN
+        ("atr", np.nan_to_num(kernels.atr(h, l, c)), atr),
+    ]
+    for name, actual, expected in pairs:
+        assert np.allclose(actual, np.asarray(expected, dtype=np.float64), rtol=1e-9, atol=1e-12, equal_nan=True), f"Kernel divergente: {name}"
+
+def check_stream(engine: AIEngine, rates: np.ndarray, bars: int = 2000):
+    """
+    Confere analyze_stream (IncrementalIndicators) contra _calculate_indicators
+    vela a vela (falha com AssertionError)
+
+    A cada vela nova o estado incremental recebe só essa vela; o lote
+    recalcula tudo desde a primeira vela (mesma semente das EMAs).
+    """
+    rates = rates[:bars]
+    engine.reset_streams()
+    for end in range(engine.min_candles, len(rates) + 1):
+        window = rates[:end]
+        streamed = engine.analyze_stream("BENCH", "M1", window).indicators
+        expected = engine._calculate_indicators(rates_to_frame(window)) if end == len(rates) else engine._calculate_indicators_array(window)
+        for key, value in expected.items():
+            assert np.isclose(streamed[key], value, rtol=1e-9, atol=1e-12, equal_nan=True), \
+                f"Indicador incremental divergente: {key} na vela {end} ({streamed[key]} != {value})"
+    engine.reset_streams()
+
+def import_time_ms(module: str) -> float:
+    """Tempo de import do módulo em um interpretador novo (ms)"""
+    code = f"import time; s = time.perf_counter(); import {module}; print((time.perf_counter() - s) * 1000)"
+    return float(subprocess.check_output([sys.executable, "-c", code], text=True))
+
+def best_of(func, repeat: int) -> float:
+    """Menor tempo (ms) entre `repeat` execuções"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de conversão + indicadores")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 1_000_000], help="Quantidades de barras")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições por medida (menor tempo)")
+    args = parser.parse_args()
+
+    engine = AIEngine()
+    print(f"import core_ai.ai_engine: {import_time_ms('core_ai.ai_engine'):.1f}ms (pandas + ta: {import_time_ms('ta'):.1f}ms)\n")
+    print(f"{'barras':>10} | {'conversão df':>12} | {'ind. ta':>12} | {'ind. numpy':>12} | {'total df':>10} | {'total array':>11} | {'ganho':>6}")
+    for n in args.sizes:
+        rates = synthetic_rates(n)
+        df = rates_to_frame(rates)
+
+        convert_ms = best_of(lambda: rates_to_frame(rates), args.repeat)
+        pandas_ms = best_of(lambda: ta_indicators(engine, df), args.repeat)
+        numpy_ms = best_of(lambda: engine._calculate_indicators_array(rates), args.repeat)
+
+        # Mesmos valores nos dois caminhos e nas séries completas
+        expected = ta_indicators(engine, df)
+        for actual in (engine._calculate_indicators(df), engine._calculate_indicators_array(rates)):
+            assert all(np.isclose(expected[k], actual[k], rtol=1e-9, equal_nan=True) for k in expected), "Indicadores divergentes"
+        if n <= 100_000:
+            check_kernels(df)
+            check_stream(engine, rates)
+
+        frame_total = convert_ms + pandas_ms
+        print(
+            f"{n:>10} | {convert_ms:>10.3f}ms | {pandas_ms:>10.3f}ms | {numpy_ms:>10.3f}ms | "
+            f"{frame_total:>8.3f}ms | {numpy_ms:>9.3f}ms | {frame_total / numpy_ms:>5.1f}x"
+        )
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
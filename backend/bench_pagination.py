@@ -0,0 +1,159 @@
+"""
+Benchmark: Paginação por Cursor em trades e ai_decisions
+Gera N linhas sintéticas por tabela e mede a busca de uma página:
+sem índices (consulta antiga, ORDER BY + LIMIT), com índices + OFFSET e
+com índices + cursor (keyset) em várias profundidades
+
+Uso:
+    python bench_pagination.py
+    python bench_pagination.py --rows 10000000 --path /tmp/bench_pagination.db
+"""
+
+import argparse
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from storage.database import Database
+
+SYMBOLS = ("EURUSD", "GBPUSD", "USDJPY", "USDCHF", "AUDUSD")
+
+# (tabela, coluna de tempo, coluna de id, método de página, índices, etapa de migração que os cria)
+TABLES = (
+    ("trades", "open_time", "id", "get_trades_page",
+     ("idx_trades_symbol_open_time", "idx_trades_open_time"), "_create_page_indexes"),
+    # Sequências de uma decisão: last_seen = timestamp, na ordem do índice da página
+    ("ai_decisions", "last_seen", "id", "get_ai_decisions_page",
+     ("idx_ai_decisions_symbol_last_seen", "idx_ai_decisions_last_seen"), "_create_run_indexes"),
+)
+
+def trade_rows(n: int, start: datetime):
+    for i in range(n):
+        symbol = random.choice(SYMBOLS)
+        yield Database.trade_row({
+            "id": str(uuid.uuid4()),
+            "symbol": symbol,
+            "type": "BUY" if i % 2 else "SELL",
+            "entry_price": 1.1,
+            "volume": 0.01,
+            "stop_loss": 50,
+            "take_profit": 100,
+            "status": "CLOSED",
+            "open_time": (start + timedelta(seconds=i)).isoformat(),
+        })
+
+def decision_rows(n: int, start: datetime):
+    for i in range(n):
+        yield Database.decision_row({
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "action": "HOLD",
+            "confidence": 0.5,
+            "reason": "Sinais balanceados",
+            "indicators": {"rsi": 50.0},
+        }, random.choice(SYMBOLS), "M1")
+
+def fill(db: Database, table: str, rows: int, batch: int = 100_000):
+    """
+    Insere `rows` linhas em lotes (sem índices secundários, como numa tabela antiga)
+
+    Decisões entram como sequências fechadas de uma decisão (last_seen = timestamp),
+    o pior caso da página: uma linha de ai_decisions por item.
+    """
+    start = datetime(2020, 1, 1)
+    if table == "trades":
+        generator = trade_rows(rows, start)
+    else:
+        generator = (row + (row[0],) for row in decision_rows(rows, start))
+    insert = db._INSERT_TRADE if table == "trades" else db._INSERT_DECISION
+    with db.connections.writer("bench_fill") as conn:
+        while True:
+            chunk = [row for _, row in zip(range(batch), generator)]
+            if not chunk:
+                break
+            conn.executemany(insert, chunk)
+
+def best_of(func, repeat: int) -> float:
+    """Menor tempo (ms) entre `repeat` execuções"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Página de trades/decisões: sem índice, OFFSET e cursor")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Linhas por tabela")
+    parser.add_argument("--page", type=int, default=50, help="Tamanho da página")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições por medida (menor tempo)")
+    parser.add_argument("--path", default="data/bench_pagination.db", help="Banco temporário (removido no fim)")
+    args = parser.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.path + suffix):
+            os.remove(args.path + suffix)
+
+    random.seed(0)
+    db = Database(args.path)
+    symbol = SYMBOLS[0]
+    try:
+        for table, time_column, id_column, page_method, indexes, create_indexes in TABLES:
+            fetch_page = getattr(db, page_method)
+            with db.connections.writer("bench_drop") as conn:
+                for index in indexes:
+                    conn.execute(f"DROP INDEX {index}")
+
+            start = time.perf_counter()
+            fill(db, table, args.rows)
+            print(f"\n{table}: {args.rows} linhas inseridas em {time.perf_counter() - start:.1f}s")
+
+            def old_query():
+                with db.connections.reader("bench_old") as conn:
+                    conn.execute(
+                        f"SELECT * FROM {table} WHERE symbol = ? ORDER BY {time_column} DESC LIMIT ?",
+                        (symbol, args.page)
+                    ).fetchall()
+            print(f"  sem índice, 1ª página: {best_of(old_query, min(args.repeat, 2)):.2f}ms")
+
+            start = time.perf_counter()
+            getattr(db, create_indexes)()  # mesma etapa da migração de um banco existente
+            print(f"  criação dos índices: {time.perf_counter() - start:.1f}s\n")
+
+            with db.connections.reader("bench_count") as conn:
+                total = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE symbol = ?", (symbol,)).fetchone()[0]
+
+            print(f"  {'profundidade':>12} | {'OFFSET':>10} | {'cursor':>10}")
+            for fraction in (0.0, 0.01, 0.5, 0.99):
+                depth = int(total * fraction)
+                with db.connections.reader("bench_cursor") as conn:
+                    row = conn.execute(
+                        f"SELECT {time_column}, {id_column} FROM {table} WHERE symbol = ? AND {time_column} IS NOT NULL "
+                        f"ORDER BY {time_column} DESC, {id_column} DESC LIMIT 1 OFFSET ?",
+                        (symbol, depth)
+                    ).fetchone()
+                # Decisões: chave (timestamp, id, seq); seq 0 = primeira decisão da sequência
+                key = (row[0], row[1]) if table == "trades" else (row[0], row[1], 0)
+                cursor = db.encode_cursor(*key) if depth else None
+
+                def offset_query():
+                    with db.connections.reader("bench_offset") as conn:
+                        conn.execute(
+                            f"SELECT * FROM {table} WHERE symbol = ? AND {time_column} IS NOT NULL "
+                            f"ORDER BY {time_column} DESC, {id_column} DESC LIMIT ? OFFSET ?",
+                            (symbol, args.page, depth)
+                        ).fetchall()
+
+                offset_ms = best_of(offset_query, args.repeat)
+                cursor_ms = best_of(lambda: fetch_page(args.page, symbol, cursor), args.repeat)
+                print(f"  {depth:>12} | {offset_ms:>8.2f}ms | {cursor_ms:>8.2f}ms")
+    finally:
+        db.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.path + suffix):
+                os.remove(args.path + suffix)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
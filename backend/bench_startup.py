@@ -0,0 +1,117 @@
+"""
+Benchmark de Inicialização do Backend
+Custo de import por módulo (python -X importtime) e tempo de partida da API:
+import de main e construção sob demanda de cada serviço do container
+
+Cada medida roda em um interpretador novo, com diretório de trabalho
+temporário (os serviços criam data/ no diretório atual).
+
+Uso:
+    python bench_startup.py
+    python bench_startup.py --top 15 --repeat 5 --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Serviços na ordem de construção medida (cada um inclui as dependências ainda não criadas)
+SERVICES = ("asset_service", "backtester", "mt5_connector", "candle_collector", "bot_service")
+
+STARTUP_CODE = """
+import json, time
+start = time.perf_counter()
+import main
+result = {"import_ms": (time.perf_counter() - start) * 1000, "services": {}}
+from services.container import container
+for name in %r:
+    start = time.perf_counter()
+    try:
+        container.get(name)
+        result["services"][name] = (time.perf_counter() - start) * 1000
+    except Exception as e:
+        result["services"][name] = repr(e)
+print(json.dumps(result))
+"""
+
+def run_python(args: List[str], workdir: str) -> subprocess.CompletedProcess:
+    """Executa o interpretador atual com o backend no PYTHONPATH"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, env.get("PYTHONPATH")]))
+    return subprocess.run([sys.executable] + args, cwd=workdir, env=env, capture_output=True, text=True)
+
+def import_report(module: str, workdir: str) -> List[Tuple[str, int, int]]:
+    """(módulo, self µs, cumulativo µs) de cada import feito por `import module`"""
+    proc = run_python(["-X", "importtime", "-c", f"import {module}"], workdir)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def by_package(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Custo próprio (µs) somado por pacote de topo"""
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        totals[name.split(".")[0]] += self_us
+    return totals
+
+def startup(workdir: str) -> Dict:
+    """Tempo de import de main e de construção de cada serviço (ms)"""
+    proc = run_python(["-c", STARTUP_CODE % (SERVICES,)], workdir)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de import e tempo de partida do backend")
+    parser.add_argument("--module", default="main", help="Módulo analisado no relatório de import")
+    parser.add_argument("--top", type=int, default=10, help="Quantidade de pacotes/módulos listados")
+    parser.add_argument("--repeat", type=int, default=3, help="Partidas medidas (menor tempo)")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Falha (código 1) se o import de main passar disso")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        rows = import_report(args.module, workdir)
+        total_us = sum(self_us for _, self_us, _ in rows)
+        print(f"import {args.module}: {total_us / 1000:.1f}ms em {len(rows)} módulos\n")
+
+        print(f"{'pacote':<28} | {'ms':>8} | {'%':>5}")
+        for package, self_us in sorted(by_package(rows).items(), key=lambda item: -item[1])[:args.top]:
+            print(f"{package:<28} | {self_us / 1000:>8.1f} | {100 * self_us / total_us:>5.1f}")
+
+        print(f"\n{'módulo':<40} | {'próprio ms':>10} | {'cumul. ms':>10}")
+        for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[1])[:args.top]:
+            print(f"{name:<40} | {self_us / 1000:>10.1f} | {cumulative_us / 1000:>10.1f}")
+
+        runs = [startup(workdir) for _ in range(args.repeat)]
+
+    import_ms = min(run["import_ms"] for run in runs)
+    print(f"\npartida (melhor de {args.repeat}): import main {import_ms:.1f}ms")
+    for name in SERVICES:
+        values = [run["services"][name] for run in runs]
+        if all(isinstance(value, float) for value in values):
+            print(f"  {name:<18} {min(values):>8.1f}ms (primeiro uso)")
+        else:
+            error = next(value for value in values if not isinstance(value, float))
+            print(f"  {name:<18} indisponível: {error}")
+
+    if args.budget_ms is not None and import_ms > args.budget_ms:
+        print(f"\n❌ import main acima do orçamento: {import_ms:.1f}ms > {args.budget_ms:.1f}ms")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
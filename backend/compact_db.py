@@ -0,0 +1,38 @@
+"""
+Compactação do Banco
+Converte o banco para auto_vacuum incremental (VACUUM completo, uma vez)
+e devolve ao disco o espaço livre
+
+O VACUUM reescreve o banco inteiro segurando o escritor: rode com o bot
+parado. A retenção agendada não faz essa conversão, só o VACUUM
+incremental de bancos já convertidos.
+
+Uso:
+    python compact_db.py
+    python compact_db.py --db data/trading_bot.db
+"""
+
+import argparse
+import os
+
+from storage.database import Database
+from storage.retention import RetentionManager
+
+def main():
+    parser = argparse.ArgumentParser(description="Compacta o banco (auto_vacuum incremental)")
+    parser.add_argument("--db", default="data/trading_bot.db", help="Banco (padrão: data/trading_bot.db)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Banco não encontrado: {args.db}")
+        return 1
+
+    database = Database(args.db)
+    size = os.path.getsize(args.db)
+    released = RetentionManager(database).vacuum(convert=True)
+    database.close()
+    print(f"✅ {released} páginas devolvidas ao disco ({size / 1e6:.1f} MB -> {os.path.getsize(args.db) / 1e6:.1f} MB)")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -9,6 +9,7 @@ from datetime import datetime
 from mt5_connector import MT5Connector
 from db_utils import Database
 from safety import SafetyGuard
+from market_data import MarketDataCache
 from utils import calculate_lot_size, normalize_symbol
 
 logger = logging.getLogger("CopierService")
@@ -20,7 +21,8 @@ class TradeCopier:
         self.symbol_config = symbol_config
         self.connector = MT5Connector()
         self.db = Database(config['paths']['db_file'])
-        self.safety = SafetyGuard(config, symbol_config)
+        self.market_data = MarketDataCache()
+        self.safety = SafetyGuard(config, symbol_config, self.market_data)
         self.is_running = True
 
         # State cache for Master-First Logic
@@ -195,12 +197,16 @@ class TradeCopier:
                 # Continue to next follower
         
         logger.info(f"Cycle Complete. Results: {', '.join(results)}")
+        logger.debug(f"Market data cache: {self.market_data.get_stats()}")
     
     def _sync_follower(self, follower_conf, master_data):
         if not self.connector.connect(follower_conf):
             logger.error(f"Could not connect to Follower {follower_conf.get('login')}")
             return False
 
+        # Fresh ticks for this follower; specs are kept per account
+        self.market_data.begin_cycle(follower_conf.get('login'))
+
         master_positions = {p['ticket']: p for p in master_data.get('positions', [])}
         master_orders = {o['ticket']: o for o in master_data.get('orders', [])}
         all_master_items = {**master_positions, **master_orders}
@@ -392,7 +398,7 @@ class TradeCopier:
             return
             
         # Determine correct filling mode
-        filling_mode = mt5.symbol_info(symbol).filling_mode
+        filling_mode = self.market_data.spec(symbol).filling_mode
         type_filling = mt5.ORDER_FILLING_FOK
         if filling_mode & 2: 
             type_filling = mt5.ORDER_FILLING_IOC
@@ -403,7 +409,8 @@ class TradeCopier:
         action = mt5.TRADE_ACTION_DEAL if is_market else mt5.TRADE_ACTION_PENDING
         price = master_item['price_open']
         if is_market:
-             price = mt5.symbol_info_tick(symbol).ask if master_item['type'] == mt5.ORDER_TYPE_BUY else mt5.symbol_info_tick(symbol).bid
+             tick = self.market_data.tick(symbol)
+             price = tick.ask if master_item['type'] == mt5.ORDER_TYPE_BUY else tick.bid
             
         request = {
             "action": action,
@@ -538,10 +545,11 @@ class TradeCopier:
 
         pos = positions[0]
         op_type = mt5.ORDER_TYPE_SELL if pos.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
-        price = mt5.symbol_info_tick(symbol).bid if op_type == mt5.ORDER_TYPE_SELL else mt5.symbol_info_tick(symbol).ask
+        tick = self.market_data.tick(symbol)
+        price = tick.bid if op_type == mt5.ORDER_TYPE_SELL else tick.ask
         
         # Valid filling mode check
-        filling_mode = mt5.symbol_info(symbol).filling_mode
+        filling_mode = self.market_data.spec(symbol).filling_mode
         type_filling = mt5.ORDER_FILLING_FOK
         if filling_mode & 2:
              type_filling = mt5.ORDER_FILLING_IOC
@@ -0,0 +1,72 @@
+import MetaTrader5 as mt5
+import time
+import logging
+
+logger = logging.getLogger("MarketData")
+
+class MarketDataCache:
+    """
+    Per-symbol cache of symbol specs and ticks for the pre-trade checks.
+
+    - Specs (point, digits, filling_mode, volume_step...) are near-static and
+      kept per (account, symbol) for spec_ttl seconds, so switching between
+      followers does not refetch them.
+    - Ticks are a short-lived snapshot: cleared at the start of every follower
+      cycle and reused for at most tick_ttl seconds inside it.
+    """
+
+    def __init__(self, spec_ttl=3600.0, tick_ttl=0.5):
+        self.spec_ttl = spec_ttl
+        self.tick_ttl = tick_ttl
+        self.account = None
+        self.specs = {}  # {(account, symbol): (fetched_at, symbol_info)}
+        self.ticks = {}  # {symbol: (fetched_at, tick)}
+        self.stats = {"spec_hits": 0, "spec_misses": 0, "tick_hits": 0, "tick_misses": 0}
+
+    def begin_cycle(self, account):
+        """
+        Starts a follower cycle: ticks from the previous account/cycle are dropped.
+        """
+        self.account = account
+        self.ticks.clear()
+
+    def spec(self, symbol):
+        now = time.monotonic()
+        key = (self.account, symbol)
+        entry = self.specs.get(key)
+        if entry is not None and now - entry[0] < self.spec_ttl:
+            self.stats["spec_hits"] += 1
+            return entry[1]
+
+        self.stats["spec_misses"] += 1
+        info = mt5.symbol_info(symbol)
+        if info is None:
+            logger.error(f"Failed to get symbol info for {symbol}")
+            return None
+        self.specs[key] = (now, info)
+        return info
+
+    def tick(self, symbol):
+        now = time.monotonic()
+        entry = self.ticks.get(symbol)
+        if entry is not None and now - entry[0] < self.tick_ttl:
+            self.stats["tick_hits"] += 1
+            return entry[1]
+
+        self.stats["tick_misses"] += 1
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is None:
+            logger.error(f"Failed to get tick for {symbol}")
+            return None
+        self.ticks[symbol] = (now, tick)
+        return tick
+
+    def get_stats(self):
+        """
+        Returns hit/miss counters and hit ratios for specs and ticks.
+        """
+        stats = dict(self.stats)
+        for kind in ("spec", "tick"):
+            lookups = stats[f"{kind}_hits"] + stats[f"{kind}_misses"]
+            stats[f"{kind}_hit_ratio"] = round(stats[f"{kind}_hits"] / lookups, 4) if lookups else 0.0
+        return stats
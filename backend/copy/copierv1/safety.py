@@ -1,12 +1,16 @@
 import MetaTrader5 as mt5
 import logging
 
+from market_data import MarketDataCache
+
 logger = logging.getLogger("SafetyGuard")
 
 class SafetyGuard:
-    def __init__(self, config, symbol_config={}):
+    def __init__(self, config, symbol_config={}, market_data=None):
         self.config = config
         self.symbol_config = symbol_config
+        # Shared with TradeCopier so all pre-trade checks reuse one spec/tick per symbol
+        self.market_data = market_data or MarketDataCache()
 
     def check_slippage(self, master_price, follower_symbol, order_type):
         """
@@ -25,14 +29,15 @@ class SafetyGuard:
                     logger.debug(f"Using override slippage for {follower_symbol}: {max_slippage}")
                 break
 
-        tick = mt5.symbol_info_tick(follower_symbol)
+        tick = self.market_data.tick(follower_symbol)
+        spec = self.market_data.spec(follower_symbol)
         
-        if tick is None:
+        if tick is None or spec is None:
             logger.error(f"Failed to get tick for {follower_symbol}")
             return False
 
         current_price = tick.ask if order_type == mt5.ORDER_TYPE_BUY else tick.bid
-        point = mt5.symbol_info(follower_symbol).point
+        point = spec.point
         
         diff_points = abs(master_price - current_price) / point
         
@@ -57,11 +62,12 @@ class SafetyGuard:
                     logger.debug(f"Using override spread for {symbol}: {max_spread}")
                 break
                 
-        tick = mt5.symbol_info_tick(symbol)
-        if tick is None:
+        tick = self.market_data.tick(symbol)
+        spec = self.market_data.spec(symbol)
+        if tick is None or spec is None:
             return False
             
-        point = mt5.symbol_info(symbol).point
+        point = spec.point
         spread_points = (tick.ask - tick.bid) / point
         
         if spread_points > max_spread:
@@ -80,7 +86,7 @@ class SafetyGuard:
         # Assuming the caller has checked connectivity.
         
         try:
-            margin_required = mt5.order_calc_margin(order_type, symbol, volume, mt5.symbol_info_tick(symbol).ask)
+            margin_required = mt5.order_calc_margin(order_type, symbol, volume, self.market_data.tick(symbol).ask)
             account_info = mt5.account_info()
             
             if account_info and account_info.margin_free < margin_required:
@@ -3,12 +3,21 @@ Core de Inteligência Artificial - Módulo Desacoplado
 Analisa dados e retorna decisões sem executar ordens
 """
 
-import pandas as pd
 import numpy as np
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from models.schemas import Action, AIDecision
-import ta
+
+from core_ai import kernels
+from core_ai.indicators import IncrementalIndicators
+
+# Campo de volume em arrays estruturados (CANDLE_DTYPE ou rates do MT5)
+VOLUME_FIELDS = ("volume", "tick_volume")
+
+def _volume_field(candles: np.ndarray) -> Optional[str]:
+    """Nome do campo de volume do array (None se ausente)"""
+    names = candles.dtype.names or ()
+    return next((name for name in VOLUME_FIELDS if name in names), None)
 
 class AIEngine:
     """
@@ -31,18 +40,26 @@ class AIEngine:
         self.macd_fast = 12
         self.macd_slow = 26
         self.macd_signal = 9
+        
+        # Mínimo de velas para análise
+        self.min_candles = 50
+        
+        # Estado incremental por (symbol, timeframe)
+        self.streams: Dict[Tuple[str, str], IncrementalIndicators] = {}
     
-    def analyze(self, candles: pd.DataFrame) -> AIDecision:
+    def analyze(self, candles) -> AIDecision:
         """
         Analisa o mercado e retorna decisão da IA
         
         Args:
-            candles: DataFrame com OHLCV (Open, High, Low, Close, Volume)
+            candles: DataFrame com OHLCV (Open, High, Low, Close, Volume) ou
+                     array estruturado (rates do MT5 / CANDLE_DTYPE), que
+                     usa os kernels NumPy sem conversão
             
         Returns:
             AIDecision: Decisão da IA com ação, confiança e motivo
         """
-        if candles.empty or len(candles) < 50:
+        if len(candles) < self.min_candles:
             return AIDecision(
                 action=Action.HOLD,
                 confidence=0.0,
@@ -51,7 +68,10 @@ class AIEngine:
             )
         
         # Calcular indicadores técnicos
-        indicators = self._calculate_indicators(candles)
+        if isinstance(candles, np.ndarray):
+            indicators = self._calculate_indicators_array(candles)
+        else:
+            indicators = self._calculate_indicators(candles)
         
         # Análise baseada em regras
         action, confidence, reason = self._rule_based_analysis(candles, indicators)
@@ -67,126 +87,296 @@ class AIEngine:
         
         return decision
     
-    def _calculate_indicators(self, df: pd.DataFrame) -> Dict:
-        """Calcula indicadores técnicos"""
-        indicators = {}
+    def analyze_stream(self, symbol: str, timeframe: str, candles) -> AIDecision:
+        """
+        Analisa usando indicadores incrementais da série
         
-        try:
-            # RSI
-            indicators['rsi'] = float(ta.momentum.RSIIndicator(df['close'], window=self.rsi_period).rsi().iloc[-1])
-            
-            # Médias Móveis
-            indicators['ma_fast'] = float(df['close'].rolling(window=self.ma_fast).mean().iloc[-1])
-            indicators['ma_slow'] = float(df['close'].rolling(window=self.ma_slow).mean().iloc[-1])
+        Na primeira chamada o estado é inicializado com todo o histórico
+        recebido; nas seguintes apenas as velas posteriores à última
+        processada são aplicadas (O(1) por vela nova).
+        
+        Args:
+            symbol: Símbolo do ativo
+            timeframe: Timeframe
+            candles: Velas FECHADAS: DataFrame OHLCV indexado por tempo ou
+                     array estruturado com time/close/volume (ex: CANDLE_DTYPE)
             
-            # MACD
-            macd = ta.trend.MACD(
-                df['close'],
-                window_fast=self.macd_fast,
-                window_slow=self.macd_slow,
-                window_sign=self.macd_signal
+        Returns:
+            AIDecision: Decisão da IA
+        """
+        stream = self._update_stream(symbol, timeframe, candles)
+        
+        if stream is None or stream.count < self.min_candles:
+            return AIDecision(
+                action=Action.HOLD,
+                confidence=0.0,
+                reason="Dados insuficientes para análise",
+                timestamp=datetime.now()
             )
-            indicators['macd'] = float(macd.macd().iloc[-1])
-            indicators['macd_signal'] = float(macd.macd_signal().iloc[-1])
-            indicators['macd_diff'] = float(macd.macd_diff().iloc[-1])
-            
-            # Preço atual
-            indicators['current_price'] = float(df['close'].iloc[-1])
-            indicators['price_change'] = float(((df['close'].iloc[-1] - df['close'].iloc[-2]) / df['close'].iloc[-2]) * 100)
-            
-            # Volume
-            if 'volume' in df.columns:
-                indicators['volume_avg'] = float(df['volume'].rolling(window=20).mean().iloc[-1])
-                indicators['volume_current'] = float(df['volume'].iloc[-1])
+        
+        indicators = stream.values()
+        action, confidence, reason = self._rule_based_analysis(candles, indicators)
+        
+        return AIDecision(
+            action=action,
+            confidence=confidence,
+            reason=reason,
+            timestamp=datetime.now(),
+            indicators=indicators
+        )
+    
+    def _new_stream(self) -> IncrementalIndicators:
+        return IncrementalIndicators(
+            rsi_period=self.rsi_period,
+            ma_fast=self.ma_fast,
+            ma_slow=self.ma_slow,
+            macd_fast=self.macd_fast,
+            macd_slow=self.macd_slow,
+            macd_signal=self.macd_signal
+        )
+    
+    def _update_stream(self, symbol: str, timeframe: str, candles) -> Optional[IncrementalIndicators]:
+        """Aplica velas novas ao estado incremental (ou inicializa)"""
+        times, closes, volumes = self._stream_arrays(candles)
+        key = (symbol, timeframe)
+        if len(times) == 0:
+            return self.streams.get(key)
+        
+        stream = self.streams.get(key)
+        
+        # Reinicializar se não há estado ou se a última vela processada saiu da janela (lacuna)
+        if stream is None or stream.last_time is None or stream.last_time < times[0]:
+            stream = self._new_stream()
+            stream.seed(closes, volumes, times)
+            self.streams[key] = stream
+            return stream
+        
+        # Velas ordenadas por tempo: busca binária pela primeira vela nova
+        start = int(np.searchsorted(times, stream.last_time, side='right'))
+        if start < len(times):
+            vols = volumes[start:] if volumes is not None else [None] * (len(times) - start)
+            for close, volume, bar_time in zip(closes[start:], vols, times[start:]):
+                stream.update(close, volume, int(bar_time))
+        return stream
+    
+    @staticmethod
+    def _stream_arrays(candles) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """(tempos em epoch, fechamentos, volumes) de um DataFrame ou array estruturado"""
+        if not isinstance(candles, np.ndarray):
+            volumes = candles['volume'].to_numpy() if 'volume' in candles.columns else None
+            times = candles.index.values.astype('datetime64[s]').astype(np.int64)
+            return times, candles['close'].to_numpy(), volumes
+        volume = _volume_field(candles)
+        return candles['time'], candles['close'], candles[volume] if volume else None
+    
+    def params_key(self) -> Tuple:
+        """Parâmetros que afetam a decisão (chave para caches)"""
+        return (
+            self.rsi_period,
+            self.ma_fast,
+            self.ma_slow,
+            self.macd_fast,
+            self.macd_slow,
+            self.macd_signal,
+            self.min_candles
+        )
+    
+    def reset_streams(self):
+        """Descarta o estado incremental (ex: após alterar parâmetros)"""
+        self.streams.clear()
+    
+    def _calculate_indicators(self, df) -> Dict:
+        """Calcula indicadores técnicos de um DataFrame OHLCV (kernels NumPy)"""
+        indicators = {}
+        
+        try:
+            close = df['close'].to_numpy(dtype=np.float64)
+            volume = df['volume'].to_numpy(dtype=np.float64) if 'volume' in df.columns else None
+            batch = self._calculate_indicators_batch(close[None, :], volume[None, :] if volume is not None else None)
+            indicators = {key: float(values[0]) for key, values in batch.items()}
             
         except Exception as e:
             print(f"Erro ao calcular indicadores: {e}")
         
         return indicators
     
-    def _rule_based_analysis(self, df: pd.DataFrame, indicators: Dict) -> tuple:
+    def _calculate_indicators_array(self, candles: np.ndarray) -> Dict:
+        """Indicadores técnicos de um array estruturado (kernels NumPy, sem pandas)"""
+        volume = _volume_field(candles)
+        indicators = self._calculate_indicators_batch(
+            candles['close'][None, :],
+            candles[volume][None, :] if volume else None
+        )
+        return {key: float(values[0]) for key, values in indicators.items()}
+    
+    def analyze_batch(
+        self,
+        symbols: List[str],
+        close: np.ndarray,
+        volume: Optional[np.ndarray] = None
+    ) -> Dict[str, AIDecision]:
         """
-        Análise baseada em regras
+        Analisa vários símbolos de uma vez com operações vetorizadas
         
-        Retorna: (action, confidence, reason)
+        Args:
+            symbols: Símbolos, na ordem das linhas dos arrays
+            close: Array 2-D (símbolos × barras) de fechamentos, barras alinhadas
+            volume: Array 2-D (símbolos × barras) de volumes (opcional)
+            
+        Returns:
+            Dict symbol -> AIDecision
         """
-        reasons = []
-        buy_score = 0
-        sell_score = 0
-        
-        # RSI Analysis
-        rsi = indicators.get('rsi', 50)
-        if rsi < 30:
-            buy_score += 2
-            reasons.append("RSI oversold")
-        elif rsi > 70:
-            sell_score += 2
-            reasons.append("RSI overbought")
-        elif 30 <= rsi <= 50:
-            buy_score += 1
-            reasons.append("RSI neutro-baixo")
-        elif 50 < rsi <= 70:
-            sell_score += 1
-            reasons.append("RSI neutro-alto")
-        
-        # Moving Average Crossover
-        ma_fast = indicators.get('ma_fast', 0)
-        ma_slow = indicators.get('ma_slow', 0)
-        current_price = indicators.get('current_price', 0)
-        
-        if ma_fast > ma_slow:
-            buy_score += 2
-            reasons.append("MA Fast acima de MA Slow (tendência de alta)")
-        else:
-            sell_score += 2
-            reasons.append("MA Fast abaixo de MA Slow (tendência de baixa)")
+        close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+        now = datetime.now()
         
-        if current_price > ma_fast:
-            buy_score += 1
-            reasons.append("Preço acima da MA rápida")
-        else:
-            sell_score += 1
-            reasons.append("Preço abaixo da MA rápida")
-        
-        # MACD Analysis
-        macd = indicators.get('macd', 0)
-        macd_signal = indicators.get('macd_signal', 0)
-        macd_diff = indicators.get('macd_diff', 0)
-        
-        if macd > macd_signal and macd_diff > 0:
-            buy_score += 2
-            reasons.append("MACD positivo e acima do sinal")
-        elif macd < macd_signal and macd_diff < 0:
-            sell_score += 2
-            reasons.append("MACD negativo e abaixo do sinal")
-        
-        # Price Momentum
-        price_change = indicators.get('price_change', 0)
-        if price_change > 0.1:
-            buy_score += 1
-            reasons.append("Momentum positivo")
-        elif price_change < -0.1:
-            sell_score += 1
-            reasons.append("Momentum negativo")
-        
-        # Determinar ação e confiança
-        total_score = buy_score + sell_score
-        if total_score == 0:
-            action = Action.HOLD
-            confidence = 0.0
-            reason = "Indicadores neutros"
-        elif buy_score > sell_score:
-            action = Action.BUY
-            confidence = min(0.95, buy_score / max(total_score, 1) * 1.2)
-            reason = f"BUY: {', '.join(reasons[:3])}"
-        elif sell_score > buy_score:
-            action = Action.SELL
-            confidence = min(0.95, sell_score / max(total_score, 1) * 1.2)
-            reason = f"SELL: {', '.join(reasons[:3])}"
-        else:
-            action = Action.HOLD
-            confidence = 0.5
-            reason = "Sinais balanceados"
+        if close.shape[1] < self.min_candles:
+            return {
+                symbol: AIDecision(
+                    action=Action.HOLD,
+                    confidence=0.0,
+                    reason="Dados insuficientes para análise",
+                    timestamp=now
+                )
+                for symbol in symbols
+            }
         
-        return action, confidence, reason
-
+        indicators = self._calculate_indicators_batch(close, volume)
+        actions, confidences, reasons = self._decide(*self._score_rules(indicators))
+        complete = np.isfinite(close).all(axis=1)
+        
+        decisions = {}
+        for i, symbol in enumerate(symbols):
+            if not complete[i]:
+                decisions[symbol] = AIDecision(
+                    action=Action.HOLD,
+                    confidence=0.0,
+                    reason="Dados insuficientes para análise",
+                    timestamp=now
+                )
+                continue
+            decisions[symbol] = AIDecision(
+                action=actions[i],
+                confidence=float(confidences[i]),
+                reason=reasons[i],
+                timestamp=now,
+                indicators={key: float(values[i]) for key, values in indicators.items()}
+            )
+        return decisions
+    
+    def _calculate_indicators_batch(self, close: np.ndarray, volume: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Indicadores da última barra de cada linha (símbolos × barras)"""
+        macd, macd_signal, macd_diff = kernels.macd(close, self.macd_fast, self.macd_slow, self.macd_signal)
+        indicators = {
+            'rsi': kernels.rsi(close, self.rsi_period)[:, -1],
+            'ma_fast': kernels.sma(close[:, -self.ma_fast:], self.ma_fast)[:, -1],
+            'ma_slow': kernels.sma(close[:, -self.ma_slow:], self.ma_slow)[:, -1],
+            'macd': macd[:, -1],
+            'macd_signal': macd_signal[:, -1],
+            'macd_diff': macd_diff[:, -1],
+            'current_price': close[:, -1],
+            'price_change': (close[:, -1] - close[:, -2]) / close[:, -2] * 100,
+        }
+        if volume is not None:
+            volume = np.atleast_2d(np.asarray(volume, dtype=np.float64))
+            indicators['volume_avg'] = volume[:, -20:].mean(axis=1) if volume.shape[1] >= 20 else np.full(len(close), np.nan)
+            indicators['volume_current'] = volume[:, -1]
+        return indicators
+    
+    def _score_rules(self, indicators: Dict) -> Tuple[np.ndarray, np.ndarray, List[Tuple[np.ndarray, str]]]:
+        """
+        Pontuação das regras, vetorizada
+        
+        Aceita indicadores escalares ou arrays (um valor por símbolo ou por barra).
+        
+        Retorna: (buy_score, sell_score, [(máscara, motivo), ...] na ordem das regras)
+        """
+        def value(key, default):
+            return np.asarray(indicators.get(key, default), dtype=np.float64)
+        
+        rsi = value('rsi', 50)
+        ma_fast = value('ma_fast', 0)
+        ma_slow = value('ma_slow', 0)
+        current_price = value('current_price', 0)
+        macd = value('macd', 0)
+        macd_signal = value('macd_signal', 0)
+        macd_diff = value('macd_diff', 0)
+        price_change = value('price_change', 0)
+        
+        trend_up = ma_fast > ma_slow
+        above_fast = current_price > ma_fast
+        
+        # (máscara, pontos de compra, pontos de venda, motivo)
+        rules = [
+            # RSI Analysis
+            (rsi < 30, 2, 0, "RSI oversold"),
+            (rsi > 70, 0, 2, "RSI overbought"),
+            ((rsi >= 30) & (rsi <= 50), 1, 0, "RSI neutro-baixo"),
+            ((rsi > 50) & (rsi <= 70), 0, 1, "RSI neutro-alto"),
+            # Moving Average Crossover
+            (trend_up, 2, 0, "MA Fast acima de MA Slow (tendência de alta)"),
+            (~trend_up, 0, 2, "MA Fast abaixo de MA Slow (tendência de baixa)"),
+            (above_fast, 1, 0, "Preço acima da MA rápida"),
+            (~above_fast, 0, 1, "Preço abaixo da MA rápida"),
+            # MACD Analysis
+            ((macd > macd_signal) & (macd_diff > 0), 2, 0, "MACD positivo e acima do sinal"),
+            ((macd < macd_signal) & (macd_diff < 0), 0, 2, "MACD negativo e abaixo do sinal"),
+            # Price Momentum
+            (price_change > 0.1, 1, 0, "Momentum positivo"),
+            (price_change < -0.1, 0, 1, "Momentum negativo"),
+        ]
+        
+        shape = np.broadcast_shapes(*(mask.shape for mask, _, _, _ in rules))
+        buy_score = np.zeros(shape, dtype=np.int64)
+        sell_score = np.zeros(shape, dtype=np.int64)
+        for mask, buy, sell, _ in rules:
+            buy_score += mask * buy
+            sell_score += mask * sell
+        
+        return buy_score, sell_score, [(mask, reason) for mask, _, _, reason in rules]
+    
+    def _decide(self, buy_score: np.ndarray, sell_score: np.ndarray, reasons: Optional[List[Tuple[np.ndarray, str]]] = None):
+        """
+        Determina ação, confiança e motivo a partir das pontuações
+        
+        Retorna: (actions, confidences, reasons) como listas/arrays 1-D
+        """
+        buy_score = np.atleast_1d(buy_score)
+        sell_score = np.atleast_1d(sell_score)
+        total = buy_score + sell_score
+        buy_wins = (total > 0) & (buy_score > sell_score)
+        sell_wins = (total > 0) & (sell_score > buy_score)
+        
+        denom = np.maximum(total, 1)
+        confidence = np.where(
+            total == 0, 0.0,
+            np.where(buy_wins, np.minimum(0.95, buy_score / denom * 1.2),
+                     np.where(sell_wins, np.minimum(0.95, sell_score / denom * 1.2), 0.5))
+        )
+        
+        actions = np.where(buy_wins, Action.BUY.value, np.where(sell_wins, Action.SELL.value, Action.HOLD.value))
+        
+        if reasons is None:
+            return actions, confidence, None
+        
+        masks = [np.broadcast_to(mask, total.shape) for mask, _ in reasons]
+        texts = []
+        for i in range(total.shape[0]):
+            if total[i] == 0:
+                texts.append("Indicadores neutros")
+            elif buy_wins[i] or sell_wins[i]:
+                matched = [reason for mask, (_, reason) in zip(masks, reasons) if mask[i]]
+                side = "BUY" if buy_wins[i] else "SELL"
+                texts.append(f"{side}: {', '.join(matched[:3])}")
+            else:
+                texts.append("Sinais balanceados")
+        
+        return [Action(a) for a in actions], confidence, texts
+    
+    def _rule_based_analysis(self, candles, indicators: Dict) -> tuple:
+        """
+        Análise baseada em regras
+        
+        Retorna: (action, confidence, reason)
+        """
+        actions, confidences, reasons = self._decide(*self._score_rules(indicators))
+        return actions[0], float(confidences[0]), reasons[0]
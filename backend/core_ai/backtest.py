@@ -0,0 +1,287 @@
+"""
+Backtest Vetorizado das Regras da IA
+Simula as decisões do AIEngine sobre o histórico de velas armazenado
+"""
+
+import bisect
+import heapq
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from core_ai import kernels
+from core_ai.ai_engine import AIEngine
+from models.schemas import Action
+
+TRADE_DTYPE = np.dtype([
+    ("entry_time", "<i8"),
+    ("exit_time", "<i8"),
+    ("type", "U4"),
+    ("entry_price", "<f8"),
+    ("exit_price", "<f8"),
+    ("exit_reason", "U3"),
+    ("profit_points", "<f8"),
+    ("profit", "<f8"),
+])
+
+class Backtester:
+    """
+    Backtest das regras do AIEngine
+
+    - Sinais: indicadores e _score_rules calculados para todas as barras de uma vez
+    - Simulação: percorre apenas os trades executados, não todas as barras
+    - Entrada: na abertura da barra seguinte ao sinal (o bot decide no fechamento)
+    - Saída: SL/TP em pontos, como BotConfig.stop_loss/take_profit; se SL e TP
+      são atingidos na mesma barra, assume SL (conservador)
+    - Spread constante em pontos; OHLC do histórico é BID
+    - max_simultaneous_trades limita posições abertas, como no loop do bot
+
+    Os indicadores usam o histórico completo; no bot eles vêm de uma janela
+    de 100 velas, então EMAs/RSI podem diferir levemente na semente.
+    """
+
+    def __init__(self, ai_engine: Optional[AIEngine] = None):
+        self.ai_engine = ai_engine or AIEngine()
+        # Largura inicial da janela de busca de saída (dobra a cada passada)
+        self.search_window = 32
+
+    def signals(self, close: np.ndarray) -> np.ndarray:
+        """
+        Série de ações da IA barra a barra
+
+        Returns:
+            Array de strings (BUY/SELL/HOLD), uma por barra
+        """
+        engine = self.ai_engine
+        close = np.asarray(close, dtype=np.float64)
+        macd, macd_signal, macd_diff = kernels.macd(close, engine.macd_fast, engine.macd_slow, engine.macd_signal)
+        indicators = {
+            'rsi': kernels.rsi(close, engine.rsi_period),
+            'ma_fast': kernels.sma(close, engine.ma_fast),
+            'ma_slow': kernels.sma(close, engine.ma_slow),
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_diff': macd_diff,
+            'current_price': close,
+            'price_change': kernels.pct_change(close),
+        }
+        buy_score, sell_score, _ = engine._score_rules(indicators)
+        actions, _, _ = engine._decide(buy_score, sell_score)
+        actions[:engine.min_candles - 1] = Action.HOLD.value
+        return actions
+
+    def run(
+        self,
+        candles: np.ndarray,
+        stop_loss: int = 50,
+        take_profit: int = 100,
+        max_simultaneous_trades: int = 1,
+        spread: float = 10,
+        point: float = 0.00001,
+        volume: float = 0.01,
+        contract_size: float = 100000,
+        initial_balance: float = 10000.0,
+        actions: Optional[np.ndarray] = None
+    ) -> Dict:
+        """
+        Executa o backtest
+
+        Args:
+            candles: Array estruturado com time, open, high, low, close
+                     (ex: AssetService.get_candle_array)
+            stop_loss: Stop Loss em pontos
+            take_profit: Take Profit em pontos
+            max_simultaneous_trades: Máximo de posições abertas
+            spread: Spread em pontos
+            point: Tamanho do ponto do símbolo
+            volume: Volume (lote)
+            contract_size: Tamanho do contrato por lote
+            initial_balance: Saldo inicial
+            actions: Sinais já calculados com signals() (reuso entre variações de SL/TP)
+
+        Returns:
+            Dict com summary, trades (array TRADE_DTYPE) e equity_curve
+        """
+        start = time.perf_counter()
+        t = np.asarray(candles["time"], dtype=np.int64)
+        o = np.asarray(candles["open"], dtype=np.float64)
+        h = np.asarray(candles["high"], dtype=np.float64)
+        l = np.asarray(candles["low"], dtype=np.float64)
+        c = np.asarray(candles["close"], dtype=np.float64)
+        n = len(c)
+
+        if actions is None:
+            actions = self.signals(c) if n else np.empty(0, dtype="U4")
+        # Sinal no fechamento da barra i -> entrada na abertura de i + 1
+        signal_idx = np.flatnonzero(actions[:-1] != Action.HOLD.value) if n > 1 else np.empty(0, dtype=np.int64)
+        is_buy = actions[signal_idx] == Action.BUY.value
+        entry_idx = signal_idx + 1
+
+        spread_px = spread * point
+        sl_px = stop_loss * point
+        tp_px = take_profit * point
+
+        # Preço de entrada: BUY no ASK, SELL no BID
+        entry_price = np.where(is_buy, o[entry_idx] + spread_px, o[entry_idx])
+        sl_level = np.where(is_buy, entry_price - sl_px, entry_price + sl_px)
+        tp_level = np.where(is_buy, entry_price + tp_px, entry_price - tp_px)
+
+        taken, exit_idx, hit_sl, found = self._simulate(
+            h, l, signal_idx, is_buy, sl_level, tp_level, spread_px, max_simultaneous_trades
+        )
+        entry_idx = entry_idx[taken]
+        entry_price = entry_price[taken]
+        sl_level = sl_level[taken]
+        tp_level = tp_level[taken]
+        is_buy = is_buy[taken]
+
+        exit_reason = np.where(found, np.where(hit_sl, "SL", "TP"), "END")
+        exit_price = self._exit_prices(o, c, exit_idx, is_buy, hit_sl, found, sl_level, tp_level, spread_px)
+        profit_px = np.where(is_buy, exit_price - entry_price, entry_price - exit_price)
+
+        trades = np.zeros(len(taken), dtype=TRADE_DTYPE)
+        trades["entry_time"] = t[entry_idx]
+        trades["exit_time"] = t[exit_idx]
+        trades["type"] = np.where(is_buy, Action.BUY.value, Action.SELL.value)
+        trades["entry_price"] = entry_price
+        trades["exit_price"] = exit_price
+        trades["exit_reason"] = exit_reason
+        trades["profit_points"] = profit_px / point
+        trades["profit"] = profit_px * volume * contract_size
+
+        # Curva de capital por ordem de fechamento
+        order = np.argsort(exit_idx, kind="stable")
+        balance = initial_balance + np.cumsum(trades["profit"][order])
+        equity_curve = np.zeros(len(order), dtype=[("time", "<i8"), ("balance", "<f8")])
+        equity_curve["time"] = trades["exit_time"][order]
+        equity_curve["balance"] = balance
+
+        summary = self._summary(trades, balance, initial_balance)
+        summary.update({
+            "bars": n,
+            "signals": int(len(signal_idx)),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+        })
+
+        return {
+            "summary": summary,
+            "trades": trades,
+            "equity_curve": equity_curve
+        }
+
+    def _simulate(self, h, l, signal_idx, is_buy, sl_level, tp_level, spread_px, max_trades):
+        """
+        Escolhe os sinais que viram trades respeitando max_simultaneous_trades
+
+        A saída (SL/TP) é procurada apenas para os sinais executados, e o
+        laço salta direto para o próximo fechamento quando o limite de
+        posições está atingido.
+
+        Returns:
+            (índices dos sinais executados, barra de saída, saiu por SL, saída encontrada)
+        """
+        n = len(l)
+        # BUY e SELL viram o mesmo problema: série adversa <= nível de SL ou
+        # série favorável >= nível de TP (SELL usa -high/-low e níveis no BID,
+        # pois fecha no ASK)
+        adverse = (l, -h)
+        favorable = (h, -l)
+        sl_cmp = np.where(is_buy, sl_level, -(sl_level - spread_px))
+        tp_cmp = np.where(is_buy, tp_level, -(tp_level - spread_px))
+
+        # Lista Python para bisect e acesso escalar barato
+        signals = signal_idx.tolist()
+        taken, exits, hits_sl, founds = [], [], [], []
+        open_exits = []  # heap com barra de saída das posições abertas
+        k = 0
+        m = len(signals)
+        while k < m:
+            bar = signals[k]
+            # Posições fechadas até o fechamento da barra do sinal
+            while open_exits and open_exits[0] <= bar:
+                heapq.heappop(open_exits)
+            if len(open_exits) >= max_trades:
+                # Limite atingido: pular até o sinal após o próximo fechamento
+                k = bisect.bisect_left(signals, open_exits[0], k)
+                continue
+
+            side = 0 if is_buy[k] else 1
+            exit_bar, hit_sl, found = self._scan_exit(
+                adverse[side], favorable[side], bar + 1, float(sl_cmp[k]), float(tp_cmp[k]), n
+            )
+            taken.append(k)
+            exits.append(exit_bar)
+            hits_sl.append(hit_sl)
+            founds.append(found)
+            heapq.heappush(open_exits, exit_bar)
+            k += 1
+
+        return (
+            np.asarray(taken, dtype=np.int64),
+            np.asarray(exits, dtype=np.int64),
+            np.asarray(hits_sl, dtype=bool),
+            np.asarray(founds, dtype=bool)
+        )
+
+    def _scan_exit(self, adverse, favorable, start, sl, tp, n):
+        """
+        Primeira barra a partir de start em que SL ou TP é atingido
+
+        Procura em janelas que dobram de tamanho. Se SL e TP caem na
+        mesma barra, considera SL.
+
+        Returns:
+            (barra de saída, saiu por SL, saída encontrada)
+        """
+        width = self.search_window
+        lo = start
+        while lo < n:
+            hi = min(lo + width, n)
+            sl_cross = adverse[lo:hi] <= sl
+            cross = sl_cross | (favorable[lo:hi] >= tp)
+            j = int(cross.argmax())
+            if cross[j]:
+                return lo + j, bool(sl_cross[j]), True
+            lo = hi
+            width *= 2
+        return n - 1, False, False
+
+    def _exit_prices(self, o, c, exit_idx, is_buy, hit_sl, found, sl_level, tp_level, spread_px):
+        """Preço de saída com gap na abertura (BUY sai no BID, SELL no ASK)"""
+        bar_open = o[exit_idx]
+        exit_price = c[exit_idx] + np.where(is_buy, 0.0, spread_px)
+        buy_sl = found & is_buy & hit_sl
+        buy_tp = found & is_buy & ~hit_sl
+        sell_sl = found & ~is_buy & hit_sl
+        sell_tp = found & ~is_buy & ~hit_sl
+        exit_price[buy_sl] = np.minimum(sl_level[buy_sl], bar_open[buy_sl])
+        exit_price[buy_tp] = np.maximum(tp_level[buy_tp], bar_open[buy_tp])
+        exit_price[sell_sl] = np.maximum(sl_level[sell_sl], bar_open[sell_sl] + spread_px)
+        exit_price[sell_tp] = np.minimum(tp_level[sell_tp], bar_open[sell_tp] + spread_px)
+        return exit_price
+
+    def _summary(self, trades: np.ndarray, balance: np.ndarray, initial_balance: float) -> Dict:
+        """Estatísticas do backtest"""
+        profits = trades["profit"]
+        wins = int((profits > 0).sum())
+        gross_profit = float(profits[profits > 0].sum())
+        gross_loss = float(-profits[profits < 0].sum())
+
+        equity = np.concatenate([[initial_balance], balance])
+        peak = np.maximum.accumulate(equity)
+        drawdown = peak - equity
+        dd_idx = int(drawdown.argmax()) if len(drawdown) else 0
+
+        return {
+            "trades": int(len(trades)),
+            "wins": wins,
+            "losses": int((profits < 0).sum()),
+            "win_rate": round(wins / len(trades), 4) if len(trades) else 0.0,
+            "total_points": round(float(trades["profit_points"].sum()), 1),
+            "net_profit": round(float(profits.sum()), 2),
+            "profit_factor": round(gross_profit / gross_loss, 3) if gross_loss > 0 else None,
+            "final_balance": round(float(equity[-1]), 2),
+            "max_drawdown": round(float(drawdown[dd_idx]), 2),
+            "max_drawdown_pct": round(float(drawdown[dd_idx] / peak[dd_idx] * 100), 2) if peak[dd_idx] else 0.0,
+        }
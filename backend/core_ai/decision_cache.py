@@ -0,0 +1,59 @@
+"""
+Cache de Decisões por Vela
+Evita reanalisar (e regravar) uma série enquanto nenhuma vela nova fechou
+"""
+
+import threading
+from typing import Dict, Hashable, Optional, Tuple
+
+class DecisionCache:
+    """
+    Última decisão da IA por série (symbol, timeframe)
+
+    A entrada só é válida para a mesma vela fechada e os mesmos parâmetros
+    da IA: chave = (symbol, timeframe, horário da última vela fechada,
+    hash dos parâmetros). Uma vela nova ou parâmetros alterados invalidam
+    a entrada automaticamente.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[Hashable, int, Dict]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol: str, timeframe: str, bar_time: Hashable, params: Hashable) -> Optional[Dict]:
+        """
+        Decisão em cache para a vela/parâmetros informados
+
+        Returns:
+            Dict da decisão ou None (miss)
+        """
+        with self._lock:
+            entry = self._entries.get((symbol, timeframe))
+            if entry is not None and entry[0] == bar_time and entry[1] == hash(params):
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def put(self, symbol: str, timeframe: str, bar_time: Hashable, params: Hashable, decision: Dict):
+        """Guarda a decisão da vela (substitui a anterior da série)"""
+        with self._lock:
+            self._entries[(symbol, timeframe)] = (bar_time, hash(params), decision)
+
+    def clear(self):
+        """Descarta todas as entradas (mantém os contadores)"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Contadores de acerto/erro do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "series": len(self._entries)
+            }
@@ -0,0 +1,174 @@
+"""
+Indicadores Incrementais (streaming)
+Atualiza RSI, médias móveis e MACD em O(1) por vela fechada
+"""
+
+import math
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+NAN = float("nan")
+
+class RunningSMA:
+    """Média móvel simples com soma acumulada"""
+
+    # Recalcular a soma periodicamente para não acumular erro de ponto flutuante
+    RESUM_EVERY = 1024
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque(maxlen=window)
+        self.total = 0.0
+        self._updates = 0
+
+    def update(self, value: float):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        self._updates += 1
+        if self._updates % self.RESUM_EVERY == 0:
+            self.total = math.fsum(self.values)
+
+    @property
+    def value(self) -> float:
+        if len(self.values) < self.window:
+            return NAN
+        return self.total / self.window
+
+class RunningEMA:
+    """
+    Média móvel exponencial (adjust=False, semente = primeiro valor)
+
+    Mesmo comportamento de pandas ewm(adjust=False, min_periods=min_periods),
+    usado pela biblioteca ta.
+    """
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.ema: Optional[float] = None
+        self.count = 0
+
+    @classmethod
+    def from_span(cls, span: int) -> "RunningEMA":
+        return cls(2.0 / (span + 1), span)
+
+    def update(self, value: float):
+        if self.ema is None:
+            self.ema = value
+        else:
+            self.ema += self.alpha * (value - self.ema)
+        self.count += 1
+
+    @property
+    def value(self) -> float:
+        if self.ema is None or self.count < self.min_periods:
+            return NAN
+        return self.ema
+
+class IncrementalIndicators:
+    """
+    Estado de indicadores de uma série (symbol, timeframe)
+
+    Produz as mesmas chaves e valores (até a tolerância de semente das EMAs)
+    de AIEngine._calculate_indicators, mas cada vela nova custa O(1)
+    independentemente do tamanho da janela.
+    """
+
+    def __init__(
+        self,
+        rsi_period: int = 14,
+        ma_fast: int = 9,
+        ma_slow: int = 21,
+        macd_fast: int = 12,
+        macd_slow: int = 26,
+        macd_signal: int = 9,
+        volume_window: int = 20
+    ):
+        self.rsi_period = rsi_period
+
+        # RSI de Wilder (ewm alpha=1/period); a primeira diferença conta como 0, como no ta
+        self._rsi_up = RunningEMA(1.0 / rsi_period, rsi_period)
+        self._rsi_down = RunningEMA(1.0 / rsi_period, rsi_period)
+
+        self._ma_fast = RunningSMA(ma_fast)
+        self._ma_slow = RunningSMA(ma_slow)
+
+        self._ema_fast = RunningEMA.from_span(macd_fast)
+        self._ema_slow = RunningEMA.from_span(macd_slow)
+        self._macd_signal = RunningEMA.from_span(macd_signal)
+
+        self._volume = RunningSMA(volume_window)
+        self._has_volume = False
+
+        self.prev_close: Optional[float] = None
+        self.close: Optional[float] = None
+        self.volume: Optional[float] = None
+        self.count = 0
+        self.last_time = None
+
+    def update(self, close: float, volume: Optional[float] = None, bar_time=None):
+        """Processa uma nova vela fechada"""
+        close = float(close)
+
+        diff = 0.0 if self.close is None else close - self.close
+        self._rsi_up.update(diff if diff > 0 else 0.0)
+        self._rsi_down.update(-diff if diff < 0 else 0.0)
+
+        self._ma_fast.update(close)
+        self._ma_slow.update(close)
+
+        self._ema_fast.update(close)
+        self._ema_slow.update(close)
+        macd = self._ema_fast.value - self._ema_slow.value
+        if not math.isnan(macd):
+            self._macd_signal.update(macd)
+
+        if volume is not None:
+            self._has_volume = True
+            self.volume = float(volume)
+            self._volume.update(self.volume)
+
+        self.prev_close, self.close = self.close, close
+        self.count += 1
+        self.last_time = bar_time
+
+    def seed(self, closes: Iterable[float], volumes: Optional[Iterable[float]] = None, times: Optional[Iterable] = None):
+        """Inicializa o estado a partir do histórico"""
+        closes = list(closes)
+        volumes = list(volumes) if volumes is not None else [None] * len(closes)
+        times = list(times) if times is not None else [None] * len(closes)
+        for close, volume, bar_time in zip(closes, volumes, times):
+            self.update(close, volume, bar_time)
+
+    @property
+    def rsi(self) -> float:
+        up, down = self._rsi_up.value, self._rsi_down.value
+        if math.isnan(up) or math.isnan(down):
+            return NAN
+        if down == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + up / down)
+
+    def values(self) -> Dict:
+        """Indicadores atuais (mesmas chaves de AIEngine._calculate_indicators)"""
+        macd = self._ema_fast.value - self._ema_slow.value
+        signal = self._macd_signal.value
+        indicators = {
+            'rsi': self.rsi,
+            'ma_fast': self._ma_fast.value,
+            'ma_slow': self._ma_slow.value,
+            'macd': macd,
+            'macd_signal': signal,
+            'macd_diff': macd - signal,
+            'current_price': self.close if self.close is not None else NAN,
+            'price_change': (
+                (self.close - self.prev_close) / self.prev_close * 100
+                if self.prev_close else NAN
+            ),
+        }
+        if self._has_volume:
+            indicators['volume_avg'] = self._volume.value
+            indicators['volume_current'] = self.volume
+        return indicators
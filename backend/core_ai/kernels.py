@@ -0,0 +1,162 @@
+"""
+Kernels de Indicadores em NumPy
+Funções vetorizadas ao longo do último eixo (barras); eixos anteriores
+(ex: símbolos) são processados juntos. Mesmas definições da biblioteca ta,
+sem depender de pandas/ta no caminho de análise
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+def ema(x: np.ndarray, alpha: float, min_periods: int = 0, block: int = 256) -> np.ndarray:
+    """
+    Média móvel exponencial (adjust=False, semente = primeiro valor)
+
+    Equivalente a pandas ewm(alpha=alpha, adjust=False, min_periods=min_periods).
+    A recursão é resolvida em blocos: dentro de cada bloco via produto de
+    matrizes, e apenas o valor de transporte entre blocos é sequencial.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = x.shape[-1]
+    if n == 0:
+        return x.copy()
+
+    lead = x.shape[:-1]
+    decay = 1.0 - alpha
+    size = min(block, n)
+    pad = (-n) % size
+    if pad:
+        x_padded = np.concatenate([x, np.zeros(lead + (pad,))], axis=-1)
+    else:
+        x_padded = x
+    n_blocks = x_padded.shape[-1] // size
+    blocks = x_padded.reshape(lead + (n_blocks, size))
+
+    weights, carry_weights = _ema_weights(alpha, size)
+    out = blocks @ weights.T
+
+    # Transporte entre blocos: y_i += carry * decay^(i + 1); semente y_0 = x_0
+    carry = x[..., 0].copy()
+    for k in range(n_blocks):
+        out[..., k, :] += carry[..., None] * carry_weights
+        carry = out[..., k, -1]
+
+    out = out.reshape(lead + (n_blocks * size,))[..., :n]
+    if min_periods > 1:
+        out[..., :min_periods - 1] = np.nan
+    return out
+
+@lru_cache(maxsize=64)
+def _ema_weights(alpha: float, size: int):
+    """
+    Matrizes da EMA em blocos (dependem só de alpha e do tamanho do bloco)
+
+    weights[i, j] = alpha * decay^(i - j) para j <= i; carry[i] = decay^(i + 1)
+    """
+    decay = 1.0 - alpha
+    idx = np.arange(size)
+    lag = idx[:, None] - idx[None, :]
+    weights = np.where(lag >= 0, alpha * decay ** np.maximum(lag, 0), 0.0)
+    carry = decay ** (idx + 1)
+    weights.flags.writeable = False
+    carry.flags.writeable = False
+    return weights, carry
+
+def ema_span(x: np.ndarray, span: int) -> np.ndarray:
+    """EMA com alpha = 2 / (span + 1) e min_periods = span (como ta.utils._ema)"""
+    return ema(x, 2.0 / (span + 1), span)
+
+def sma(x: np.ndarray, window: int) -> np.ndarray:
+    """Média móvel simples (NaN nas primeiras window - 1 barras)"""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    n = x.shape[-1]
+    if n < window:
+        return out
+    # Deslocar pela primeira barra para reduzir o erro da soma acumulada
+    base = x[..., :1]
+    csum = np.cumsum(x - base, axis=-1)
+    head = csum[..., window - 1:window]
+    tail = csum[..., window:] - csum[..., :-window]
+    out[..., window - 1:] = np.concatenate([head, tail], axis=-1) / window + base
+    return out
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI de Wilder (mesma definição de ta.momentum.RSIIndicator)"""
+    close = np.asarray(close, dtype=np.float64)
+    diff = np.diff(close, axis=-1, prepend=close[..., :1])
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    avg_up = ema(up, 1.0 / period, period)
+    avg_down = ema(down, 1.0 / period, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9):
+    """
+    MACD (mesma definição de ta.trend.MACD)
+
+    Returns:
+        (macd, macd_signal, macd_diff)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    line = ema_span(close, fast) - ema_span(close, slow)
+    signal_line = np.full(close.shape, np.nan)
+    start = max(fast, slow) - 1
+    if close.shape[-1] > start:
+        signal_line[..., start:] = ema_span(line[..., start:], signal)
+    return line, signal_line, line - signal_line
+
+def pct_change(close: np.ndarray) -> np.ndarray:
+    """Variação percentual barra a barra (NaN na primeira barra)"""
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(close.shape, np.nan)
+    out[..., 1:] = (close[..., 1:] - close[..., :-1]) / close[..., :-1] * 100
+    return out
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Desvio padrão populacional (ddof=0) em janela móvel (NaN nas primeiras window - 1 barras)"""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] < window:
+        return out
+    out[..., window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window, axis=-1).std(axis=-1)
+    return out
+
+def bollinger(close: np.ndarray, window: int = 20, window_dev: float = 2.0):
+    """
+    Bandas de Bollinger (mesma definição de ta.volatility.BollingerBands)
+
+    Returns:
+        (média, banda superior, banda inferior)
+    """
+    mavg = sma(close, window)
+    deviation = window_dev * rolling_std(close, window)
+    return mavg, mavg + deviation, mavg - deviation
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range; na primeira barra (sem fechamento anterior) vale high - low"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    prev_close = np.concatenate([close[..., :1], close[..., :-1]], axis=-1)
+    out = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    out[..., 0] = high[..., 0] - low[..., 0]
+    return out
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    ATR de Wilder (mesma definição de ta.volatility.AverageTrueRange)
+
+    Semente = média do true range das primeiras `period` barras; depois
+    atr_i = atr_{i-1} + (tr_i - atr_{i-1}) / period. NaN antes da semente
+    (ta preenche com 0).
+    """
+    tr = true_range(high, low, close)
+    out = np.full(tr.shape, np.nan)
+    if tr.shape[-1] < period:
+        return out
+    seed = tr[..., :period].mean(axis=-1, keepdims=True)
+    out[..., period - 1:] = ema(np.concatenate([seed, tr[..., period:]], axis=-1), 1.0 / period)
+    return out
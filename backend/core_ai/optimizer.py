@@ -0,0 +1,213 @@
+"""
+Otimizador de Parâmetros da IA
+Varredura (grade ou amostragem aleatória) paralela sobre o Backtester
+"""
+
+import csv
+import itertools
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from core_ai.backtest import Backtester
+from storage.candle_store import CANDLE_DTYPE, RECORD_SIZE
+
+# Parâmetros do AIEngine (definem os sinais); stop_loss/take_profit só afetam a simulação
+ENGINE_PARAMS = ("rsi_period", "ma_fast", "ma_slow", "macd_fast", "macd_slow", "macd_signal")
+
+DEFAULT_SPACE = {
+    "rsi_period": [7, 14, 21],
+    "ma_fast": [5, 9, 13],
+    "ma_slow": [21, 34, 50],
+    "macd_fast": [8, 12],
+    "macd_slow": [21, 26],
+    "macd_signal": [9],
+    "stop_loss": [30, 50, 100],
+    "take_profit": [50, 100, 200],
+}
+
+def grid(space: Dict[str, Sequence]) -> List[Dict]:
+    """Todas as combinações válidas do espaço de parâmetros"""
+    names = list(space)
+    combos = (dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names)))
+    return [params for params in combos if _valid(params)]
+
+def random_samples(space: Dict[str, Sequence], n: int, seed: Optional[int] = None) -> List[Dict]:
+    """
+    Amostras aleatórias (sem repetição) do espaço de parâmetros
+
+    Cada valor do espaço pode ser uma lista de opções ou uma tupla (min, max)
+    de inteiros inclusiva.
+    """
+    rng = random.Random(seed)
+    seen = set()
+    samples = []
+    attempts = 0
+    while len(samples) < n and attempts < n * 50:
+        attempts += 1
+        params = {
+            name: rng.randint(*values) if isinstance(values, tuple) else rng.choice(list(values))
+            for name, values in space.items()
+        }
+        key = tuple(sorted(params.items()))
+        if key in seen or not _valid(params):
+            continue
+        seen.add(key)
+        samples.append(params)
+    return samples
+
+def _valid(params: Dict) -> bool:
+    """Descarta combinações sem sentido (médias rápidas >= lentas)"""
+    if params.get("ma_fast", 0) >= params.get("ma_slow", float("inf")):
+        return False
+    if params.get("macd_fast", 0) >= params.get("macd_slow", float("inf")):
+        return False
+    return True
+
+# Estado por processo de trabalho (preenchido em _init_worker)
+_worker = {}
+
+def _init_worker(path: str, count: int):
+    """Mapeia o arquivo de velas uma vez por processo (sem cópia/pickle por tarefa)"""
+    _worker["candles"] = np.memmap(path, dtype=CANDLE_DTYPE, mode="r", shape=(count,))
+    _worker["backtester"] = Backtester()
+
+def _run_chunk(chunk: List[Dict], fixed: Dict) -> List[Dict]:
+    """Executa um bloco de combinações; sinais são reaproveitados entre SL/TP"""
+    candles = _worker["candles"]
+    backtester = _worker["backtester"]
+    engine = backtester.ai_engine
+    close = np.asarray(candles["close"])
+
+    results = []
+    cached_key, cached_actions = None, None
+    for params in chunk:
+        key = tuple(params.get(name, getattr(engine, name)) for name in ENGINE_PARAMS)
+        if key != cached_key:
+            for name, value in zip(ENGINE_PARAMS, key):
+                setattr(engine, name, value)
+            cached_key, cached_actions = key, backtester.signals(close)
+
+        run_params = dict(fixed)
+        for name in ("stop_loss", "take_profit", "max_simultaneous_trades"):
+            if name in params:
+                run_params[name] = params[name]
+
+        summary = backtester.run(candles, actions=cached_actions, **run_params)["summary"]
+        results.append({**params, **summary})
+    return results
+
+class ParameterOptimizer:
+    """
+    Varredura paralela de parâmetros do AIEngine (+ SL/TP)
+
+    - As velas são compartilhadas via arquivo memory-mapped: os processos
+      recebem apenas o caminho, nunca o array
+    - Combinações com os mesmos parâmetros de indicador vão para o mesmo
+      bloco, então os sinais são calculados uma vez por bloco
+    - Resultados ordenados por uma métrica configurável
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunks_per_worker: int = 4):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunks_per_worker = chunks_per_worker
+
+    def run(
+        self,
+        combos: List[Dict],
+        candles: Optional[np.ndarray] = None,
+        candles_path: Optional[str] = None,
+        sort_by: str = "net_profit",
+        ascending: bool = False,
+        min_trades: int = 1,
+        progress: Optional[Callable[[int, int], None]] = None,
+        **fixed
+    ) -> Dict:
+        """
+        Avalia as combinações em paralelo
+
+        Args:
+            combos: Lista de parâmetros (grid() ou random_samples())
+            candles: Array CANDLE_DTYPE (gravado em arquivo temporário)
+            candles_path: Arquivo .bin do CandleStore (usado diretamente)
+            sort_by: Métrica do summary usada no ranking
+            ascending: Ordem crescente (ex: max_drawdown)
+            min_trades: Descarta resultados com menos trades
+            progress: Callback(concluídas, total)
+            **fixed: Parâmetros fixos do Backtester.run (spread, point, volume...)
+
+        Returns:
+            Dict com results (ordenados), combos, seconds e combos_per_second
+        """
+        if candles_path is None and candles is None:
+            raise ValueError("Informe candles ou candles_path")
+
+        start = time.perf_counter()
+        temp_path = None
+        if candles_path is None:
+            fd, temp_path = tempfile.mkstemp(suffix=".bin")
+            os.close(fd)
+            np.ascontiguousarray(candles, dtype=CANDLE_DTYPE).tofile(temp_path)
+            candles_path = temp_path
+
+        try:
+            count = os.path.getsize(candles_path) // RECORD_SIZE
+            chunks = self._chunks(combos)
+            results = []
+
+            # Um thread de BLAS por processo para a escala ficar linear com os núcleos
+            for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+                os.environ.setdefault(var, "1")
+
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(candles_path, count)
+            ) as pool:
+                futures = [pool.submit(_run_chunk, chunk, fixed) for chunk in chunks]
+                for future in as_completed(futures):
+                    results.extend(future.result())
+                    if progress:
+                        progress(len(results), len(combos))
+        finally:
+            if temp_path:
+                os.remove(temp_path)
+
+        results = [r for r in results if r.get("trades", 0) >= min_trades]
+        # Métrica ausente (ex: profit_factor sem perdas) vai para o fim
+        ranked = [r for r in results if r.get(sort_by) is not None]
+        ranked.sort(key=lambda r: r[sort_by], reverse=not ascending)
+        results = ranked + [r for r in results if r.get(sort_by) is None]
+
+        elapsed = time.perf_counter() - start
+        return {
+            "results": results,
+            "combos": len(combos),
+            "seconds": round(elapsed, 3),
+            "combos_per_second": round(len(combos) / elapsed, 2) if elapsed > 0 else 0.0
+        }
+
+    def _chunks(self, combos: List[Dict]) -> List[List[Dict]]:
+        """Divide as combinações mantendo juntas as que compartilham sinais"""
+        ordered = sorted(combos, key=lambda p: tuple(p.get(name, 0) for name in ENGINE_PARAMS))
+        n_chunks = max(1, min(len(ordered), self.workers * self.chunks_per_worker))
+        size = -(-len(ordered) // n_chunks)
+        return [ordered[i:i + size] for i in range(0, len(ordered), size)]
+
+    @staticmethod
+    def write_table(results: List[Dict], path: str):
+        """Grava a tabela de resultados em CSV"""
+        if not results:
+            return
+        columns = list(results[0])
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(results)
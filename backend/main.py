@@ -6,13 +6,9 @@ FastAPI server para gerenciar o sistema de trading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-import uvicorn
 
-from api.routes import router
-from services.bot_service import BotService
-
-# Instância global do serviço do bot
-bot_service = BotService()
+from api.routes import router, blocking
+from services.container import container
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -22,7 +18,9 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown
     print("🛑 Encerrando AI Trading Bot Backend...")
-    bot_service.stop()
+    # Não esperar chamadas longas (backfill); as da fila são canceladas
+    blocking.shutdown(wait=False)
+    container.shutdown()
 
 app = FastAPI(
     title="AI Trading Bot API",
@@ -53,6 +51,9 @@ async def root():
     }
 
 if __name__ == "__main__":
+    # Só necessário para rodar o servidor direto (não no import de main:app)
+    import uvicorn
+
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -3,7 +3,7 @@ Modelos Pydantic para validação de dados
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, Literal, List
+from typing import Optional, Literal, List, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -31,6 +31,7 @@ class BotConfig(BaseModel):
     magic_number: int = Field(default=234000, description="Magic Number")
     max_simultaneous_trades: int = Field(default=1, ge=1, le=10, description="Máximo de trades simultâneos")
     analysis_interval: int = Field(default=60, ge=10, description="Intervalo de análise em segundos")
+    max_workers: int = Field(default=4, ge=1, le=16, description="Workers de análise/execução por símbolo")
     demo_mode: bool = Field(default=True, description="Modo DEMO (obrigatório)")
 
 class AIDecision(BaseModel):
@@ -70,6 +71,8 @@ class MonitoredAsset(BaseModel):
     active: bool = Field(default=True, description="Status ativo/inativo")
     timeframes: List[str] = Field(default=["H1"], description="Lista de timeframes configurados")
     last_candle_time: Optional[datetime] = Field(None, description="Timestamp da última vela coletada")
+    trading: bool = Field(default=False, description="Operar este ativo (estratégia por timeframe)")
+    overrides: Dict = Field(default_factory=dict, description="Sobrescritas da BotConfig (volume, stop_loss, take_profit, max_simultaneous_trades)")
 
 class AssetList(BaseModel):
     """Lista de ativos monitorados"""
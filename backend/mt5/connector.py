@@ -3,19 +3,34 @@ Conector MetaTrader 5
 Gerencia conexão e operações com MT5
 """
 
-import MetaTrader5 as mt5
-import pandas as pd
-from datetime import datetime
-from typing import Optional, Dict, List
+from mt5.gateway import mt5
+from mt5.health import ConnectionHealth
+from mt5.market_data import MarketDataCache
+from mt5.rates import closed_rates, rates_to_frame
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Tuple
 from models.schemas import Timeframe
+from storage.candle_store import CandleStore
+from storage.candle_window import CandleWindow
 import pytz
 
 class MT5Connector:
     """Gerenciador de conexão e operações MT5"""
     
-    def __init__(self):
+    def __init__(self, probe_interval_ms: int = 1000):
         self.connected = False
         self.account_info = None
+        # Saúde da conexão: is_connected() só lê a flag, o probe roda em segundo plano
+        self.health = ConnectionHealth(
+            probe=self._probe,
+            reconnect=self._reconnect,
+            probe_interval_ms=probe_interval_ms
+        )
+        # Especificação/tick por símbolo, compartilhado com TradeManager
+        self.market_data = MarketDataCache()
+        # Janelas deslizantes de velas fechadas por (symbol, timeframe)
+        self.windows: Dict[Tuple[str, Timeframe], CandleWindow] = {}
     
     def connect(self) -> Dict:
         """
@@ -56,6 +71,9 @@ class MT5Connector:
             
             self.connected = True
             self.account_info = account_info
+            self.market_data.invalidate()
+            self.health.mark_connected()
+            self.health.start()
             
             return {
                 "success": True,
@@ -82,15 +100,163 @@ class MT5Connector:
     def disconnect(self):
         """Desconecta do MT5"""
         if self.connected:
+            self.health.stop("Desconectado pelo usuário")
             mt5.shutdown()
             self.connected = False
             self.account_info = None
     
     def is_connected(self) -> bool:
-        """Verifica se está conectado"""
-        return self.connected and mt5.initialize()
+        """Verifica se está conectado (flag mantida por ConnectionHealth, sem chamar o MT5)"""
+        return self.connected and self.health.connected
     
-    def get_candles(self, symbol: str, timeframe: Timeframe, count: int = 100) -> Optional[pd.DataFrame]:
+    def _probe(self) -> bool:
+        """Probe leve: terminal inicializado e conectado ao servidor"""
+        info = mt5.terminal_info()
+        return info is not None and bool(info.connected)
+    
+    def _reconnect(self) -> bool:
+        """Reinicializa o terminal (usado pelo backoff de ConnectionHealth)"""
+        mt5.shutdown()
+        return bool(self.connect().get("connected"))
+    
+    def _mt5_timeframe(self, timeframe: Timeframe) -> int:
+        """Mapeia Timeframe para a constante do MT5"""
+        tf_map = {
+            Timeframe.M1: mt5.TIMEFRAME_M1,
+            Timeframe.M5: mt5.TIMEFRAME_M5,
+            Timeframe.M15: mt5.TIMEFRAME_M15,
+            Timeframe.M30: mt5.TIMEFRAME_M30,
+            Timeframe.H1: mt5.TIMEFRAME_H1,
+        }
+        return tf_map.get(timeframe, mt5.TIMEFRAME_M15)
+    
+    @staticmethod
+    def period_seconds(timeframe: Timeframe) -> int:
+        """Duração da vela do timeframe em segundos"""
+        minutes = {
+            Timeframe.M1: 1,
+            Timeframe.M5: 5,
+            Timeframe.M15: 15,
+            Timeframe.M30: 30,
+            Timeframe.H1: 60,
+        }
+        return minutes.get(timeframe, 15) * 60
+    
+    def server_time(self, symbol: str) -> Optional[int]:
+        """
+        Horário do servidor da corretora (time do último tick do símbolo)
+        
+        Mesma referência do campo time das velas, que não é UTC.
+        
+        Returns:
+            Epoch (segundos) ou None se não houver tick
+        """
+        tick = self.market_data.tick(symbol)
+        return int(tick.time) if tick is not None else None
+    
+    def get_rates_range(self, symbol: str, timeframe: Timeframe, date_from: datetime, date_to: datetime):
+        """
+        Obtém velas de um intervalo em uma única chamada (copy_rates_range)
+        
+        Args:
+            symbol: Par de moedas (ex: EURUSD)
+            timeframe: Timeframe
+            date_from: Início do intervalo (UTC)
+            date_to: Fim do intervalo (UTC)
+            
+        Returns:
+            Array estruturado do MT5 (time, open, high, low, close, tick_volume, ...)
+            ou None em caso de erro
+        """
+        if not self.is_connected():
+            return None
+        
+        try:
+            rates = mt5.copy_rates_range(symbol, self._mt5_timeframe(timeframe), date_from, date_to)
+            if rates is None:
+                print(f"Erro ao obter intervalo de candles: {mt5.last_error()}")
+            return rates
+        except Exception as e:
+            print(f"Erro ao obter intervalo de candles: {e}")
+            return None
+    
+    def get_last_closed_bar_time(self, symbol: str, timeframe: Timeframe) -> Optional[int]:
+        """
+        Horário de abertura da última vela fechada (consulta de uma única vela)
+        
+        Mesmo formato do campo time de get_candle_window, para comparar sem
+        baixar velas.
+        
+        Returns:
+            Epoch (segundos) ou None em caso de erro
+        """
+        if not self.is_connected():
+            return None
+        
+        try:
+            # Posição 1 está fechada; a posição 0 (em formação, ou a que acabou de
+            # fechar sem tick novo) é decidida pelo horário do servidor
+            rates = mt5.copy_rates_from_pos(symbol, self._mt5_timeframe(timeframe), 0, 2)
+            if rates is None or len(rates) == 0:
+                return None
+            rates = closed_rates(rates, self.period_seconds(timeframe), self.server_time(symbol))
+            if len(rates) == 0:
+                return None
+            return int(rates['time'][-1])
+        except Exception as e:
+            print(f"Erro ao obter última vela fechada: {e}")
+            return None
+    
+    def get_candle_window(self, symbol: str, timeframe: Timeframe, count: int = 100) -> Optional[np.ndarray]:
+        """
+        Últimas velas FECHADAS da série, mantidas em memória entre chamadas
+        
+        Na primeira chamada busca `count` velas; nas seguintes pede ao MT5
+        apenas as velas posteriores à última da janela. Só entram velas já
+        fechadas (ver closed_rates: a mais recente é comparada com o horário
+        do servidor, não com UTC).
+        
+        Args:
+            symbol: Par de moedas (ex: EURUSD)
+            timeframe: Timeframe
+            count: Tamanho da janela
+            
+        Returns:
+            Array CANDLE_DTYPE somente leitura (view sem cópia, válida até a
+            próxima chamada para a série; use CandleWindow.to_frame para
+            DataFrame) ou None em caso de erro
+        """
+        if not self.is_connected():
+            return None
+        
+        key = (symbol, timeframe)
+        window = self.windows.get(key)
+        if window is None or window.size < count:
+            window = self.windows[key] = CandleWindow(count)
+        
+        try:
+            mt5_timeframe = self._mt5_timeframe(timeframe)
+            if len(window) == 0:
+                rates = mt5.copy_rates_from_pos(symbol, mt5_timeframe, 0, window.size + 1)
+            else:
+                date_from = datetime.fromtimestamp(window.last_time + 1, tz=pytz.UTC)
+                date_to = datetime.now(pytz.UTC) + timedelta(days=1)
+                rates = mt5.copy_rates_range(symbol, mt5_timeframe, date_from, date_to)
+            
+            if rates is None:
+                print(f"Erro ao atualizar janela de candles: {mt5.last_error()}")
+                return None
+            
+            # A última vela do MT5 pode estar em formação (ou já fechada, sem tick novo)
+            closed = closed_rates(rates, self.period_seconds(timeframe), self.server_time(symbol))
+            window.extend(CandleStore.from_rates(closed))
+            return window.view()[-count:]
+            
+        except Exception as e:
+            print(f"Erro ao atualizar janela de candles: {e}")
+            return None
+    
+    def get_candles(self, symbol: str, timeframe: Timeframe, count: int = 100, as_array: bool = False):
         """
         Obtém candles históricos
         
@@ -98,24 +264,18 @@ class MT5Connector:
             symbol: Par de moedas (ex: EURUSD)
             timeframe: Timeframe (M1, M5, M15, etc)
             count: Número de candles
+            as_array: Retornar o array estruturado do MT5 sem conversão
+                      (campos de RATES_DTYPE, time em epoch; colunas são
+                      views: candles["close"])
             
         Returns:
-            DataFrame com OHLCV ou None em caso de erro
+            DataFrame com OHLCV (ou array estruturado) ou None em caso de erro
         """
         if not self.is_connected():
             return None
         
         try:
-            # Mapear timeframe
-            tf_map = {
-                Timeframe.M1: mt5.TIMEFRAME_M1,
-                Timeframe.M5: mt5.TIMEFRAME_M5,
-                Timeframe.M15: mt5.TIMEFRAME_M15,
-                Timeframe.M30: mt5.TIMEFRAME_M30,
-                Timeframe.H1: mt5.TIMEFRAME_H1,
-            }
-            
-            mt5_timeframe = tf_map.get(timeframe, mt5.TIMEFRAME_M15)
+            mt5_timeframe = self._mt5_timeframe(timeframe)
             
             # Obter candles
             rates = mt5.copy_rates_from_pos(symbol, mt5_timeframe, 0, count)
@@ -123,21 +283,10 @@ class MT5Connector:
             if rates is None or len(rates) == 0:
                 return None
             
-            # Converter para DataFrame
-            df = pd.DataFrame(rates)
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            df.set_index('time', inplace=True)
-            
-            # Renomear colunas para minúsculas
-            df.rename(columns={
-                'open': 'open',
-                'high': 'high',
-                'low': 'low',
-                'close': 'close',
-                'tick_volume': 'volume'
-            }, inplace=True)
+            if as_array:
+                return rates
             
-            return df[['open', 'high', 'low', 'close', 'volume']]
+            return rates_to_frame(rates)
             
         except Exception as e:
             print(f"Erro ao obter candles: {e}")
@@ -154,7 +303,7 @@ class MT5Connector:
             return None
         
         try:
-            tick = mt5.symbol_info_tick(symbol)
+            tick = self.market_data.tick(symbol)
             if tick is None:
                 return None
             
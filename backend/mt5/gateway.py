@@ -0,0 +1,256 @@
+"""
+Gateway de Acesso ao MetaTrader5
+Uma única thread é dona do terminal; as demais enviam pedidos por uma fila
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Optional
+
+import MetaTrader5 as _mt5
+
+# Leituras sem efeito colateral: pedidos idênticos em andamento são agrupados
+READ_CALLS = frozenset({
+    "account_info",
+    "terminal_info",
+    "symbol_info",
+    "symbol_info_tick",
+    "symbols_get",
+    "copy_rates_from",
+    "copy_rates_from_pos",
+    "copy_rates_range",
+    "copy_ticks_from",
+    "copy_ticks_range",
+    "positions_get",
+    "positions_total",
+    "orders_get",
+    "history_deals_get",
+})
+
+# Chamadas com efeito no servidor: após o timeout não podem ser dadas como falhas
+TRADE_CALLS = frozenset({"order_send"})
+
+class OrderOutcomeUnknown(TimeoutError):
+    """Ordem entregue ao terminal sem resposta a tempo: pode ter sido executada"""
+
+class MT5Gateway:
+    """
+    Proxy do módulo MetaTrader5 com thread dona
+
+    - Todas as funções do MetaTrader5 (rates, ticks, posições, order_send,
+      initialize...) são executadas na thread do gateway, nunca em
+      paralelo e sempre na mesma thread que inicializou o terminal
+    - Chamadores recebem um Future (submit) ou awaitable (call_async);
+      o acesso por atributo (mt5.copy_rates_from_pos(...)) bloqueia até
+      o resultado, mantendo a API do módulo
+    - Leituras idênticas já na fila ou em execução são agrupadas em um
+      único pedido ao terminal (READ_CALLS)
+    - A thread drena a fila em lotes; profundidade da fila e latência por
+      função ficam em get_stats()
+    - TRADE_CALLS no timeout: se ainda na fila, são canceladas (nunca
+      chegam ao terminal); se já em execução, o chamador espera mais
+      trade_grace segundos e então recebe OrderOutcomeUnknown
+
+    Constantes (TIMEFRAME_*, ORDER_TYPE_*, ...) são repassadas sem alteração.
+    Uso: `from mt5.gateway import mt5` no lugar de `import MetaTrader5 as mt5`.
+    """
+
+    def __init__(self, module, timeout: float = 30.0, trade_grace: float = 60.0):
+        self._module = module
+        self.timeout = timeout
+        self.trade_grace = trade_grace
+        self._queue: "queue.Queue" = queue.Queue()
+        self._inflight: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._local = threading.local()
+        self._wrapped: Dict[str, object] = {}
+        self._stats = {
+            "requests": 0, "coalesced": 0, "batches": 0, "max_queue_depth": 0, "max_batch": 0,
+            "trades_cancelled": 0, "trades_unknown": 0
+        }
+        self._calls: Dict[str, Dict] = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        if not callable(attr):
+            return attr
+
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            if name == "last_error":
+                wrapped = self._last_error
+            else:
+                def wrapped(*args, **kwargs):
+                    return self.call(name, *args, **kwargs)
+                wrapped.__name__ = name
+            self._wrapped[name] = wrapped
+        return wrapped
+
+    def submit(self, name: str, *args, **kwargs) -> Future:
+        """
+        Enfileira uma chamada ao MetaTrader5
+
+        Returns:
+            Future com o resultado da função
+        """
+        key = self._key(name, args, kwargs)
+        with self._lock:
+            if key is not None:
+                future = self._inflight.get(key)
+                if future is not None:
+                    self._stats["coalesced"] += 1
+                    return future
+
+            future = Future()
+            if key is not None:
+                self._inflight[key] = future
+            self._stats["requests"] += 1
+            self._ensure_thread()
+            self._queue.put((key, name, args, kwargs, future, time.perf_counter()))
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queue.qsize())
+        return future
+
+    def call(self, name: str, *args, **kwargs):
+        """Executa a chamada no gateway e aguarda o resultado"""
+        if threading.current_thread() is self._thread:
+            # Chamada de dentro do gateway: executar direto (evita deadlock)
+            return getattr(self._module, name)(*args, **kwargs)
+
+        future = self.submit(name, *args, **kwargs)
+        if name in TRADE_CALLS:
+            result, error = self._wait_trade(name, future)
+        else:
+            result, error = future.result(timeout=self.timeout)
+        self._local.last_error = error
+        return result
+
+    def _wait_trade(self, name: str, future: Future):
+        """Aguarda uma chamada de TRADE_CALLS sem transformar timeout em falha silenciosa"""
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                with self._lock:
+                    self._stats["trades_cancelled"] += 1
+                raise TimeoutError(f"{name} cancelada: não saiu da fila do gateway em {self.timeout:g}s")
+        # Já está no terminal: o resultado importa mais que a latência
+        try:
+            return future.result(timeout=self.trade_grace)
+        except FutureTimeoutError:
+            with self._lock:
+                self._stats["trades_unknown"] += 1
+            raise OrderOutcomeUnknown(
+                f"{name} sem resposta do terminal após {self.timeout + self.trade_grace:g}s; "
+                "conferir posições e ordens no MT5"
+            )
+
+    async def call_async(self, name: str, *args, **kwargs):
+        """Versão awaitable de call() para handlers assíncronos"""
+        result, error = await asyncio.wrap_future(self.submit(name, *args, **kwargs))
+        self._local.last_error = error
+        return result
+
+    def _last_error(self):
+        """Erro da última chamada desta thread que falhou (None/False)"""
+        error = getattr(self._local, "last_error", None)
+        return error if error is not None else self.call("last_error")
+
+    def _key(self, name: str, args: tuple, kwargs: Dict) -> Optional[tuple]:
+        """Chave de agrupamento (None = não agrupar)"""
+        if name not in READ_CALLS:
+            return None
+        key = (name, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="mt5-gateway", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Thread dona do terminal: drena a fila em lotes"""
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+
+            for key, name, args, kwargs, future, queued in batch:
+                self._execute(key, name, args, kwargs, future, queued)
+
+    def _execute(self, key, name, args, kwargs, future, queued):
+        if not future.set_running_or_notify_cancel():
+            return  # cancelada na fila por timeout (TRADE_CALLS)
+        started = time.perf_counter()
+        try:
+            result = getattr(self._module, name)(*args, **kwargs)
+            # last_error é por thread no terminal: capturar aqui, junto da falha
+            error = self._module.last_error() if result is None or result is False else None
+            outcome = (result, error)
+            failure = None
+        except Exception as e:
+            outcome = None
+            failure = e
+        finished = time.perf_counter()
+
+        with self._lock:
+            if key is not None:
+                self._inflight.pop(key, None)
+            self._record(name, started - queued, finished - started, failure is not None)
+
+        if failure is not None:
+            future.set_exception(failure)
+        else:
+            future.set_result(outcome)
+
+    def _record(self, name: str, wait: float, busy: float, failed: bool):
+        stats = self._calls.get(name)
+        if stats is None:
+            stats = self._calls[name] = {
+                "calls": 0, "errors": 0,
+                "wait_ms_total": 0.0, "wait_ms_max": 0.0,
+                "exec_ms_total": 0.0, "exec_ms_max": 0.0
+            }
+        stats["calls"] += 1
+        stats["errors"] += int(failed)
+        stats["wait_ms_total"] += wait * 1000
+        stats["wait_ms_max"] = max(stats["wait_ms_max"], wait * 1000)
+        stats["exec_ms_total"] += busy * 1000
+        stats["exec_ms_max"] = max(stats["exec_ms_max"], busy * 1000)
+
+    def get_stats(self) -> Dict:
+        """Profundidade da fila, agrupamentos e latência por função"""
+        with self._lock:
+            stats = dict(self._stats)
+            calls = {name: dict(value) for name, value in self._calls.items()}
+
+        stats["queue_depth"] = self._queue.qsize()
+        stats["inflight_reads"] = len(self._inflight)
+        for value in calls.values():
+            wait_total = value.pop("wait_ms_total")
+            exec_total = value.pop("exec_ms_total")
+            value["wait_ms_avg"] = wait_total / value["calls"]
+            value["exec_ms_avg"] = exec_total / value["calls"]
+            for k, v in value.items():
+                if isinstance(v, float):
+                    value[k] = round(v, 3)
+        stats["calls"] = calls
+        return stats
+
+# Instância global (única porta de entrada para o MetaTrader5)
+mt5 = MT5Gateway(_mt5)
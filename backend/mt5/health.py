@@ -0,0 +1,158 @@
+"""
+Saúde da Conexão MT5
+Verificação leve e periódica do terminal, com reconexão em backoff exponencial
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+CONNECTED = "CONNECTED"
+RECONNECTING = "RECONNECTING"
+DISCONNECTED = "DISCONNECTED"
+
+class ConnectionHealth:
+    """
+    Estado de saúde da conexão com o terminal
+
+    - Caminhos quentes leem apenas a flag `connected` (sem chamar o MT5)
+    - Uma thread em segundo plano executa `probe` a cada probe_interval_ms
+      enquanto conectado
+    - Se o probe falha, tenta `reconnect` com backoff exponencial
+      (backoff_initial, dobrando até backoff_max)
+    - Transições de estado são entregues aos inscritos (subscribe) e
+      guardadas em `transitions`
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], bool],
+        reconnect: Callable[[], bool],
+        probe_interval_ms: int = 1000,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 60.0
+    ):
+        self.probe = probe
+        self.reconnect = reconnect
+        self.probe_interval = probe_interval_ms / 1000
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self.state = DISCONNECTED
+        self.transitions: deque = deque(maxlen=50)
+        self._listeners: List[Callable[[str, str, Optional[str]], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "probes": 0,
+            "probe_failures": 0,
+            "reconnect_attempts": 0,
+            "last_probe_ms": 0.0,
+            "next_retry_in": None
+        }
+
+    @property
+    def connected(self) -> bool:
+        """Flag de conexão (leitura sem custo)"""
+        return self.state == CONNECTED
+
+    def subscribe(self, listener: Callable[[str, str, Optional[str]], None]):
+        """Registra callback(estado_anterior, novo_estado, motivo)"""
+        self._listeners.append(listener)
+
+    def mark_connected(self):
+        """Conexão estabelecida (chamado por MT5Connector.connect)"""
+        self._set_state(CONNECTED)
+
+    def start(self):
+        """Inicia o monitoramento em segundo plano"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                # Monitor ativo, ou connect() chamado pelo próprio monitor (reconexão)
+                if not self._stop.is_set() or self._thread is threading.current_thread():
+                    return
+            # Um evento de parada por thread: a anterior, ainda terminando um
+            # probe ou reconexão após stop(), sai sozinha sem bloquear a nova
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), name="mt5-health", daemon=True)
+            self._thread.start()
+
+    def stop(self, reason: Optional[str] = None):
+        """Encerra o monitoramento (desconexão pedida pelo usuário)"""
+        with self._lock:
+            self._stop.set()
+        self._set_state(DISCONNECTED, reason)
+
+    def _run(self, stop: threading.Event):
+        delay = self.probe_interval
+        backoff = self.backoff_initial
+        while not stop.wait(delay):
+            if self.state == CONNECTED:
+                if self._probe():
+                    delay = self.probe_interval
+                    continue
+                self._set_state(RECONNECTING, "Terminal não respondeu ao probe")
+                backoff = self.backoff_initial
+
+            self._stats["reconnect_attempts"] += 1
+            try:
+                ok = self.reconnect()
+            except Exception as e:
+                print(f"Erro ao reconectar MT5: {e}")
+                ok = False
+
+            if stop.is_set():
+                break
+            if ok:
+                self._set_state(CONNECTED, "Reconectado")
+                self._stats["next_retry_in"] = None
+                delay = self.probe_interval
+                backoff = self.backoff_initial
+            else:
+                self._set_state(RECONNECTING, "Falha ao reconectar")
+                self._stats["next_retry_in"] = backoff
+                delay = backoff
+                backoff = min(backoff * 2, self.backoff_max)
+
+    def _probe(self) -> bool:
+        start = time.perf_counter()
+        try:
+            ok = bool(self.probe())
+        except Exception as e:
+            print(f"Erro no probe do MT5: {e}")
+            ok = False
+        self._stats["probes"] += 1
+        self._stats["last_probe_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        if not ok:
+            self._stats["probe_failures"] += 1
+        return ok
+
+    def _set_state(self, state: str, reason: Optional[str] = None):
+        with self._lock:
+            previous = self.state
+            if previous == state:
+                return
+            self.state = state
+            self.transitions.append({
+                "from": previous,
+                "to": state,
+                "reason": reason,
+                "timestamp": datetime.now().isoformat()
+            })
+
+        for listener in list(self._listeners):
+            try:
+                listener(previous, state, reason)
+            except Exception as e:
+                print(f"Erro ao notificar transição de conexão: {e}")
+
+    def get_stats(self) -> Dict:
+        """Estado atual, contadores e últimas transições"""
+        stats = dict(self._stats)
+        stats["state"] = self.state
+        stats["probe_interval_ms"] = int(self.probe_interval * 1000)
+        stats["transitions"] = list(self.transitions)[-10:]
+        return stats
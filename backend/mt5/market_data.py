@@ -0,0 +1,96 @@
+"""
+Cache de Dados de Mercado
+Especificação do símbolo (quase estática) e tick (snapshot de TTL curto)
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from mt5.gateway import mt5
+
+class MarketDataCache:
+    """
+    Cache de symbol_info e symbol_info_tick por símbolo
+
+    - Especificação (point, digits, filling_mode, volume_step...) muda
+      raramente: mantida por spec_ttl segundos
+    - Tick é um snapshot: reaproveitado por tick_ttl segundos (padrão 250 ms),
+      o suficiente para uma rodada de validações pré-trade
+    - snapshot() busca o que falta de especificação e tick juntos: os dois
+      pedidos entram no mesmo lote do gateway (uma ida ao terminal)
+    """
+
+    def __init__(self, spec_ttl: float = 3600.0, tick_ttl: float = 0.25):
+        self.spec_ttl = spec_ttl
+        self.tick_ttl = tick_ttl
+        self._specs: Dict[str, Tuple[float, object]] = {}
+        self._ticks: Dict[str, Tuple[float, object]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"spec_hits": 0, "spec_misses": 0, "tick_hits": 0, "tick_misses": 0}
+
+    def spec(self, symbol: str):
+        """Especificação do símbolo (symbol_info) ou None"""
+        return self.snapshot(symbol, tick=False)[0]
+
+    def tick(self, symbol: str):
+        """Último tick do símbolo (symbol_info_tick) ou None"""
+        return self.snapshot(symbol, spec=False)[1]
+
+    def snapshot(self, symbol: str, spec: bool = True, tick: bool = True) -> Tuple[Optional[object], Optional[object]]:
+        """
+        Especificação e tick do símbolo com no máximo uma ida ao terminal
+
+        Returns:
+            (symbol_info, symbol_info_tick); None para o que não foi pedido ou falhou
+        """
+        now = time.monotonic()
+        cached_spec = self._get(self._specs, symbol, self.spec_ttl, now, "spec") if spec else None
+        cached_tick = self._get(self._ticks, symbol, self.tick_ttl, now, "tick") if tick else None
+
+        spec_future = mt5.submit("symbol_info", symbol) if spec and cached_spec is None else None
+        tick_future = mt5.submit("symbol_info_tick", symbol) if tick and cached_tick is None else None
+
+        if spec_future is not None:
+            cached_spec = spec_future.result(timeout=mt5.timeout)[0]
+            self._put(self._specs, symbol, cached_spec)
+        if tick_future is not None:
+            cached_tick = tick_future.result(timeout=mt5.timeout)[0]
+            self._put(self._ticks, symbol, cached_tick)
+
+        return cached_spec, cached_tick
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """Descarta especificação e tick (de um símbolo ou de todos)"""
+        with self._lock:
+            if symbol is None:
+                self._specs.clear()
+                self._ticks.clear()
+            else:
+                self._specs.pop(symbol, None)
+                self._ticks.pop(symbol, None)
+
+    def _get(self, store: Dict, symbol: str, ttl: float, now: float, kind: str):
+        with self._lock:
+            entry = store.get(symbol)
+            if entry is not None and now - entry[0] < ttl:
+                self._stats[f"{kind}_hits"] += 1
+                return entry[1]
+            self._stats[f"{kind}_misses"] += 1
+            return None
+
+    def _put(self, store: Dict, symbol: str, value):
+        if value is None:
+            return
+        with self._lock:
+            store[symbol] = (time.monotonic(), value)
+
+    def get_stats(self) -> Dict:
+        """Acertos/erros e taxa de acerto de especificação e tick"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["symbols"] = len(self._specs)
+        for kind in ("spec", "tick"):
+            lookups = stats[f"{kind}_hits"] + stats[f"{kind}_misses"]
+            stats[f"{kind}_hit_ratio"] = round(stats[f"{kind}_hits"] / lookups, 4) if lookups else 0.0
+        return stats
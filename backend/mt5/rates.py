@@ -0,0 +1,57 @@
+"""
+Formato dos Rates do MT5
+Layout do array retornado por copy_rates_* e conversão para DataFrame
+"""
+
+from typing import Optional
+
+import numpy as np
+
+# Layout de copy_rates_from_pos/copy_rates_range (time em epoch, segundos)
+RATES_DTYPE = np.dtype([
+    ("time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("tick_volume", "<u8"),
+    ("spread", "<i4"),
+    ("real_volume", "<u8"),
+])
+
+def closed_rates(rates: np.ndarray, period_seconds: int, server_time: Optional[int]) -> np.ndarray:
+    """
+    Apenas as velas já fechadas de um array que termina na vela mais recente
+
+    O time das velas é o horário do servidor da corretora (muitas vezes
+    UTC+2/+3), não UTC: por isso a decisão é pela posição. Todas as velas
+    antes da última estão fechadas; a última (em formação, ou a que acabou
+    de fechar se ainda não houve tick depois do fechamento) só entra se
+    time + período <= server_time, o time do último tick do símbolo.
+    Sem server_time ela é descartada.
+    """
+    if len(rates) == 0:
+        return rates
+    if server_time is not None and int(rates["time"][-1]) + period_seconds <= server_time:
+        return rates
+    return rates[:-1]
+
+def rates_to_frame(rates: np.ndarray):
+    """Converte rates do MT5 em DataFrame OHLCV indexado por tempo"""
+    # pandas só é importado por quem pede DataFrame (fora do caminho de análise)
+    import pandas as pd
+
+    df = pd.DataFrame(rates)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    df.set_index('time', inplace=True)
+
+    # Renomear colunas para minúsculas
+    df.rename(columns={
+        'open': 'open',
+        'high': 'high',
+        'low': 'low',
+        'close': 'close',
+        'tick_volume': 'volume'
+    }, inplace=True)
+
+    return df[['open', 'high', 'low', 'close', 'volume']]
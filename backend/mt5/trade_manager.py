@@ -3,7 +3,8 @@ Gerenciador de Operações MT5
 Responsável por abrir, gerenciar e fechar ordens
 """
 
-import MetaTrader5 as mt5
+from mt5.gateway import mt5, OrderOutcomeUnknown
+from mt5.market_data import MarketDataCache
 from datetime import datetime
 from typing import Dict, List, Optional
 import pytz
@@ -20,8 +21,18 @@ class TradeManager:
     - Fechar operações corretamente
     """
     
-    def __init__(self, magic_number: int = 234000):
+    def __init__(self, magic_number: int = 234000, health=None, market_data: Optional[MarketDataCache] = None):
         self.magic_number = magic_number
+        # Especificação/tick por símbolo (compartilhável com outros componentes)
+        self.market_data = market_data or MarketDataCache()
+        # ConnectionHealth do MT5Connector (evita mt5.initialize() a cada operação)
+        self.health = health
+    
+    def _ready(self) -> bool:
+        """Terminal pronto para operar"""
+        if self.health is not None:
+            return self.health.connected
+        return mt5.initialize()
     
     def place_order(
         self,
@@ -46,15 +57,15 @@ class TradeManager:
         Returns:
             Dict com resultado da ordem
         """
-        if not mt5.initialize():
+        if not self._ready():
             return {
                 "success": False,
                 "message": "MT5 não está inicializado"
             }
         
         try:
-            # Obter informações do símbolo
-            symbol_info = mt5.symbol_info(symbol)
+            # Obter informações do símbolo e tick (cache; uma ida ao terminal)
+            symbol_info, tick = self.market_data.snapshot(symbol)
             if symbol_info is None:
                 return {
                     "success": False,
@@ -68,10 +79,18 @@ class TradeManager:
                         "success": False,
                         "message": f"Falha ao ativar símbolo {symbol}"
                     }
+                # Especificação em cache estava com visible=False; tick pode ter faltado
+                self.market_data.invalidate(symbol)
+                symbol_info, tick = self.market_data.snapshot(symbol)
+            
+            if tick is None:
+                return {
+                    "success": False,
+                    "message": f"Sem cotação para {symbol}"
+                }
             
             # Preparar ordem
             point = symbol_info.point
-            tick = mt5.symbol_info_tick(symbol)
             
             if order_type == "BUY":
                 order_type_mt5 = mt5.ORDER_TYPE_BUY
@@ -127,6 +146,12 @@ class TradeManager:
                 "comment": result.comment
             }
             
+        except OrderOutcomeUnknown as e:
+            return {
+                "success": False,
+                "unknown": True,
+                "message": f"Resultado da ordem desconhecido: {str(e)}"
+            }
         except Exception as e:
             return {
                 "success": False,
@@ -144,7 +169,7 @@ class TradeManager:
         Returns:
             Lista de posições abertas
         """
-        if not mt5.initialize():
+        if not self._ready():
             return []
         
         try:
@@ -191,7 +216,7 @@ class TradeManager:
         Returns:
             Dict com resultado
         """
-        if not mt5.initialize():
+        if not self._ready():
             return {
                 "success": False,
                 "message": "MT5 não está inicializado"
@@ -209,7 +234,12 @@ class TradeManager:
             pos = position[0]
             
             # Preparar ordem de fechamento
-            tick = mt5.symbol_info_tick(pos.symbol)
+            tick = self.market_data.tick(pos.symbol)
+            if tick is None:
+                return {
+                    "success": False,
+                    "message": f"Sem cotação para {pos.symbol}"
+                }
             price = tick.bid if pos.type == mt5.ORDER_TYPE_BUY else tick.ask
             
             request = {
@@ -242,12 +272,56 @@ class TradeManager:
                 "deal_id": result.deal
             }
             
+        except OrderOutcomeUnknown as e:
+            return {
+                "success": False,
+                "unknown": True,
+                "message": f"Resultado do fechamento desconhecido: {str(e)}"
+            }
         except Exception as e:
             return {
                 "success": False,
                 "message": f"Erro ao fechar posição: {str(e)}"
             }
     
+    def get_position_close(self, ticket: int) -> Optional[Dict]:
+        """
+        Fechamento de uma posição pelo histórico de negócios (history_deals_get)
+        
+        Cobre fechamentos por SL/TP, manuais ou por close_position.
+        
+        Args:
+            ticket: Ticket da posição
+            
+        Returns:
+            Dict com exit_price, profit (com swap e comissão) e close_time,
+            ou None se a posição ainda estiver aberta ou sem histórico
+        """
+        if not self._ready():
+            return None
+        
+        try:
+            if mt5.positions_get(ticket=ticket):
+                return None
+            deals = mt5.history_deals_get(position=ticket)
+            if not deals:
+                return None
+            
+            exits = [deal for deal in deals if deal.entry in (mt5.DEAL_ENTRY_OUT, mt5.DEAL_ENTRY_OUT_BY)]
+            if not exits:
+                return None
+            
+            last = max(exits, key=lambda deal: deal.time_msc)
+            return {
+                "exit_price": last.price,
+                "profit": round(sum(deal.profit + deal.swap + deal.commission for deal in deals), 2),
+                "close_time": datetime.fromtimestamp(last.time, tz=pytz.UTC).isoformat()
+            }
+            
+        except Exception as e:
+            print(f"Erro ao consultar histórico da posição {ticket}: {e}")
+            return None
+    
     def count_open_positions(self, symbol: str, magic: Optional[int] = None) -> int:
         """Conta posições abertas para um símbolo"""
         return len(self.get_open_positions(symbol=symbol, magic=magic))
@@ -0,0 +1,64 @@
+"""
+Otimização de Parâmetros da IA
+Varre parâmetros do AIEngine e SL/TP sobre o histórico local de velas
+
+Uso:
+    python optimize.py --symbol EURUSD --timeframe M1
+    python optimize.py --symbol EURUSD --timeframe H1 --samples 200 --workers 8 --out resultados.csv
+"""
+
+import argparse
+
+from core_ai.optimizer import DEFAULT_SPACE, ParameterOptimizer, grid, random_samples
+from services.asset_service import AssetService
+
+def print_progress(done: int, total: int):
+    """Imprime progresso da varredura"""
+    print(f"  {done}/{total} combinações")
+
+def main():
+    parser = argparse.ArgumentParser(description="Otimização de parâmetros da IA por backtest")
+    parser.add_argument("--symbol", required=True, help="Símbolo (ex: EURUSD)")
+    parser.add_argument("--timeframe", default="H1", help="Timeframe (padrão: H1)")
+    parser.add_argument("--samples", type=int, help="Amostras aleatórias (padrão: grade completa)")
+    parser.add_argument("--seed", type=int, help="Semente da amostragem aleatória")
+    parser.add_argument("--workers", type=int, help="Processos (padrão: núcleos da CPU)")
+    parser.add_argument("--sort-by", default="net_profit", help="Métrica do ranking (padrão: net_profit)")
+    parser.add_argument("--ascending", action="store_true", help="Ordem crescente (ex: max_drawdown)")
+    parser.add_argument("--min-trades", type=int, default=10, help="Mínimo de trades (padrão: 10)")
+    parser.add_argument("--top", type=int, default=10, help="Resultados exibidos (padrão: 10)")
+    parser.add_argument("--out", default="optimization.csv", help="Arquivo CSV de saída")
+    args = parser.parse_args()
+
+    store = AssetService().candle_store
+    symbol = args.symbol.upper()
+    if store.count(symbol, args.timeframe) == 0:
+        print(f"❌ Sem velas para {symbol}/{args.timeframe}")
+        return 1
+
+    if args.samples:
+        combos = random_samples(DEFAULT_SPACE, args.samples, args.seed)
+    else:
+        combos = grid(DEFAULT_SPACE)
+
+    optimizer = ParameterOptimizer(workers=args.workers)
+    print(f"🔎 {len(combos)} combinações em {optimizer.workers} processos")
+    result = optimizer.run(
+        combos,
+        candles_path=store.path(symbol, args.timeframe),
+        sort_by=args.sort_by,
+        ascending=args.ascending,
+        min_trades=args.min_trades,
+        progress=print_progress
+    )
+
+    ParameterOptimizer.write_table(result["results"], args.out)
+    for row in result["results"][:args.top]:
+        params = ", ".join(f"{name}={row[name]}" for name in DEFAULT_SPACE)
+        print(f"  {args.sort_by}={row.get(args.sort_by)} trades={row['trades']} | {params}")
+
+    print(f"✅ {result['combos']} combinações em {result['seconds']}s ({result['combos_per_second']}/s) -> {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,10 +4,12 @@ Serviço de Gerenciamento de Ativos Monitorados
 
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
 from pathlib import Path
 
+from storage.candle_store import CandleStore
+
 class AssetService:
     """Gerencia ativos monitorados e coleta de dados"""
     
@@ -15,8 +17,13 @@ class AssetService:
         self.data_dir = data_dir
         self.market_data_dir = os.path.join(data_dir, "market_data")
         self.config_file = os.path.join(data_dir, "monitored_assets.json")
+        # Cache da configuração de ativos, invalidado pelo mtime do arquivo
+        self._assets_cache: Optional[List[Dict]] = None
+        self._assets_mtime: Optional[float] = None
         self._ensure_directories()
         self._initialize_default_assets()
+        self.candle_store = CandleStore(self.market_data_dir)
+        self._migrate_json_candles()
     
     def _ensure_directories(self):
         """Garante que os diretórios existem"""
@@ -35,15 +42,28 @@ class AssetService:
             ]
             self._save_assets(default_assets)
     
+    def _migrate_json_candles(self):
+        """Migra (uma única vez) velas em JSON para o armazenamento binário"""
+        migrated = self.candle_store.migrate_all()
+        for series, count in migrated.items():
+            print(f"Velas migradas para binário: {series} ({count})")
+    
     def get_assets(self) -> List[Dict]:
         """Retorna lista de ativos monitorados"""
         try:
             if not os.path.exists(self.config_file):
                 self._initialize_default_assets()
             
+            # Evitar reler o arquivo se não mudou (API e bot escrevem no mesmo arquivo)
+            mtime = os.path.getmtime(self.config_file)
+            if self._assets_cache is not None and mtime == self._assets_mtime:
+                return [dict(a) for a in self._assets_cache]
+            
             with open(self.config_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                return data.get("assets", [])
+            self._assets_cache = data.get("assets", [])
+            self._assets_mtime = mtime
+            return [dict(a) for a in self._assets_cache]
         except Exception as e:
             print(f"Erro ao carregar ativos: {e}")
             return []
@@ -95,6 +115,7 @@ class AssetService:
         }
         with open(self.config_file, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+        self._assets_cache = None
     
     def get_active_assets(self) -> List[Dict]:
         """Retorna apenas ativos ativos"""
@@ -103,7 +124,9 @@ class AssetService:
     
     def save_candle(self, symbol: str, timeframe: str, candle: Dict) -> bool:
         """
-        Salva uma vela no arquivo JSON do ativo
+        Salva uma vela no arquivo binário do ativo
+        
+        Append O(1); se a vela já existe (mesmo timestamp), é atualizada in-place.
         
         Args:
             symbol: Símbolo do ativo (ex: EURUSD)
@@ -114,47 +137,22 @@ class AssetService:
             bool: True se salvou com sucesso
         """
         try:
-            asset_dir = os.path.join(self.market_data_dir, symbol)
-            os.makedirs(asset_dir, exist_ok=True)
-            
-            file_path = os.path.join(asset_dir, f"{timeframe}.json")
-            
-            # Carregar dados existentes
-            candles = []
-            if os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    candles = json.load(f)
-            
-            # Verificar se vela já existe (evitar duplicação)
-            candle_timestamp = candle.get("timestamp")
-            existing_timestamps = [c.get("timestamp") for c in candles]
-            
-            if candle_timestamp not in existing_timestamps:
-                candles.append(candle)
-                # Ordenar por timestamp
-                candles.sort(key=lambda x: x.get("timestamp", ""))
-                
-                # Salvar
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(candles, f, indent=2, ensure_ascii=False)
-                
-                return True
-            else:
-                # Vela já existe, atualizar
-                for i, c in enumerate(candles):
-                    if c.get("timestamp") == candle_timestamp:
-                        candles[i] = candle
-                        break
-                
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(candles, f, indent=2, ensure_ascii=False)
-                
-                return True
-                
+            return self.candle_store.append(symbol, timeframe, candle)
         except Exception as e:
             print(f"Erro ao salvar vela: {e}")
             return False
     
+    def get_candle_array(self, symbol: str, timeframe: str, limit: Optional[int] = None):
+        """
+        Retorna velas como array estruturado (memory-map, sem cópia)
+        
+        Args:
+            symbol: Símbolo do ativo
+            timeframe: Timeframe
+            limit: Limite de velas (None = todas)
+        """
+        return self.candle_store.read(symbol, timeframe, limit=limit)
+    
     def get_candles(self, symbol: str, timeframe: str, limit: Optional[int] = None) -> List[Dict]:
         """
         Retorna velas salvas de um ativo
@@ -168,43 +166,33 @@ class AssetService:
             Lista de velas
         """
         try:
-            file_path = os.path.join(self.market_data_dir, symbol, f"{timeframe}.json")
-            
-            if not os.path.exists(file_path):
-                return []
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                candles = json.load(f)
-            
-            if limit:
-                return candles[-limit:]
-            
-            return candles
+            return CandleStore.to_dicts(self.get_candle_array(symbol, timeframe, limit=limit))
         except Exception as e:
             print(f"Erro ao carregar velas: {e}")
             return []
     
     def get_last_candle_time(self, symbol: str, timeframe: str) -> Optional[datetime]:
-        """Retorna timestamp da última vela salva"""
-        candles = self.get_candles(symbol, timeframe, limit=1)
-        if candles:
-            timestamp_str = candles[-1].get("timestamp")
-            if timestamp_str:
-                try:
-                    # Tratar diferentes formatos de timestamp
-                    ts = timestamp_str.replace('Z', '+00:00')
-                    return datetime.fromisoformat(ts)
-                except Exception as e:
-                    print(f"Erro ao parsear timestamp: {e}")
-                    return None
-        return None
+        """Retorna timestamp (UTC) da última vela salva"""
+        try:
+            last = self.candle_store.last(symbol, timeframe)
+        except Exception as e:
+            print(f"Erro ao ler última vela: {e}")
+            return None
+        if last is None:
+            return None
+        return datetime.fromtimestamp(int(last["time"]), tz=timezone.utc)
     
     def update_last_candle_time(self, symbol: str, timeframe: str, timestamp: datetime):
         """Atualiza timestamp da última vela coletada"""
+        self.update_last_candle_times({symbol: timestamp})
+    
+    def update_last_candle_times(self, timestamps: Dict[str, datetime]):
+        """Atualiza timestamps de vários ativos com uma única escrita"""
+        if not timestamps:
+            return
         assets = self.get_assets()
         for asset in assets:
-            if asset["symbol"] == symbol:
+            timestamp = timestamps.get(asset["symbol"])
+            if timestamp is not None:
                 asset["last_candle_time"] = timestamp.isoformat()
-                break
         self._save_assets(assets)
-
@@ -0,0 +1,161 @@
+"""
+Agendador de Fechamento de Velas
+Dispara coleta/análise exatamente no fechamento de cada vela
+"""
+
+import heapq
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+class BarScheduler:
+    """
+    Agendador baseado no fechamento das velas
+
+    Mantém um heap com o próximo fechamento de cada série (symbol, timeframe),
+    dorme até o prazo mais próximo e retorna apenas as séries cuja vela fechou.
+
+    Métricas:
+    - wakeup jitter: atraso entre o prazo e o despertar efetivo
+    - deadline misses: despertares com atraso acima de miss_tolerance
+    - bar-to-decision: tempo entre o fechamento da vela e a decisão da IA
+    """
+
+    def __init__(
+        self,
+        timeframe_minutes: Dict[str, int],
+        close_delay: float = 0.25,
+        miss_tolerance: float = 1.0
+    ):
+        self.timeframe_minutes = timeframe_minutes
+        # Pequena folga após o fechamento para o MT5 publicar a vela
+        self.close_delay = close_delay
+        self.miss_tolerance = miss_tolerance
+
+        self._heap: List[Tuple[float, str, str]] = []
+        self._series: set = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+        self._metrics = {
+            "wakeups": 0,
+            "fired": 0,
+            "deadline_misses": 0,
+            "jitter_last_ms": 0.0,
+            "jitter_max_ms": 0.0,
+            "jitter_total_ms": 0.0,
+            "decisions": 0,
+            "bar_to_decision_last_ms": 0.0,
+            "bar_to_decision_max_ms": 0.0,
+            "bar_to_decision_total_ms": 0.0,
+        }
+
+    def period_seconds(self, timeframe: str) -> int:
+        return self.timeframe_minutes.get(timeframe, 60) * 60
+
+    def next_close(self, timeframe: str, now: Optional[float] = None) -> float:
+        """Epoch do próximo fechamento de vela do timeframe"""
+        now = time.time() if now is None else now
+        period = self.period_seconds(timeframe)
+        return (int(now) // period + 1) * period
+
+    def set_series(self, series: Iterable[Tuple[str, str]]):
+        """Define as séries agendadas, preservando prazos das já existentes"""
+        series = set(series)
+        with self._lock:
+            if series == self._series:
+                return
+            now = time.time()
+            kept = [entry for entry in self._heap if (entry[1], entry[2]) in series]
+            for symbol, timeframe in series - self._series:
+                kept.append((self.next_close(timeframe, now), symbol, timeframe))
+            heapq.heapify(kept)
+            self._heap = kept
+            self._series = series
+
+    def next_deadline(self) -> Optional[float]:
+        """Epoch do próximo disparo (fechamento + close_delay)"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return self._heap[0][0] + self.close_delay
+
+    def wake(self):
+        """Interrompe uma espera em andamento (ex: stop do bot)"""
+        self._wake.set()
+
+    def wait_due(self, timeout: Optional[float] = None) -> List[Tuple[str, str, float]]:
+        """
+        Dorme até o próximo fechamento e retorna as séries vencidas
+
+        Args:
+            timeout: Espera máxima em segundos (None = até o próximo prazo)
+
+        Returns:
+            Lista de (symbol, timeframe, close_epoch); vazia se acordou
+            por timeout ou wake()
+        """
+        deadline = self.next_deadline()
+        now = time.time()
+        if deadline is None:
+            wait = timeout
+        else:
+            wait = max(0.0, deadline - now)
+            if timeout is not None:
+                wait = min(wait, timeout)
+
+        if wait is None or wait > 0:
+            if self._wake.wait(wait):
+                self._wake.clear()
+                return []
+
+        return self._pop_due()
+
+    def _pop_due(self) -> List[Tuple[str, str, float]]:
+        now = time.time()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] + self.close_delay <= now:
+                close_epoch, symbol, timeframe = heapq.heappop(self._heap)
+                due.append((symbol, timeframe, close_epoch))
+                # Reagendar para o próximo fechamento (pula velas perdidas)
+                heapq.heappush(self._heap, (self.next_close(timeframe, max(now, close_epoch)), symbol, timeframe))
+
+            if due:
+                jitter_ms = (now - (min(d[2] for d in due) + self.close_delay)) * 1000
+                m = self._metrics
+                m["wakeups"] += 1
+                m["fired"] += len(due)
+                m["jitter_last_ms"] = jitter_ms
+                m["jitter_max_ms"] = max(m["jitter_max_ms"], jitter_ms)
+                m["jitter_total_ms"] += jitter_ms
+                if jitter_ms > self.miss_tolerance * 1000:
+                    m["deadline_misses"] += 1
+        return due
+
+    def record_decision(self, close_epoch: float):
+        """Registra latência entre o fechamento da vela e a decisão"""
+        latency_ms = (time.time() - close_epoch) * 1000
+        with self._lock:
+            m = self._metrics
+            m["decisions"] += 1
+            m["bar_to_decision_last_ms"] = latency_ms
+            m["bar_to_decision_max_ms"] = max(m["bar_to_decision_max_ms"], latency_ms)
+            m["bar_to_decision_total_ms"] += latency_ms
+
+    def get_metrics(self) -> Dict:
+        """Retorna métricas do agendador"""
+        with self._lock:
+            m = dict(self._metrics)
+            head = self._heap[0] if self._heap else None
+
+        jitter_total = m.pop("jitter_total_ms")
+        latency_total = m.pop("bar_to_decision_total_ms")
+        m["jitter_avg_ms"] = jitter_total / m["wakeups"] if m["wakeups"] else 0.0
+        m["bar_to_decision_avg_ms"] = latency_total / m["decisions"] if m["decisions"] else 0.0
+
+        result = {k: round(v, 3) if isinstance(v, float) else v for k, v in m.items()}
+        result["next_close"] = (
+            {"symbol": head[1], "timeframe": head[2], "epoch": head[0]} if head else None
+        )
+        return result
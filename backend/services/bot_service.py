@@ -5,46 +5,86 @@ Orquestra todos os módulos
 
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from collections import deque
 import uuid
 
 from mt5.connector import MT5Connector
+from mt5.gateway import mt5 as mt5_gateway
+from mt5.health import CONNECTED, DISCONNECTED
 from mt5.trade_manager import TradeManager
 from core_ai.ai_engine import AIEngine
+from core_ai.decision_cache import DecisionCache
 from storage.database import Database
+from storage.write_behind import WriteBehindQueue
+from storage.retention import RetentionManager
 from services.asset_service import AssetService
 from services.candle_collector import CandleCollector
+from services.bar_scheduler import BarScheduler
+from services.event_hub import event_hub
 from models.schemas import BotConfig, Trade, LogEntry, Action
 
+# Campos da BotConfig que um ativo monitorado pode sobrescrever
+STRATEGY_OVERRIDES = ("volume", "stop_loss", "take_profit", "max_simultaneous_trades")
+
 class BotService:
     """Serviço principal que orquestra todos os módulos"""
     
-    def __init__(self):
-        # Módulos
-        self.mt5_connector = MT5Connector()
-        self.trade_manager = TradeManager()
+    def __init__(
+        self,
+        mt5_connector: Optional[MT5Connector] = None,
+        asset_service: Optional[AssetService] = None,
+        candle_collector: Optional[CandleCollector] = None
+    ):
+        # Módulos (conexão, ativos e coletor podem ser compartilhados com a API)
+        self.mt5_connector = mt5_connector or MT5Connector()
+        self.trade_manager = TradeManager(
+            health=self.mt5_connector.health,
+            market_data=self.mt5_connector.market_data
+        )
         self.ai_engine = AIEngine()
+        self.decision_cache = DecisionCache()
         self.database = Database()
-        self.asset_service = AssetService()
-        self.candle_collector = CandleCollector(self.mt5_connector, self.asset_service)
+        self.write_queue = WriteBehindQueue(self.database)
+        self.retention = RetentionManager(self.database)
+        self.retention.start()
+        self.asset_service = asset_service or AssetService()
+        self.candle_collector = candle_collector or CandleCollector(self.mt5_connector, self.asset_service)
+        self.scheduler = BarScheduler(self.candle_collector.timeframe_minutes)
         
         # Estado
         self.running = False
         self.thread: Optional[threading.Thread] = None
         self.config = BotConfig()
         
+        # Estratégias por símbolo (pool limitado; uma execução por série por vez)
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[Tuple[str, str], Future] = {}
+        self._symbol_stats: Dict[str, Dict] = {}
+        self._stats_lock = threading.Lock()
+        
         # Histórico em memória
         self.logs: deque = deque(maxlen=1000)
         self.last_ai_decision: Optional[Dict] = None
+        
+        self.mt5_connector.health.subscribe(self._on_connection_change)
     
     def get_status(self) -> Dict:
         """Retorna status do sistema"""
         return {
             "bot_running": self.running,
             "mt5_connected": self.mt5_connector.is_connected(),
+            "mt5_health": self.mt5_connector.health.get_stats(),
+            "market_data": self.mt5_connector.market_data.get_stats(),
             "current_config": self.config.dict(),
+            "scheduler": self.scheduler.get_metrics(),
+            "decision_cache": self.decision_cache.get_stats(),
+            "symbols": self.get_symbol_stats(),
+            "mt5_gateway": mt5_gateway.get_stats(),
+            "event_hub": event_hub.get_stats(),
+            "retention": self.retention.get_stats(),
             "timestamp": datetime.now().isoformat()
         }
     
@@ -73,10 +113,15 @@ class BotService:
             }
         
         self.running = True
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.config.max_workers,
+            thread_name_prefix="strategy"
+        )
         self.thread = threading.Thread(target=self._run_loop, daemon=True)
         self.thread.start()
         
         self._log("INFO", "🤖 Bot iniciado com sucesso")
+        event_hub.publish("status", {"bot_running": True})
         
         return {
             "success": True,
@@ -92,7 +137,19 @@ class BotService:
             }
         
         self.running = False
+        self.scheduler.wake()
         self._log("INFO", "🛑 Bot parado pelo usuário")
+        event_hub.publish("status", {"bot_running": False})
+        
+        # Aguardar estratégias em andamento (ordens em envio)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            self._pending.clear()
+        
+        # Drenar gravações pendentes
+        if not self.write_queue.flush():
+            self._log("WARNING", f"Gravações pendentes após stop: {self.write_queue.pending()}")
         
         return {
             "success": True,
@@ -109,12 +166,15 @@ class BotService:
         
         try:
             self.config = BotConfig(**config_dict)
+            self.ai_engine.reset_streams()
+            self.decision_cache.clear()
             self.trade_manager.magic_number = self.config.magic_number
             
             # Salvar configuração no banco
             self.database.save_config("bot_config", self.config.json())
             
             self._log("INFO", f"Configuração atualizada")
+            event_hub.publish("status", {"current_config": self.config.dict()})
             
             return {
                 "success": True,
@@ -144,81 +204,105 @@ class BotService:
         """Retorna trades"""
         return self.database.get_trades(limit=limit, symbol=self.config.symbol)
     
+    def get_trades_page(self, limit: int = 50, cursor: Optional[str] = None, symbol: Optional[str] = None) -> Dict:
+        """Página de trades (padrão: símbolo da configuração) e cursor da próxima"""
+        return self.database.get_trades_page(limit=limit, symbol=symbol or self.config.symbol, cursor=cursor)
+    
+    def get_decisions_page(self, limit: int = 100, cursor: Optional[str] = None, symbol: Optional[str] = None,
+                           filters: Optional[List[str]] = None) -> Dict:
+        """Página de decisões da IA (todos os símbolos se symbol=None) e cursor da próxima"""
+        return self.database.get_ai_decisions_page(limit=limit, symbol=symbol, cursor=cursor, filters=filters)
+    
     def get_logs(self, limit: int = 100) -> List[Dict]:
         """Retorna logs"""
         return list(self.logs)[-limit:]
     
+    def get_symbol_stats(self) -> Dict[str, Dict]:
+        """Latência e erros por estratégia (symbol/timeframe)"""
+        with self._stats_lock:
+            stats = {key: dict(value) for key, value in self._symbol_stats.items()}
+        for value in stats.values():
+            total = value.pop("total_ms")
+            value["avg_ms"] = round(total / value["runs"], 3) if value["runs"] else 0.0
+        return stats
+    
+    def _strategies(self) -> Dict[Tuple[str, str], BotConfig]:
+        """
+        Estratégias ativas por (symbol, timeframe)
+        
+        A série da BotConfig sempre opera; ativos monitorados com
+        trading=True operam cada um dos seus timeframes com a BotConfig
+        sobrescrita por asset["overrides"].
+        """
+        strategies = {(self.config.symbol, self.config.timeframe.value): self.config}
+        base = self.config.dict()
+        for asset in self.asset_service.get_active_assets():
+            if not asset.get("trading"):
+                continue
+            overrides = {
+                key: value for key, value in (asset.get("overrides") or {}).items()
+                if key in STRATEGY_OVERRIDES
+            }
+            for timeframe in asset.get("timeframes", ["H1"]):
+                key = (asset["symbol"], timeframe)
+                if key in strategies:
+                    continue
+                try:
+                    strategies[key] = BotConfig(**{**base, **overrides, "symbol": asset["symbol"], "timeframe": timeframe})
+                except Exception as e:
+                    self._log("ERROR", f"Configuração inválida para {asset['symbol']}/{timeframe}: {str(e)}")
+        return strategies
+    
+    def _scheduled_series(self, strategies: Dict[Tuple[str, str], BotConfig]) -> List[Tuple[str, str]]:
+        """Séries agendadas: ativos monitorados (coleta) + estratégias (análise)"""
+        series = set(strategies)
+        for asset in self.asset_service.get_active_assets():
+            for timeframe in asset.get("timeframes", ["H1"]):
+                series.add((asset["symbol"], timeframe))
+        return sorted(series)
+    
     def _run_loop(self):
-        """Loop principal de execução do bot"""
+        """
+        Loop principal de execução do bot
+        
+        Dorme até o próximo fechamento de vela (BarScheduler) e dispara
+        coleta e análise apenas para as séries cuja vela acabou de fechar.
+        """
         self._log("INFO", "🔄 Loop de execução iniciado")
         
         while self.running:
             try:
-                # Verificar conexão MT5
+                # Verificar conexão MT5 (com a conexão já estabelecida, a reconexão
+                # com backoff é feita por ConnectionHealth em segundo plano)
                 if not self.mt5_connector.is_connected():
-                    self._log("ERROR", "MT5 desconectado. Tentando reconectar...")
-                    connection = self.mt5_connector.connect()
-                    if not connection.get("connected"):
-                        self._log("ERROR", "Falha ao reconectar MT5")
-                        time.sleep(10)
-                        continue
-                
-                # Coletar velas de ativos monitorados (apenas velas fechadas)
-                try:
-                    collect_result = self.candle_collector.collect_all_active_assets()
-                    if collect_result.get("collected", 0) > 0:
-                        self._log("INFO", f"Coletadas {collect_result['collected']} velas de ativos monitorados")
-                except Exception as e:
-                    self._log("ERROR", f"Erro ao coletar velas: {str(e)}")
-                
-                # Verificar limite de trades simultâneos
-                open_positions = self.trade_manager.get_open_positions(
-                    symbol=self.config.symbol,
-                    magic=self.config.magic_number
-                )
-                
-                if len(open_positions) >= self.config.max_simultaneous_trades:
-                    self._log("DEBUG", f"Limite de trades simultâneos atingido ({len(open_positions)})")
-                    time.sleep(self.config.analysis_interval)
+                    if self.mt5_connector.health.state == DISCONNECTED:
+                        connection = self.mt5_connector.connect()
+                        if not connection.get("connected"):
+                            self._log("ERROR", f"Falha ao conectar MT5: {connection.get('message')}")
+                            time.sleep(10)
+                    else:
+                        time.sleep(1)
                     continue
                 
-                # Coletar dados do mercado
-                candles = self.mt5_connector.get_candles(
-                    self.config.symbol,
-                    self.config.timeframe,
-                    count=100
-                )
-                
-                if candles is None or candles.empty:
-                    self._log("WARNING", "Não foi possível obter candles")
-                    time.sleep(5)
+                # Aguardar próximo fechamento (analysis_interval limita a espera
+                # para manter a verificação de conexão periódica)
+                strategies = self._strategies()
+                self.scheduler.set_series(self._scheduled_series(strategies))
+                due = self.scheduler.wait_due(timeout=self.config.analysis_interval)
+                if not self.running or not due:
                     continue
                 
-                # Análise da IA
-                decision = self.ai_engine.analyze(candles)
-                self.last_ai_decision = decision.dict()
+                # Coletar velas fechadas das séries vencidas
+                self._collect_due(due)
                 
-                # Salvar decisão no banco
-                self.database.save_ai_decision(
-                    decision.dict(),
-                    self.config.symbol,
-                    self.config.timeframe.value
-                )
+                # Registrar trades fechados no MT5 (SL/TP, manual)
+                self._sync_closed_trades()
                 
-                self._log("INFO", f"IA Decision: {decision.action.value} | Confiança: {decision.confidence:.2f} | {decision.reason}")
-                
-                # Validar decisão
-                if decision.action == Action.HOLD:
-                    self._log("DEBUG", "IA decidiu HOLD. Aguardando...")
-                    time.sleep(self.config.analysis_interval)
-                    continue
-                
-                # Executar ordem se necessário
-                if decision.action in [Action.BUY, Action.SELL]:
-                    self._execute_trade(decision)
-                
-                # Aguardar próximo ciclo
-                time.sleep(self.config.analysis_interval)
+                # Análise da IA das estratégias cuja vela fechou (em paralelo)
+                for symbol, timeframe, close_epoch in due:
+                    strategy = strategies.get((symbol, timeframe))
+                    if strategy is not None:
+                        self._submit_strategy(strategy, close_epoch)
                 
             except Exception as e:
                 self._log("ERROR", f"Erro no loop de execução: {str(e)}")
@@ -226,46 +310,229 @@ class BotService:
         
         self._log("INFO", "Loop de execução finalizado")
     
-    def _execute_trade(self, decision):
+    def _collect_due(self, due: List[Tuple[str, str, float]]):
+        """Coleta velas dos ativos monitorados cuja vela fechou"""
+        monitored = {
+            (asset["symbol"], timeframe)
+            for asset in self.asset_service.get_active_assets()
+            for timeframe in asset.get("timeframes", ["H1"])
+        }
+        
+        collected = 0
+        for symbol, timeframe, _ in due:
+            if (symbol, timeframe) not in monitored:
+                continue
+            try:
+                result = self.candle_collector.collect_closed_candle(symbol, timeframe)
+                if result.get("collected"):
+                    collected += 1
+            except Exception as e:
+                self._log("ERROR", f"Erro ao coletar velas {symbol}/{timeframe}: {str(e)}")
+        
+        self.candle_collector.flush_state()
+        if collected > 0:
+            self._log("INFO", f"Coletadas {collected} velas de ativos monitorados")
+    
+    def _sync_closed_trades(self):
+        """
+        Marca como CLOSED os trades abertos cuja posição já fechou no MT5
+        
+        Saída, lucro e horário vêm do histórico de negócios; só trades
+        fechados saem para o arquivo pela retenção.
+        """
+        try:
+            closes = []
+            for trade in self.database.get_open_trades():
+                close = self.trade_manager.get_position_close(trade["ticket"])
+                if close is not None:
+                    closes.append({**close, "id": trade["id"], "symbol": trade["symbol"], "status": "CLOSED"})
+            if not closes:
+                return
+            
+            self.database.close_trades(closes)
+            for close in closes:
+                event_hub.publish("trade", close)
+                self._log("INFO", f"Trade fechado: {close['symbol']} @ {close['exit_price']} (lucro {close['profit']})")
+        except Exception as e:
+            self._log("ERROR", f"Erro ao sincronizar trades fechados: {str(e)}")
+    
+    def _submit_strategy(self, strategy: BotConfig, close_epoch: float):
+        """Agenda a estratégia no pool; pula se a execução anterior da série não terminou"""
+        executor = self.executor
+        if executor is None:
+            return
+        key = (strategy.symbol, strategy.timeframe.value)
+        pending = self._pending.get(key)
+        if pending is not None and not pending.done():
+            self._update_symbol_stats(key, skipped_busy=True)
+            self._log("WARNING", f"{strategy.symbol}/{key[1]} ainda em execução; fechamento ignorado")
+            return
+        self._pending[key] = executor.submit(self._run_strategy, strategy, close_epoch)
+    
+    def _run_strategy(self, strategy: BotConfig, close_epoch: float):
+        """Executa a estratégia de uma série medindo latência e erros"""
+        key = (strategy.symbol, strategy.timeframe.value)
+        start = time.perf_counter()
+        error = None
+        try:
+            self._analyze_and_trade(strategy, close_epoch)
+        except Exception as e:
+            error = str(e)
+            self._log("ERROR", f"Erro na estratégia {key[0]}/{key[1]}: {error}")
+        self._update_symbol_stats(key, elapsed=time.perf_counter() - start, error=error)
+    
+    def _update_symbol_stats(self, key: Tuple[str, str], elapsed: Optional[float] = None,
+                             error: Optional[str] = None, skipped_busy: bool = False):
+        """Atualiza contadores da estratégia"""
+        with self._stats_lock:
+            stats = self._symbol_stats.setdefault(f"{key[0]}/{key[1]}", {
+                "runs": 0, "errors": 0, "skipped_busy": 0,
+                "last_ms": 0.0, "max_ms": 0.0, "total_ms": 0.0,
+                "last_error": None, "last_run": None
+            })
+            if skipped_busy:
+                stats["skipped_busy"] += 1
+            if error is not None:
+                stats["errors"] += 1
+                stats["last_error"] = error
+            if elapsed is not None:
+                elapsed_ms = elapsed * 1000
+                stats["runs"] += 1
+                stats["last_ms"] = round(elapsed_ms, 3)
+                stats["max_ms"] = round(max(stats["max_ms"], elapsed_ms), 3)
+                stats["total_ms"] += elapsed_ms
+                stats["last_run"] = datetime.now().isoformat()
+    
+    def _analyze_and_trade(self, strategy: BotConfig, close_epoch: float):
+        """Analisa a série da estratégia e executa ordem se necessário"""
+        symbol = strategy.symbol
+        timeframe = strategy.timeframe.value
+        
+        # Verificar limite de trades simultâneos
+        open_positions = self.trade_manager.get_open_positions(
+            symbol=symbol,
+            magic=strategy.magic_number
+        )
+        
+        if len(open_positions) >= strategy.max_simultaneous_trades:
+            self._log("DEBUG", f"{symbol}: limite de trades simultâneos atingido ({len(open_positions)})")
+            return
+        
+        params = self.ai_engine.params_key()
+        
+        # Consultar só a última vela fechada: se já foi analisada, não baixar
+        # a janela, não recalcular e não gravar outra decisão igual
+        bar_time = self.mt5_connector.get_last_closed_bar_time(symbol, strategy.timeframe)
+        if bar_time is not None and self.decision_cache.get(symbol, timeframe, bar_time, params) is not None:
+            self._log("DEBUG", f"Nenhuma vela nova em {symbol}/{timeframe} desde {bar_time}. Decisão em cache")
+            return
+        
+        # Janela de velas fechadas (o MT5 só envia as velas novas)
+        candles = self.mt5_connector.get_candle_window(
+            symbol,
+            strategy.timeframe,
+            count=100
+        )
+        
+        if candles is None or len(candles) == 0:
+            self._log("WARNING", f"{symbol}: não foi possível obter candles")
+            return
+        
+        # Análise da IA com indicadores incrementais
+        decision = self.ai_engine.analyze_stream(symbol, timeframe, candles)
+        # Cópia local: as estratégias rodam em paralelo e last_ai_decision é
+        # compartilhado (só para exibição)
+        decision_dict = decision.dict()
+        with self._stats_lock:
+            self.last_ai_decision = decision_dict
+        self.scheduler.record_decision(close_epoch)
+        self.decision_cache.put(symbol, timeframe, int(candles["time"][-1]), params, decision_dict)
+        
+        # Salvar decisão no banco (write-behind)
+        self.write_queue.enqueue_decision(
+            decision_dict,
+            symbol,
+            timeframe
+        )
+        event_hub.publish("decision", {"symbol": symbol, "timeframe": timeframe, **decision_dict})
+        
+        self._log("INFO", f"{symbol}/{timeframe} IA Decision: {decision.action.value} | Confiança: {decision.confidence:.2f} | {decision.reason}")
+        
+        # Validar decisão
+        if decision.action == Action.HOLD:
+            self._log("DEBUG", f"{symbol}: IA decidiu HOLD. Aguardando...")
+            return
+        
+        # Executar ordem se necessário
+        if decision.action in [Action.BUY, Action.SELL]:
+            self._execute_trade(strategy, decision)
+    
+    def _execute_trade(self, strategy: BotConfig, decision):
         """Executa trade baseado na decisão da IA"""
+        key = (strategy.symbol, strategy.timeframe.value)
         try:
-            self._log("INFO", f"Executando {decision.action.value} em {self.config.symbol}")
+            self._log("INFO", f"Executando {decision.action.value} em {strategy.symbol}")
             
             # Executar ordem no MT5
             result = self.trade_manager.place_order(
-                symbol=self.config.symbol,
+                symbol=strategy.symbol,
                 order_type=decision.action.value,
-                volume=self.config.volume,
-                stop_loss=self.config.stop_loss,
-                take_profit=self.config.take_profit,
+                volume=strategy.volume,
+                stop_loss=strategy.stop_loss,
+                take_profit=strategy.take_profit,
                 comment=f"AI Bot - {decision.reason[:50]}"
             )
             
+            if result.get("unknown"):
+                # Pode ter sido executada: o limite de posições do próximo ciclo a enxerga
+                self._log("WARNING", f"{strategy.symbol}: {result.get('message')}")
+                self._update_symbol_stats(key, error=result.get("message"))
+                return
+            
             if not result.get("success"):
                 self._log("ERROR", f"Falha ao executar ordem: {result.get('message')}")
+                self._update_symbol_stats(key, error=result.get("message"))
                 return
             
             # Criar registro de trade
             trade = {
                 "id": str(uuid.uuid4()),
-                "symbol": self.config.symbol,
+                "symbol": strategy.symbol,
                 "type": decision.action.value,
                 "entry_price": result.get("price", 0),
-                "volume": self.config.volume,
-                "stop_loss": self.config.stop_loss,
-                "take_profit": self.config.take_profit,
+                "volume": strategy.volume,
+                "stop_loss": strategy.stop_loss,
+                "take_profit": strategy.take_profit,
                 "status": "OPEN",
                 "open_time": datetime.now().isoformat(),
-                "ai_decision_id": None  # Será atualizado depois
+                "ai_decision_id": None,  # Será atualizado depois
+                # Ordem a mercado: o ticket da posição é o da ordem que a abriu
+                "ticket": result.get("order_id")
             }
             
-            # Salvar no banco
-            self.database.save_trade(trade)
+            # Salvar no banco (write-behind)
+            self.write_queue.enqueue_trade(trade)
+            event_hub.publish("trade", trade)
             
             self._log("INFO", f"✅ Trade executado: {trade['type']} {trade['symbol']} @ {trade['entry_price']}")
             
         except Exception as e:
             self._log("ERROR", f"Erro ao executar trade: {str(e)}")
+            self._update_symbol_stats(key, error=str(e))
+    
+    def _on_connection_change(self, previous: str, state: str, reason: Optional[str]):
+        """Registra transições de estado da conexão MT5"""
+        level = "INFO" if state == CONNECTED else "ERROR"
+        self._log(level, f"MT5 {previous} -> {state}" + (f" ({reason})" if reason else ""))
+        event_hub.publish("status", {"mt5_connected": state == CONNECTED, "mt5_state": state})
+    
+    def shutdown(self):
+        """Encerra o bot e drena a fila de gravação (shutdown da aplicação)"""
+        self.stop()
+        self.candle_collector.flush_state(force=True)
+        self.retention.stop()
+        self.write_queue.close()
+        self.database.close()
     
     def _log(self, level: str, message: str, source: str = "BotService"):
         """Registra log"""
@@ -276,8 +543,6 @@ class BotService:
             "source": source
         }
         self.logs.append(log_entry)
+        event_hub.publish("log", log_entry)
         print(f"[{level}] {message}")
 
-# Instância global
-bot_service = BotService()
-
@@ -3,12 +3,17 @@ Coletor de Velas - Gerencia coleta automática de dados
 Garante que apenas velas fechadas sejam coletadas
 """
 
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, Optional, Tuple
 import pytz
 from mt5.connector import MT5Connector
+from mt5.rates import closed_rates
 from models.schemas import Timeframe
 from services.asset_service import AssetService
+from storage.candle_store import CandleStore
+from services.event_hub import event_hub
 
 class CandleCollector:
     """
@@ -28,6 +33,104 @@ class CandleCollector:
             "H4": 240,
             "D1": 1440
         }
+        
+        # Velas buscadas na primeira coleta (sem histórico) e por bloco de backfill
+        self.initial_bars = 500
+        self.backfill_chunk_bars = 50000
+        # Máximo de velas por evento "candles" do streaming
+        self.stream_max_candles = 100
+        
+        # Estado em memória por (symbol, timeframe):
+        # last_bar_time, next_expected_close, error_count
+        self.state: Dict[Tuple[str, str], Dict] = {}
+        self._state_lock = threading.Lock()
+        
+        # Persistência do last_candle_time em monitored_assets.json (debounce)
+        self.state_flush_interval = 30.0
+        self._dirty_symbols: Dict[str, datetime] = {}
+        self._last_state_flush = time.monotonic()
+        
+        self._seed_state()
+    
+    def _seed_state(self):
+        """Inicializa o estado a partir da cauda do armazenamento de velas"""
+        for asset in self.asset_service.get_active_assets():
+            for timeframe in asset.get("timeframes", ["H1"]):
+                self._get_state(asset["symbol"], timeframe)
+    
+    def _get_state(self, symbol: str, timeframe: str) -> Dict:
+        """Retorna estado da série, lendo a última vela do disco apenas na primeira vez"""
+        key = (symbol, timeframe)
+        state = self.state.get(key)
+        if state is None:
+            last_bar_time = self.asset_service.get_last_candle_time(symbol, timeframe)
+            state = {
+                "last_bar_time": last_bar_time,
+                "next_expected_close": self._next_expected(last_bar_time, timeframe),
+                "error_count": 0
+            }
+            with self._state_lock:
+                state = self.state.setdefault(key, state)
+        return state
+    
+    def _next_expected(self, last_bar_time: Optional[datetime], timeframe: str) -> Optional[datetime]:
+        """Fechamento da próxima vela ainda não salva (abertura da última + 2 períodos)"""
+        if last_bar_time is None:
+            return None
+        return last_bar_time + timedelta(minutes=2 * self.timeframe_minutes.get(timeframe, 60))
+    
+    def _record_collected(self, symbol: str, timeframe: str, candle_time: datetime):
+        """Atualiza estado após coleta e marca para persistência"""
+        state = self._get_state(symbol, timeframe)
+        with self._state_lock:
+            state["last_bar_time"] = candle_time
+            state["next_expected_close"] = self._next_expected(candle_time, timeframe)
+            state["error_count"] = 0
+            self._dirty_symbols[symbol] = candle_time
+    
+    def _record_error(self, symbol: str, timeframe: str):
+        state = self._get_state(symbol, timeframe)
+        with self._state_lock:
+            state["error_count"] += 1
+    
+    def flush_state(self, force: bool = False) -> bool:
+        """
+        Persiste last_candle_time dos ativos alterados
+        
+        Sem force, só grava se passou state_flush_interval desde a última gravação.
+        
+        Returns:
+            bool: True se gravou
+        """
+        with self._state_lock:
+            if not self._dirty_symbols:
+                return False
+            if not force and time.monotonic() - self._last_state_flush < self.state_flush_interval:
+                return False
+            dirty, self._dirty_symbols = self._dirty_symbols, {}
+            self._last_state_flush = time.monotonic()
+        
+        try:
+            self.asset_service.update_last_candle_times(dirty)
+            return True
+        except Exception as e:
+            print(f"Erro ao persistir estado do coletor: {e}")
+            with self._state_lock:
+                for symbol, ts in dirty.items():
+                    self._dirty_symbols.setdefault(symbol, ts)
+            return False
+    
+    def get_state(self) -> Dict[str, Dict]:
+        """Retorna cópia do estado em memória (chave "SYMBOL/TF")"""
+        with self._state_lock:
+            return {
+                f"{symbol}/{timeframe}": {
+                    "last_bar_time": st["last_bar_time"].isoformat() if st["last_bar_time"] else None,
+                    "next_expected_close": st["next_expected_close"].isoformat() if st["next_expected_close"] else None,
+                    "error_count": st["error_count"]
+                }
+                for (symbol, timeframe), st in self.state.items()
+            }
     
     def should_collect_candle(self, symbol: str, timeframe: str) -> Tuple[bool, Optional[str]]:
         """
@@ -41,17 +144,11 @@ class CandleCollector:
             (deve_coletar, motivo)
         """
         try:
-            # Obter última vela coletada
-            last_candle_time = self.asset_service.get_last_candle_time(symbol, timeframe)
-            
-            # Calcular próximo timestamp esperado
-            minutes = self.timeframe_minutes.get(timeframe, 60)
+            # Estado em memória (sem leitura de disco após a primeira vez)
+            next_expected_time = self._get_state(symbol, timeframe)["next_expected_close"]
             now = datetime.now(pytz.UTC)
             
-            if last_candle_time:
-                # Calcular quando a próxima vela deve estar disponível
-                next_expected_time = last_candle_time + timedelta(minutes=minutes)
-                
+            if next_expected_time:
                 # Só coletar se já passou o tempo necessário
                 if now < next_expected_time:
                     remaining = (next_expected_time - now).total_seconds() / 60
@@ -67,7 +164,7 @@ class CandleCollector:
     
     def collect_closed_candle(self, symbol: str, timeframe: str) -> Dict:
         """
-        Coleta apenas a última vela fechada
+        Coleta as velas fechadas desde a última salva (catch-up de lacunas)
         
         Args:
             symbol: Símbolo do ativo
@@ -87,16 +184,7 @@ class CandleCollector:
                     "collected": False
                 }
             
-            # Mapear timeframe
-            tf_map = {
-                "M1": Timeframe.M1,
-                "M5": Timeframe.M5,
-                "M15": Timeframe.M15,
-                "M30": Timeframe.M30,
-                "H1": Timeframe.H1,
-            }
-            
-            mt5_timeframe = tf_map.get(timeframe)
+            mt5_timeframe = self._mt5_timeframe(timeframe)
             if not mt5_timeframe:
                 return {
                     "success": False,
@@ -104,62 +192,39 @@ class CandleCollector:
                     "collected": False
                 }
             
-            # Coletar apenas 1 vela (a última fechada)
-            candles_df = self.mt5.get_candles(symbol, mt5_timeframe, count=1)
+            # Buscar desde a última vela salva (preenche lacunas) em uma única chamada
+            minutes = self.timeframe_minutes.get(timeframe, 60)
+            last_bar_time = self._get_state(symbol, timeframe)["last_bar_time"]
+            if last_bar_time:
+                date_from = last_bar_time + timedelta(minutes=minutes)
+            else:
+                date_from = datetime.now(pytz.UTC) - timedelta(minutes=minutes * self.initial_bars)
             
-            if candles_df is None or candles_df.empty:
+            result = self._fetch_and_store(symbol, timeframe, mt5_timeframe, date_from, None)
+            
+            if result["error"]:
                 return {
                     "success": False,
-                    "message": "Não foi possível obter candles do MT5",
+                    "message": result["error"],
                     "collected": False
                 }
             
-            # Pegar última vela (que já está fechada)
-            last_candle = candles_df.iloc[-1]
-            
-            # Converter timestamp para ISO format
-            candle_timestamp = last_candle.name
-            if hasattr(candle_timestamp, 'isoformat'):
-                timestamp_str = candle_timestamp.isoformat()
-            elif hasattr(candle_timestamp, 'strftime'):
-                timestamp_str = candle_timestamp.strftime('%Y-%m-%dT%H:%M:%S%z')
-            else:
-                timestamp_str = str(candle_timestamp)
-            
-            # Converter para formato JSON
-            candle_data = {
-                "timestamp": timestamp_str,
-                "open": float(last_candle['open']),
-                "high": float(last_candle['high']),
-                "low": float(last_candle['low']),
-                "close": float(last_candle['close']),
-                "volume": int(last_candle['volume']) if 'volume' in last_candle else 0
-            }
-            
-            # Salvar vela
-            saved = self.asset_service.save_candle(symbol, timeframe, candle_data)
-            
-            if saved:
-                # Atualizar timestamp da última coleta
-                try:
-                    ts = candle_data["timestamp"].replace('Z', '+00:00')
-                    candle_time = datetime.fromisoformat(ts)
-                    self.asset_service.update_last_candle_time(symbol, timeframe, candle_time)
-                except Exception as e:
-                    print(f"Erro ao atualizar timestamp: {e}")
-                
-                return {
-                    "success": True,
-                    "message": "Vela coletada e salva com sucesso",
-                    "collected": True,
-                    "candle": candle_data
-                }
-            else:
+            if result["bars"] == 0:
                 return {
                     "success": False,
-                    "message": "Erro ao salvar vela",
+                    "message": "Aguardando fechamento da vela. Nenhuma vela fechada nova no MT5",
                     "collected": False
                 }
+            
+            candle_data = CandleStore.to_dicts(result["last"])[0]
+            return {
+                "success": True,
+                "message": "Vela coletada e salva com sucesso",
+                "collected": True,
+                "candle": candle_data,
+                "bars": result["bars"],
+                "dropped": result["dropped"]
+            }
                 
         except Exception as e:
             return {
@@ -168,6 +233,249 @@ class CandleCollector:
                 "collected": False
             }
     
+    def _mt5_timeframe(self, timeframe: str) -> Optional[Timeframe]:
+        """Mapeia string de timeframe para Timeframe"""
+        tf_map = {
+            "M1": Timeframe.M1,
+            "M5": Timeframe.M5,
+            "M15": Timeframe.M15,
+            "M30": Timeframe.M30,
+            "H1": Timeframe.H1,
+        }
+        return tf_map.get(timeframe)
+    
+    def _fetch_and_store(
+        self,
+        symbol: str,
+        timeframe: str,
+        mt5_timeframe: Timeframe,
+        date_from: datetime,
+        date_to: Optional[datetime],
+        merge: bool = False
+    ) -> Dict:
+        """
+        Busca um intervalo com copy_rates_range, valida e grava em lote
+        
+        Com date_to=None busca até o momento atual e mantém só as velas já
+        fechadas (a mais recente pode estar em formação; ver closed_rates).
+        A folga de 1 dia no fim do intervalo cobre a diferença entre o
+        horário do servidor e UTC.
+        
+        Args:
+            merge: Intervalo anterior à primeira vela salva (backfill): grava
+                   com CandleStore.merge_many, sem atualizar o estado da
+                   coleta nem publicar no streaming
+        
+        Returns:
+            Dict com bars (gravadas), dropped (inválidas), last (último registro) e error
+        """
+        open_ended = date_to is None
+        if open_ended:
+            date_to = datetime.now(pytz.UTC) + timedelta(days=1)
+        
+        rates = self.mt5.get_rates_range(symbol, mt5_timeframe, date_from, date_to)
+        if rates is None:
+            return {"bars": 0, "dropped": 0, "last": None, "error": "Não foi possível obter candles do MT5"}
+        
+        records = CandleStore.from_rates(rates)
+        if open_ended:
+            period = self.timeframe_minutes.get(timeframe, 60) * 60
+            records = closed_rates(records, period, self.mt5.server_time(symbol))
+        
+        records, dropped = CandleStore.validate(records)
+        if dropped:
+            print(f"⚠️ {dropped} velas inválidas descartadas em {symbol}/{timeframe}")
+        
+        store = self.asset_service.candle_store
+        if merge:
+            written = store.merge_many(symbol, timeframe, records)
+            return {"bars": written, "dropped": dropped, "last": None, "error": None}
+        
+        written = store.append_many(symbol, timeframe, records)
+        last = records[-1:] if written else None
+        if written:
+            candle_time = datetime.fromtimestamp(int(records[-1]["time"]), tz=pytz.UTC)
+            self._record_collected(symbol, timeframe, candle_time)
+            # Delta para os clientes de streaming (backfill envia só o fim do lote)
+            event_hub.publish("candles", {
+                "symbol": symbol,
+                "timeframe": timeframe,
+                "bars": written,
+                "candles": CandleStore.to_dicts(records[-self.stream_max_candles:])
+            })
+        
+        return {"bars": written, "dropped": dropped, "last": last, "error": None}
+    
+    def get_gap(self, symbol: str, timeframe: str) -> Dict:
+        """
+        Estima a lacuna entre a última vela salva e agora
+        
+        Returns:
+            Dict com last_bar_time e missing_bars (estimativa, inclui fins de semana)
+        """
+        last_bar_time = self._get_state(symbol, timeframe)["last_bar_time"]
+        if last_bar_time is None:
+            return {"last_bar_time": None, "missing_bars": None}
+        period = self.timeframe_minutes.get(timeframe, 60) * 60
+        elapsed = (datetime.now(pytz.UTC) - last_bar_time).total_seconds()
+        return {
+            "last_bar_time": last_bar_time.isoformat(),
+            "missing_bars": max(0, int(elapsed // period) - 1)
+        }
+    
+    def backfill(
+        self,
+        symbol: str,
+        timeframe: str,
+        date_from: datetime,
+        progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Preenche o histórico de uma série desde date_from
+        
+        Se a série já tem velas, duas etapas: o intervalo entre date_from e
+        a primeira vela salva (gravado com CandleStore.merge_many) e depois
+        o que falta entre a última vela salva e agora. Busca em blocos de
+        backfill_chunk_bars velas para reportar progresso.
+        
+        Args:
+            symbol: Símbolo do ativo
+            timeframe: Timeframe
+            date_from: Início do histórico desejado (UTC)
+            progress: Callback chamado após cada bloco
+            
+        Returns:
+            Dict com bars, dropped, seconds, bars_per_second e o início da
+            série antes e depois (first_bar_before, first_bar; ISO ou None)
+        """
+        mt5_timeframe = self._mt5_timeframe(timeframe)
+        if not mt5_timeframe:
+            return {"success": False, "message": f"Timeframe {timeframe} não suportado"}
+        
+        if date_from.tzinfo is None:
+            date_from = date_from.replace(tzinfo=pytz.UTC)
+        
+        minutes = self.timeframe_minutes.get(timeframe, 60)
+        totals = {"bars": 0, "dropped": 0, "start": time.perf_counter()}
+        
+        store = self.asset_service.candle_store
+        first = store.first(symbol, timeframe)
+        first_time = datetime.fromtimestamp(int(first["time"]), tz=pytz.UTC) if first is not None else None
+        if first_time is not None:
+            if date_from < first_time:
+                # Intervalo de copy_rates_range é inclusivo: termina antes da primeira vela
+                error = self._backfill_range(
+                    symbol, timeframe, mt5_timeframe, date_from,
+                    first_time - timedelta(seconds=1), totals, progress
+                )
+                if error:
+                    return {"success": False, "message": error, "bars": totals["bars"]}
+        
+        last_bar_time = self._get_state(symbol, timeframe)["last_bar_time"]
+        if last_bar_time and last_bar_time >= date_from:
+            date_from = last_bar_time + timedelta(minutes=minutes)
+        error = self._backfill_range(symbol, timeframe, mt5_timeframe, date_from, None, totals, progress)
+        if error:
+            return {"success": False, "message": error, "bars": totals["bars"]}
+        
+        elapsed = time.perf_counter() - totals["start"]
+        first = store.first(symbol, timeframe)
+        return {
+            "success": True,
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "bars": totals["bars"],
+            "dropped": totals["dropped"],
+            "first_bar_before": first_time.isoformat() if first_time else None,
+            "first_bar": datetime.fromtimestamp(int(first["time"]), tz=pytz.UTC).isoformat() if first is not None else None,
+            "seconds": round(elapsed, 3),
+            "bars_per_second": round(totals["bars"] / elapsed, 1) if elapsed > 0 else 0.0
+        }
+    
+    def _backfill_range(
+        self,
+        symbol: str,
+        timeframe: str,
+        mt5_timeframe: Timeframe,
+        date_from: datetime,
+        date_to: Optional[datetime],
+        totals: Dict,
+        progress: Optional[Callable[[Dict], None]]
+    ) -> Optional[str]:
+        """
+        Busca e grava [date_from, date_to] em blocos (date_to=None: até agora, no fim da série)
+        
+        Um date_to informado é um intervalo antes da primeira vela salva,
+        gravado com merge. Soma bars/dropped em totals.
+        
+        Returns:
+            Mensagem de erro ou None
+        """
+        minutes = self.timeframe_minutes.get(timeframe, 60)
+        chunk = timedelta(minutes=minutes * self.backfill_chunk_bars)
+        merge = date_to is not None
+        cursor = date_from
+        
+        while True:
+            chunk_end = cursor + chunk
+            if merge:
+                final = chunk_end >= date_to
+                chunk_end = min(chunk_end, date_to)
+            else:
+                final = chunk_end >= datetime.now(pytz.UTC)
+            result = self._fetch_and_store(
+                symbol, timeframe, mt5_timeframe, cursor,
+                chunk_end if merge or not final else None, merge=merge
+            )
+            if result["error"]:
+                return result["error"]
+            
+            totals["bars"] += result["bars"]
+            totals["dropped"] += result["dropped"]
+            elapsed = time.perf_counter() - totals["start"]
+            
+            if progress:
+                progress({
+                    "symbol": symbol,
+                    "timeframe": timeframe,
+                    "until": min(chunk_end, datetime.now(pytz.UTC)).isoformat(),
+                    "bars": totals["bars"],
+                    "bars_per_second": totals["bars"] / elapsed if elapsed > 0 else 0.0
+                })
+            
+            if final:
+                return None
+            # Intervalo de copy_rates_range é inclusivo: avançar 1 segundo
+            cursor = chunk_end + timedelta(seconds=1)
+    
+    def backfill_all_active_assets(
+        self,
+        date_from: datetime,
+        progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Preenche o histórico de todos os ativos ativos desde date_from
+        
+        Returns:
+            Dict com total de velas, bars_per_second e detalhes por série
+        """
+        start = time.perf_counter()
+        results = {"success": True, "bars": 0, "details": []}
+        
+        for asset in self.asset_service.get_active_assets():
+            for timeframe in asset.get("timeframes", ["H1"]):
+                result = self.backfill(asset["symbol"], timeframe, date_from, progress)
+                results["details"].append(result)
+                results["bars"] += result.get("bars", 0)
+                if not result.get("success"):
+                    results["success"] = False
+        
+        self.flush_state(force=True)
+        elapsed = time.perf_counter() - start
+        results["seconds"] = round(elapsed, 3)
+        results["bars_per_second"] = round(results["bars"] / elapsed, 1) if elapsed > 0 else 0.0
+        return results
+    
     def collect_all_active_assets(self) -> Dict:
         """
         Coleta velas de todos os ativos ativos
@@ -209,6 +517,7 @@ class CandleCollector:
                     })
                 else:
                     results["errors"] += 1
+                    self._record_error(symbol, timeframe)
                     results["details"].append({
                         "symbol": symbol,
                         "timeframe": timeframe,
@@ -216,5 +525,7 @@ class CandleCollector:
                         "reason": result.get("message")
                     })
         
+        self.flush_state()
+        
         return results
 
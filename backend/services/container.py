@@ -0,0 +1,115 @@
+"""
+Container de Serviços
+Singletons do backend construídos sob demanda (no primeiro uso), uma única vez
+"""
+
+import threading
+import time
+from typing import Callable, Dict
+
+class ServiceContainer:
+    """
+    Registro de fábricas e instâncias únicas dos serviços
+
+    Importar o container não importa nem constrói nenhum serviço: cada
+    fábrica importa seu módulo e cria a instância na primeira chamada de
+    get(). Assim o import da API não carrega MetaTrader5 e rotas que só
+    leem ativos não abrem o banco de trades nem o terminal.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], object]] = {}
+        self._instances: Dict[str, object] = {}
+        self._build_ms: Dict[str, float] = {}
+        # Reentrante: fábricas pedem suas dependências ao próprio container
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], object]):
+        """Registra a fábrica de um serviço (substitui a instância, se houver)"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str):
+        """Instância do serviço, construída na primeira chamada"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                # Inclui a construção das dependências ainda não criadas
+                self._build_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+            return self._instances[name]
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    @property
+    def bot_service(self):
+        return self.get("bot_service")
+
+    @property
+    def asset_service(self):
+        return self.get("asset_service")
+
+    @property
+    def mt5_connector(self):
+        return self.get("mt5_connector")
+
+    @property
+    def candle_collector(self):
+        return self.get("candle_collector")
+
+    @property
+    def backtester(self):
+        return self.get("backtester")
+
+    def shutdown(self):
+        """Encerra apenas os serviços que chegaram a ser construídos"""
+        if self.is_built("bot_service"):
+            self.bot_service.shutdown()
+        elif self.is_built("candle_collector"):
+            self.candle_collector.flush_state(force=True)
+
+    def get_stats(self) -> Dict:
+        """Serviços construídos e tempo de construção (ms)"""
+        with self._lock:
+            return {
+                "registered": sorted(self._factories),
+                "built": dict(self._build_ms)
+            }
+
+def _asset_service():
+    from services.asset_service import AssetService
+    return AssetService()
+
+def _mt5_connector():
+    from mt5.connector import MT5Connector
+    return MT5Connector()
+
+def _candle_collector():
+    from services.candle_collector import CandleCollector
+    return CandleCollector(container.mt5_connector, container.asset_service)
+
+def _bot_service():
+    from services.bot_service import BotService
+    return BotService(
+        mt5_connector=container.mt5_connector,
+        asset_service=container.asset_service,
+        candle_collector=container.candle_collector
+    )
+
+def _backtester():
+    from core_ai.backtest import Backtester
+    return Backtester()
+
+# Instância global (a API e o bot compartilham conexão MT5, ativos e coletor)
+container = ServiceContainer()
+container.register("asset_service", _asset_service)
+container.register("mt5_connector", _mt5_connector)
+container.register("candle_collector", _candle_collector)
+container.register("bot_service", _bot_service)
+container.register("backtester", _backtester)
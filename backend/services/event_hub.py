@@ -0,0 +1,151 @@
+"""
+Hub de Eventos (pub/sub)
+Logs, decisões, trades, status e velas novas publicados pelo backend e
+entregues aos clientes de streaming (WebSocket/SSE) como deltas
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set
+
+TOPICS = ("log", "decision", "trade", "status", "candles")
+
+class Subscription:
+    """
+    Fila de um cliente: limitada, descarta os eventos mais antigos quando cheia
+
+    Alimentada por qualquer thread (publish) e consumida no event loop do
+    cliente (next_events).
+    """
+
+    def __init__(self, topics: Set[str], maxsize: int, loop: asyncio.AbstractEventLoop):
+        self.topics = topics
+        self.queue: Deque[Dict] = deque(maxlen=maxsize)
+        self.dropped = 0
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def _push(self, event: Dict):
+        """Enfileira (com o lock do hub) e acorda o consumidor"""
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(event)
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # event loop do cliente já encerrado
+
+    async def next_events(self, timeout: float) -> List[Dict]:
+        """
+        Eventos pendentes (espera até `timeout` s; lista vazia se nada chegou)
+
+        Se eventos foram descartados por falta de espaço, a lista começa com
+        um evento "dropped" com a quantidade perdida (o cliente deve
+        recarregar o estado pela API REST).
+        """
+        deadline = self._loop.time() + timeout
+        # Avisos de eventos já consumidos podem acordar a espera com a fila vazia
+        while not self.queue:
+            self._ready.clear()
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return []
+            try:
+                await asyncio.wait_for(self._ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                return []
+
+        events = []
+        while self.queue:
+            events.append(self.queue.popleft())
+        if self.dropped:
+            events.insert(0, {"seq": events[0]["seq"] - 1 if events else 0, "topic": "dropped", "timestamp": time.time(), "data": {"count": self.dropped}})
+            self.dropped = 0
+        return events
+
+class EventHub:
+    """
+    Publica eventos numerados em sequência e distribui aos assinantes
+
+    Os últimos `history` eventos ficam em memória para que um cliente que
+    reconecta retome a partir do último `seq` recebido; se ele ficou para
+    trás do histórico, recebe um evento "reset".
+    """
+
+    def __init__(self, history: int = 5000, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._history: Deque[Dict] = deque(maxlen=history)
+        self._subscribers: List[Subscription] = []
+        self._seq = 0
+        self._published: Dict[str, int] = {}
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def publish(self, topic: str, data: Dict) -> int:
+        """
+        Publica um evento (thread-safe, não bloqueia)
+
+        Returns:
+            Número de sequência do evento
+        """
+        with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, "topic": topic, "timestamp": time.time(), "data": data}
+            self._history.append(event)
+            self._published[topic] = self._published.get(topic, 0) + 1
+            for subscription in self._subscribers:
+                if topic in subscription.topics:
+                    before = subscription.dropped
+                    subscription._push(event)
+                    self._dropped += subscription.dropped - before
+            return self._seq
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, last_seq: Optional[int] = None) -> Subscription:
+        """
+        Registra um assinante no event loop atual
+
+        Args:
+            topics: Tópicos desejados (padrão: todos)
+            last_seq: Último seq recebido pelo cliente; eventos posteriores
+                      ainda no histórico são reenviados. None = só eventos novos
+
+        Returns:
+            Subscription (liberar com unsubscribe)
+        """
+        subscription = Subscription(set(topics or TOPICS), self.queue_size, asyncio.get_running_loop())
+        with self._lock:
+            if last_seq is not None and last_seq < self._seq:
+                oldest = self._history[0]["seq"] if self._history else self._seq + 1
+                if last_seq < oldest - 1:
+                    subscription._push({"seq": last_seq, "topic": "reset", "timestamp": time.time(), "data": {"oldest_seq": oldest}})
+                for event in self._history:
+                    if event["seq"] > last_seq and event["topic"] in subscription.topics:
+                        subscription._push(event)
+                self._dropped += subscription.dropped
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def get_stats(self) -> Dict:
+        """Sequência atual, assinantes, eventos por tópico e descartes por backpressure"""
+        with self._lock:
+            return {
+                "seq": self._seq,
+                "history": len(self._history),
+                "subscribers": len(self._subscribers),
+                "published": dict(self._published),
+                "dropped": self._dropped
+            }
+
+# Instância global (publicada por BotService e CandleCollector, consumida pela API)
+event_hub = EventHub()
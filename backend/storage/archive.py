@@ -0,0 +1,117 @@
+"""
+Arquivo Mensal - Partições SQLite por mês
+Linhas antigas de ai_decisions e trades saem do banco principal para
+um banco por mês ({YYYY-MM}.db), com o mesmo esquema das tabelas
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+_MONTH_FILE = re.compile(r"^(\d{4}-\d{2})\.db$")
+
+class ArchiveStore:
+    """
+    Diretório de partições mensais somente-anexação
+
+    - append grava um lote de linhas de uma tabela na partição do mês
+      (INSERT OR IGNORE pela chave primária: repetir um lote é seguro)
+    - reader abre a partição em modo somente leitura para consultas
+    - months lista as partições existentes, mais recentes primeiro
+    """
+
+    def __init__(self, archive_dir: str):
+        self.archive_dir = archive_dir
+        self._months: Optional[List[str]] = None
+        self._lock = threading.Lock()
+
+    def path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"{month}.db")
+
+    def months(self, newest: Optional[str] = None) -> List[str]:
+        """
+        Meses arquivados (YYYY-MM), do mais recente ao mais antigo
+
+        Args:
+            newest: Horário (ou mês) limite: partições de meses posteriores
+                    não são listadas (não têm linhas até ele)
+        """
+        with self._lock:
+            if self._months is None:
+                names = os.listdir(self.archive_dir) if os.path.isdir(self.archive_dir) else []
+                matches = (_MONTH_FILE.match(name) for name in names)
+                self._months = sorted((match.group(1) for match in matches if match), reverse=True)
+            months = list(self._months)
+        if newest is not None:
+            months = [month for month in months if month <= str(newest)[:7]]
+        return months
+
+    def append(self, month: str, table: str, schema: Sequence[str],
+               columns: Sequence[Dict], rows: List[tuple]) -> int:
+        """
+        Grava linhas na partição do mês (cria banco e tabela se preciso)
+
+        Args:
+            schema: CREATE TABLE/INDEX da tabela no banco principal (sqlite_master)
+            columns: PRAGMA table_info da tabela no banco principal (name, type),
+                     na mesma ordem dos valores de cada linha
+            rows: Linhas a arquivar
+
+        Returns:
+            Quantidade de linhas novas na partição
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        conn = sqlite3.connect(self.path(month))
+        try:
+            for statement in schema:
+                conn.execute(re.sub(r"^CREATE (TABLE|INDEX) ", r"CREATE \1 IF NOT EXISTS ", statement))
+            # Colunas adicionadas ao banco principal depois da criação da partição
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column in columns:
+                if column["name"] not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column['name']} {column['type']}")
+            names = ", ".join(column["name"] for column in columns)
+            placeholders = ", ".join("?" * len(columns))
+            before = conn.total_changes
+            conn.executemany(f"INSERT OR IGNORE INTO {table} ({names}) VALUES ({placeholders})", rows)
+            conn.commit()
+            inserted = conn.total_changes - before
+        finally:
+            conn.close()
+
+        with self._lock:
+            if self._months is not None and month not in self._months:
+                self._months = sorted(self._months + [month], reverse=True)
+        return inserted
+
+    @contextmanager
+    def reader(self, month: str):
+        """Conexão somente leitura da partição"""
+        conn = sqlite3.connect(f"file:{self.path(month)}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def writer(self, month: str):
+        """Conexão de escrita da partição (commit ao sair), para migrações do esquema"""
+        conn = sqlite3.connect(self.path(month))
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def has_table(conn: sqlite3.Connection, table: str) -> bool:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+    def get_stats(self) -> Dict:
+        """Partições e tamanho total em disco"""
+        months = self.months()
+        size = sum(os.path.getsize(self.path(month)) for month in months if os.path.exists(self.path(month)))
+        return {"dir": self.archive_dir, "months": len(months), "bytes": size}
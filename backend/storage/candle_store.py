@@ -0,0 +1,340 @@
+"""
+Armazenamento Binário de Velas
+Arquivo append-only de largura fixa por ativo/timeframe
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+# Registro: epoch (s) int64 + OHLC float64 + volume int64 = 48 bytes
+CANDLE_DTYPE = np.dtype([
+    ("time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<i8"),
+])
+RECORD_SIZE = CANDLE_DTYPE.itemsize
+
+# Um lock por processo: API e bot usam instâncias diferentes sobre os mesmos arquivos
+_write_lock = threading.Lock()
+
+def to_epoch(value: Union[str, datetime, int, float]) -> int:
+    """Converte timestamp (ISO, datetime ou epoch) para epoch em segundos (UTC)"""
+    if isinstance(value, (int, float, np.integer)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        # Velas do MT5 chegam sem fuso e estão em UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+def epoch_to_iso(epoch: int) -> str:
+    """Converte epoch para ISO sem fuso (mesmo formato das velas em JSON)"""
+    return datetime.fromtimestamp(int(epoch), tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+class CandleStore:
+    """
+    Armazenamento de velas em arquivos binários `<SYMBOL>/<TF>.bin`
+
+    - Append O(1) no fim do arquivo
+    - Sobrescrita in-place da última vela (mesmo timestamp)
+    - Histórico anterior à primeira vela (backfill) entra por merge_many,
+      que regrava o arquivo e o troca atomicamente
+    - Leitura via memory-map; read(limit=N) é um slice sem cópia da cauda
+    """
+
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+        os.makedirs(base_dir, exist_ok=True)
+
+    def path(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.base_dir, symbol, f"{timeframe}.bin")
+
+    def count(self, symbol: str, timeframe: str) -> int:
+        """Quantidade de velas armazenadas"""
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // RECORD_SIZE
+
+    @staticmethod
+    def to_record(candle: Dict) -> np.ndarray:
+        """Converte dicionário de vela para registro binário"""
+        record = np.zeros(1, dtype=CANDLE_DTYPE)
+        record["time"] = to_epoch(candle["timestamp"])
+        record["open"] = float(candle["open"])
+        record["high"] = float(candle["high"])
+        record["low"] = float(candle["low"])
+        record["close"] = float(candle["close"])
+        record["volume"] = int(candle.get("volume", 0) or 0)
+        return record
+
+    @staticmethod
+    def to_dicts(records: np.ndarray) -> List[Dict]:
+        """Converte registros binários para dicionários (formato da API)"""
+        return [
+            {
+                "timestamp": epoch_to_iso(r["time"]),
+                "open": float(r["open"]),
+                "high": float(r["high"]),
+                "low": float(r["low"]),
+                "close": float(r["close"]),
+                "volume": int(r["volume"])
+            }
+            for r in records
+        ]
+
+    @staticmethod
+    def from_rates(rates: np.ndarray) -> np.ndarray:
+        """Converte o array de rates do MT5 para CANDLE_DTYPE"""
+        records = np.zeros(len(rates), dtype=CANDLE_DTYPE)
+        records["time"] = rates["time"]
+        for field in ("open", "high", "low", "close"):
+            records[field] = rates[field]
+        names = rates.dtype.names or ()
+        if "tick_volume" in names:
+            records["volume"] = rates["tick_volume"]
+        elif "volume" in names:
+            records["volume"] = rates["volume"]
+        return records
+
+    @staticmethod
+    def validate(records: np.ndarray) -> Tuple[np.ndarray, int]:
+        """
+        Valida velas antes da gravação em lote
+
+        Descarta preços não finitos/não positivos e OHLC inconsistente,
+        ordena por tempo e remove timestamps duplicados.
+
+        Returns:
+            (registros válidos, quantidade descartada)
+        """
+        if len(records) == 0:
+            return records, 0
+        o, h, l, c = records["open"], records["high"], records["low"], records["close"]
+        ok = (
+            np.isfinite(o) & np.isfinite(h) & np.isfinite(l) & np.isfinite(c)
+            & (l > 0)
+            & (h >= l)
+            & (h >= np.maximum(o, c))
+            & (l <= np.minimum(o, c))
+            & (records["volume"] >= 0)
+        )
+        valid = records[ok]
+        valid = valid[np.argsort(valid["time"], kind="stable")]
+        if len(valid) > 1:
+            keep = np.append(valid["time"][1:] != valid["time"][:-1], True)
+            valid = valid[keep]
+        return valid, len(records) - len(valid)
+
+    def append_many(self, symbol: str, timeframe: str, records: np.ndarray) -> int:
+        """
+        Grava um lote de velas ordenadas em uma única escrita
+
+        Registros com tempo igual à última vela a sobrescrevem; registros
+        mais antigos que a última vela são ignorados.
+
+        Returns:
+            Quantidade de velas gravadas
+        """
+        if len(records) == 0:
+            return 0
+        path = self.path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with _write_lock:
+            mode = "r+b" if os.path.exists(path) else "w+b"
+            with open(path, mode) as f:
+                f.seek(0, os.SEEK_END)
+                n = f.tell() // RECORD_SIZE
+                f.truncate(n * RECORD_SIZE)
+                offset = n
+                if n > 0:
+                    f.seek((n - 1) * RECORD_SIZE)
+                    last_time = int(np.frombuffer(f.read(RECORD_SIZE), dtype=CANDLE_DTYPE)[0]["time"])
+                    records = records[records["time"] >= last_time]
+                    if len(records) and int(records[0]["time"]) == last_time:
+                        offset = n - 1
+                f.seek(offset * RECORD_SIZE)
+                f.write(records.tobytes())
+        return len(records)
+
+    def merge_many(self, symbol: str, timeframe: str, records: np.ndarray) -> int:
+        """
+        Insere velas em qualquer posição (ex: histórico antes da primeira vela)
+
+        O arquivo mesclado é gravado ao lado e trocado com os.replace: leitores
+        veem o arquivo antigo ou o novo, nunca um parcial. Velas já gravadas
+        são mantidas quando o horário se repete.
+
+        Returns:
+            Quantidade de velas novas
+        """
+        if len(records) == 0:
+            return 0
+        path = self.path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with _write_lock:
+            n = os.path.getsize(path) // RECORD_SIZE if os.path.exists(path) else 0
+            existing = np.fromfile(path, dtype=CANDLE_DTYPE, count=n) if n else np.empty(0, dtype=CANDLE_DTYPE)
+            merged = np.concatenate([existing, records])
+            # Ordenação estável: no horário repetido a vela gravada vem primeiro e fica
+            merged = merged[np.argsort(merged["time"], kind="stable")]
+            if len(merged) > 1:
+                keep = np.insert(merged["time"][1:] != merged["time"][:-1], 0, True)
+                merged = merged[keep]
+            tmp_path = path + ".tmp"
+            merged.tofile(tmp_path)
+            os.replace(tmp_path, path)
+        return len(merged) - n
+
+    def append(self, symbol: str, timeframe: str, candle: Dict) -> bool:
+        """
+        Grava uma vela
+
+        Mesmo timestamp da última vela: sobrescreve in-place.
+        Timestamp mais novo: append no fim do arquivo.
+        Timestamp mais antigo (raro): insere/atualiza na posição ordenada.
+        """
+        record = self.to_record(candle)
+        path = self.path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with _write_lock:
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(record.tobytes())
+                return True
+
+            size = os.path.getsize(path)
+            n = size // RECORD_SIZE
+            with open(path, "r+b") as f:
+                if size % RECORD_SIZE:
+                    # Descartar registro parcial de uma escrita interrompida
+                    f.truncate(n * RECORD_SIZE)
+
+                if n > 0:
+                    f.seek((n - 1) * RECORD_SIZE)
+                    last_time = int(np.frombuffer(f.read(RECORD_SIZE), dtype=CANDLE_DTYPE)[0]["time"])
+                    new_time = int(record[0]["time"])
+
+                    if new_time == last_time:
+                        f.seek((n - 1) * RECORD_SIZE)
+                        f.write(record.tobytes())
+                        return True
+                    if new_time < last_time:
+                        return self._insert_sorted(f, n, record)
+
+                f.seek(n * RECORD_SIZE)
+                f.write(record.tobytes())
+                return True
+
+    def _insert_sorted(self, f, n: int, record: np.ndarray) -> bool:
+        """Insere vela fora de ordem (reescreve a partir da posição)"""
+        f.seek(0)
+        data = np.frombuffer(f.read(n * RECORD_SIZE), dtype=CANDLE_DTYPE)
+        pos = int(np.searchsorted(data["time"], record[0]["time"]))
+        if pos < n and data[pos]["time"] == record[0]["time"]:
+            f.seek(pos * RECORD_SIZE)
+            f.write(record.tobytes())
+            return True
+        f.seek(pos * RECORD_SIZE)
+        f.write(record.tobytes())
+        f.write(data[pos:].tobytes())
+        return True
+
+    def read(self, symbol: str, timeframe: str, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Lê velas via memory-map
+
+        Returns:
+            Array estruturado (CANDLE_DTYPE); com limit, apenas a cauda (sem cópia)
+        """
+        n = self.count(symbol, timeframe)
+        if n == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        data = np.memmap(self.path(symbol, timeframe), dtype=CANDLE_DTYPE, mode="r", shape=(n,))
+        if limit:
+            return data[-limit:]
+        return data
+
+    def first(self, symbol: str, timeframe: str) -> Optional[np.void]:
+        """Retorna o primeiro registro sem mapear o arquivo inteiro"""
+        if self.count(symbol, timeframe) == 0:
+            return None
+        with open(self.path(symbol, timeframe), "rb") as f:
+            return np.frombuffer(f.read(RECORD_SIZE), dtype=CANDLE_DTYPE)[0]
+
+    def last(self, symbol: str, timeframe: str) -> Optional[np.void]:
+        """Retorna o último registro sem mapear o arquivo inteiro"""
+        path = self.path(symbol, timeframe)
+        n = self.count(symbol, timeframe)
+        if n == 0:
+            return None
+        with open(path, "rb") as f:
+            f.seek((n - 1) * RECORD_SIZE)
+            return np.frombuffer(f.read(RECORD_SIZE), dtype=CANDLE_DTYPE)[0]
+
+    def migrate_json(self, symbol: str, timeframe: str, json_path: str) -> int:
+        """
+        Converte um arquivo de velas JSON para o formato binário
+
+        O JSON é renomeado para `.json.migrated` após a conversão.
+
+        Returns:
+            Quantidade de velas migradas
+        """
+        with open(json_path, 'r', encoding='utf-8') as f:
+            candles = json.load(f)
+
+        records = np.zeros(len(candles), dtype=CANDLE_DTYPE)
+        for i, candle in enumerate(candles):
+            records[i] = self.to_record(candle)[0]
+
+        # Ordenar e remover timestamps duplicados (mantém a última ocorrência)
+        records = records[np.argsort(records["time"], kind="stable")]
+        if len(records) > 1:
+            keep = np.append(records["time"][1:] != records["time"][:-1], True)
+            records = records[keep]
+
+        path = self.path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _write_lock:
+            tmp_path = path + ".tmp"
+            records.tofile(tmp_path)
+            os.replace(tmp_path, path)
+        os.replace(json_path, json_path + ".migrated")
+        return len(records)
+
+    def migrate_all(self) -> Dict[str, int]:
+        """Migra todos os `<SYMBOL>/<TF>.json` que ainda não têm arquivo binário"""
+        migrated = {}
+        if not os.path.isdir(self.base_dir):
+            return migrated
+
+        for symbol in os.listdir(self.base_dir):
+            symbol_dir = os.path.join(self.base_dir, symbol)
+            if not os.path.isdir(symbol_dir):
+                continue
+            for name in os.listdir(symbol_dir):
+                if not name.endswith(".json"):
+                    continue
+                timeframe = name[:-len(".json")]
+                if os.path.exists(self.path(symbol, timeframe)):
+                    continue
+                try:
+                    migrated[f"{symbol}/{timeframe}"] = self.migrate_json(
+                        symbol, timeframe, os.path.join(symbol_dir, name)
+                    )
+                except Exception as e:
+                    print(f"Erro ao migrar velas {symbol}/{timeframe}: {e}")
+        return migrated
@@ -0,0 +1,83 @@
+"""
+Janela Deslizante de Velas
+Últimas N velas fechadas de uma série em um buffer NumPy (views sem cópia)
+"""
+
+import numpy as np
+
+from storage.candle_store import CANDLE_DTYPE
+
+class CandleWindow:
+    """
+    Janela das últimas `size` velas fechadas (CANDLE_DTYPE)
+
+    O buffer tem capacidade 2 * size: velas novas são escritas no fim e,
+    quando ele enche, as últimas velas voltam para o início (uma cópia a
+    cada ~size velas). Assim a janela é sempre contígua e view() não copia.
+    A view é somente leitura e vale até a próxima chamada de extend().
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._buffer = np.zeros(2 * size, dtype=CANDLE_DTYPE)
+        self._end = 0
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def last_time(self) -> int:
+        """Epoch da última vela na janela (0 se vazia)"""
+        return int(self._buffer["time"][self._end - 1]) if self._length else 0
+
+    def extend(self, records: np.ndarray) -> int:
+        """
+        Acrescenta velas fechadas (ordenadas por tempo)
+
+        Velas com tempo <= last_time são ignoradas.
+
+        Returns:
+            Quantidade de velas acrescentadas
+        """
+        if self._length and len(records):
+            records = records[records["time"] > self.last_time]
+        added = len(records)
+        if added == 0:
+            return 0
+
+        if added >= self.size:
+            self._buffer[:self.size] = records[-self.size:]
+            self._end = self._length = self.size
+            return added
+
+        if self._end + added > len(self._buffer):
+            keep = min(self._length, self.size - added)
+            self._buffer[:keep] = self._buffer[self._end - keep:self._end]
+            self._end = self._length = keep
+
+        self._buffer[self._end:self._end + added] = records
+        self._end += added
+        self._length = min(self._length + added, self.size)
+        return added
+
+    def view(self) -> np.ndarray:
+        """Velas da janela, da mais antiga para a mais recente (sem cópia)"""
+        view = self._buffer[self._end - self._length:self._end]
+        view.flags.writeable = False
+        return view
+
+    @staticmethod
+    def to_frame(records: np.ndarray):
+        """Adaptador para código que precisa de DataFrame (mesmo formato de MT5Connector.get_candles)"""
+        import pandas as pd
+
+        df = pd.DataFrame({
+            "open": records["open"],
+            "high": records["high"],
+            "low": records["low"],
+            "close": records["close"],
+            "volume": records["volume"],
+        }, index=pd.to_datetime(records["time"], unit="s"))
+        df.index.name = "time"
+        return df
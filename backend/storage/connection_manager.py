@@ -0,0 +1,173 @@
+"""
+Gerenciador de Conexões SQLite
+Mantém uma conexão de escrita persistente (WAL) e um pool de leitura
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from queue import Queue, Empty
+from typing import Dict, Optional
+
+class ConnectionManager:
+    """
+    Gerenciador de conexões SQLite em modo WAL
+
+    - Uma única conexão de escrita, persistente e serializada por lock
+    - Pool pequeno de conexões de leitura (leitores nunca bloqueiam a escrita)
+    - Pragmas ajustáveis (synchronous, cache_size, mmap_size)
+    - Tempos por consulta para diagnóstico
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        read_pool_size: int = 4,
+        synchronous: str = "NORMAL",
+        cache_size: int = -16000,
+        mmap_size: int = 64 * 1024 * 1024,
+        busy_timeout_ms: int = 5000
+    ):
+        self.db_path = db_path
+        self.read_pool_size = max(1, read_pool_size)
+        self.pragmas = {
+            "synchronous": synchronous,
+            "cache_size": cache_size,
+            "mmap_size": mmap_size,
+            "busy_timeout": busy_timeout_ms,
+        }
+
+        self._write_lock = threading.RLock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._readers: Queue = Queue(maxsize=self.read_pool_size)
+        self._readers_created = 0
+        self._pool_lock = threading.Lock()
+        self._closed = False
+
+        # Estatísticas por consulta: label -> {count, total_ms, max_ms}
+        self._stats: Dict[str, Dict] = {}
+        self._stats_lock = threading.Lock()
+
+    def _open(self, readonly: bool = False) -> sqlite3.Connection:
+        """Abre uma conexão configurada com os pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=self.pragmas["busy_timeout"] / 1000
+        )
+        # Antes do modo WAL, que grava o cabeçalho: só vale em banco novo (bancos
+        # existentes são convertidos pelo RetentionManager com um VACUUM único)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.pragmas['synchronous']}")
+        conn.execute(f"PRAGMA cache_size={int(self.pragmas['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size={int(self.pragmas['mmap_size'])}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.pragmas['busy_timeout'])}")
+        if readonly:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def _get_writer(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("ConnectionManager já foi fechado")
+        if self._writer is None:
+            self._writer = self._open()
+        return self._writer
+
+    @contextmanager
+    def writer(self, label: str = "write"):
+        """
+        Conexão de escrita serializada
+
+        Faz commit ao sair do bloco ou rollback em caso de erro.
+        """
+        with self._write_lock:
+            conn = self._get_writer()
+            start = time.perf_counter()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._record(label, start)
+
+    @contextmanager
+    def reader(self, label: str = "read"):
+        """Conexão de leitura retirada do pool"""
+        conn = self._acquire_reader()
+        start = time.perf_counter()
+        try:
+            yield conn
+        finally:
+            self._record(label, start)
+            self._release_reader(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("ConnectionManager já foi fechado")
+        try:
+            return self._readers.get_nowait()
+        except Empty:
+            pass
+
+        with self._pool_lock:
+            if self._readers_created < self.read_pool_size:
+                self._readers_created += 1
+                conn = self._open(readonly=True)
+                conn.row_factory = sqlite3.Row
+                return conn
+
+        # Pool esgotado: aguardar uma conexão ser devolvida
+        return self._readers.get()
+
+    def _release_reader(self, conn: sqlite3.Connection):
+        if self._closed:
+            conn.close()
+            return
+        # Encerrar qualquer transação de leitura aberta para não reter o snapshot WAL
+        if conn.in_transaction:
+            conn.rollback()
+        self._readers.put(conn)
+
+    def _record(self, label: str, start: float):
+        """Registra tempo de uma consulta"""
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            stats = self._stats.setdefault(label, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Retorna tempos por consulta (count, total_ms, avg_ms, max_ms)"""
+        with self._stats_lock:
+            return {
+                label: {
+                    "count": s["count"],
+                    "total_ms": round(s["total_ms"], 3),
+                    "avg_ms": round(s["total_ms"] / s["count"], 3) if s["count"] else 0.0,
+                    "max_ms": round(s["max_ms"], 3)
+                }
+                for label, s in self._stats.items()
+            }
+
+    def reset_stats(self):
+        """Zera estatísticas de consultas"""
+        with self._stats_lock:
+            self._stats.clear()
+
+    def close(self):
+        """Fecha todas as conexões"""
+        self._closed = True
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except Empty:
+                break
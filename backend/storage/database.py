@@ -4,11 +4,45 @@ Gerencia persistência de dados para aprendizado da IA
 """
 
 import sqlite3
+import base64
 import json
-from datetime import datetime
-from typing import List, Dict, Optional
+import operator
+from datetime import datetime, timedelta
+from typing import Any, List, Dict, Optional, Tuple
 from pathlib import Path
+import math
 import os
+import re
+import time
+
+from storage.archive import ArchiveStore
+from storage.connection_manager import ConnectionManager
+
+# Indicadores das decisões guardados em colunas REAL de ai_decisions
+# (NULL = ausente ou NaN); chaves fora desta lista ficam em JSON na coluna indicators
+INDICATOR_COLUMNS = (
+    "rsi", "ma_fast", "ma_slow", "macd", "macd_signal", "macd_diff",
+    "current_price", "price_change", "volume_avg", "volume_current"
+)
+
+# Filtro de indicador aceito pela API, ex: "rsi<30", "macd_diff >= 0"
+_FILTER_PATTERN = re.compile(r"^\s*(\w+)\s*(<=|>=|<|>|=)\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*$")
+
+# Operadores dos filtros de indicador avaliados em Python (primeira decisão de uma sequência)
+_FILTER_OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "=": operator.eq}
+
+# Versão do esquema (PRAGMA user_version); 1 = índices de paginação + indicadores
+# em colunas, 2 = sequências de decisões com repetições em ai_decision_repeats
+SCHEMA_VERSION = 3
+
+# Ações cujas repetições consecutivas (mesmo símbolo, timeframe e motivo)
+# formam uma sequência; a confiança e os indicadores de cada repetição são
+# guardados, então não fazem parte da chave
+RUN_ACTIONS = ("HOLD",)
+
+# Duração máxima de uma sequência (depois disso outra começa): limita até
+# onde a página por cursor procura sequências iniciadas antes do cursor
+RUN_MAX_SPAN = timedelta(hours=1)
 
 class Database:
     """
@@ -19,11 +53,35 @@ class Database:
     - Decisões da IA
     - Resultados de trades
     - Configurações
+    
+    Usa uma conexão de escrita persistente em modo WAL e um pool
+    de leitura (ver ConnectionManager), para que as consultas da API
+    não bloqueiem as escritas do loop do bot.
+    
+    Decisões HOLD repetidas a cada análise viram uma sequência: a linha de
+    ai_decisions guarda a primeira decisão e, quando a sequência fecha, o
+    horário da última (last_seen) e a quantidade (count); cada repetição
+    ocupa uma linha em ai_decision_repeats (horário, confiança e
+    indicadores), sem índices secundários. As listagens expandem as
+    sequências: cada decisão aparece com os próprios valores.
+    
+    Decisões e trades antigos ficam em partições mensais (ver
+    ArchiveStore e RetentionManager); as listagens paginadas continuam
+    nelas quando o banco principal acaba.
     """
     
-    def __init__(self, db_path: str = "data/trading_bot.db"):
+    def __init__(self, db_path: str = "data/trading_bot.db", **pragmas):
         self.db_path = db_path
         self._ensure_data_dir()
+        self.connections = ConnectionManager(db_path, **pragmas)
+        # data/trading_bot.db -> data/archive/trading_bot/{YYYY-MM}.db
+        self.archive = ArchiveStore(os.path.join(
+            os.path.dirname(db_path), "archive", os.path.splitext(os.path.basename(db_path))[0]
+        ))
+        # Sequência aberta por (símbolo, timeframe), ou None:
+        # [id, action, reason, count, last_seen, início (datetime), última (datetime)].
+        # Acessado só dentro da transação de escrita
+        self._open_runs: Dict[Tuple[str, str], Optional[list]] = {}
         self._init_database()
     
     def _ensure_data_dir(self):
@@ -32,202 +90,760 @@ class Database:
     
     def _init_database(self):
         """Inicializa o banco de dados e cria tabelas"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Tabela de decisões da IA
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS ai_decisions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                action TEXT NOT NULL,
-                confidence REAL NOT NULL,
-                reason TEXT,
-                indicators TEXT,
-                symbol TEXT,
-                timeframe TEXT
-            )
-        """)
-        
-        # Tabela de trades
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS trades (
-                id TEXT PRIMARY KEY,
-                symbol TEXT NOT NULL,
-                type TEXT NOT NULL,
-                entry_price REAL NOT NULL,
-                exit_price REAL,
-                volume REAL NOT NULL,
-                stop_loss REAL NOT NULL,
-                take_profit REAL NOT NULL,
-                profit REAL,
-                status TEXT NOT NULL,
-                open_time TEXT NOT NULL,
-                close_time TEXT,
-                ai_decision_id INTEGER,
-                FOREIGN KEY (ai_decision_id) REFERENCES ai_decisions(id)
-            )
-        """)
-        
-        # Tabela de candles (para histórico)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS candles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL,
-                timeframe TEXT NOT NULL,
-                timestamp TEXT NOT NULL,
-                open REAL NOT NULL,
-                high REAL NOT NULL,
-                low REAL NOT NULL,
-                close REAL NOT NULL,
-                volume INTEGER NOT NULL,
-                UNIQUE(symbol, timeframe, timestamp)
-            )
-        """)
-        
-        # Tabela de configurações
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS config (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
-        """)
+        with self.connections.writer("init_database") as conn:
+            cursor = conn.cursor()
+            
+            # Tabela de decisões da IA
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ai_decisions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    reason TEXT,
+                    indicators TEXT,
+                    symbol TEXT,
+                    timeframe TEXT
+                )
+            """)
+            existing = {row[1] for row in cursor.execute("PRAGMA table_info(ai_decisions)")}
+            for column in INDICATOR_COLUMNS:
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE ai_decisions ADD COLUMN {column} REAL")
+            # Sequências de decisões (last_seen NULL = sequência aberta)
+            if "last_seen" not in existing:
+                cursor.execute("ALTER TABLE ai_decisions ADD COLUMN last_seen TEXT")
+            if "count" not in existing:
+                cursor.execute("ALTER TABLE ai_decisions ADD COLUMN count INTEGER NOT NULL DEFAULT 1")
+            
+            # Repetições das sequências (seq 0 é a própria linha de ai_decisions)
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS ai_decision_repeats (
+                    run_id INTEGER NOT NULL,
+                    seq INTEGER NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    indicators TEXT,
+                    {", ".join(f"{column} REAL" for column in INDICATOR_COLUMNS)},
+                    PRIMARY KEY (run_id, seq)
+                ) WITHOUT ROWID
+            """)
+            
+            # Tabela de trades
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS trades (
+                    id TEXT PRIMARY KEY,
+                    symbol TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    entry_price REAL NOT NULL,
+                    exit_price REAL,
+                    volume REAL NOT NULL,
+                    stop_loss REAL NOT NULL,
+                    take_profit REAL NOT NULL,
+                    profit REAL,
+                    status TEXT NOT NULL,
+                    open_time TEXT NOT NULL,
+                    close_time TEXT,
+                    ai_decision_id INTEGER,
+                    ticket INTEGER,
+                    FOREIGN KEY (ai_decision_id) REFERENCES ai_decisions(id)
+                )
+            """)
+            
+            # Tabela de candles (para histórico)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS candles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    open REAL NOT NULL,
+                    high REAL NOT NULL,
+                    low REAL NOT NULL,
+                    close REAL NOT NULL,
+                    volume INTEGER NOT NULL,
+                    UNIQUE(symbol, timeframe, timestamp)
+                )
+            """)
+            
+            # Tabela de configurações
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS config (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
         
-        conn.commit()
-        conn.close()
+        self._migrate()
     
-    def save_ai_decision(self, decision: Dict, symbol: str, timeframe: str) -> int:
-        """Salva decisão da IA"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO ai_decisions 
-            (timestamp, action, confidence, reason, indicators, symbol, timeframe)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
+    def _migrate(self):
+        """
+        Aplica as etapas de migração pendentes (PRAGMA user_version)
+        
+        Cada etapa roda uma vez por banco, fora da transação de criação das
+        tabelas e com log de início e duração (em bancos grandes a criação
+        de índices e a conversão de linhas levam tempo).
+        """
+        with self.connections.writer("migrate_version") as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        
+        steps = (
+            (1, "índices de paginação", self._create_page_indexes),
+            (1, "indicadores em colunas", self._migrate_indicators),
+            (2, "sequências de decisões", self._migrate_runs),
+            (3, "ticket dos trades", self._migrate_trade_ticket),
+        )
+        for target, label, step in steps:
+            if version >= target:
+                continue
+            print(f"🔧 Migração do banco (v{target}): {label}...")
+            start = time.perf_counter()
+            step()
+            print(f"✅ Migração do banco (v{target}): {label} em {time.perf_counter() - start:.1f}s")
+        if version < SCHEMA_VERSION:
+            with self.connections.writer("migrate_version") as conn:
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    # Página de decisões: sequências fechadas por last_seen (com ou sem símbolo;
+    # o rowid = id já faz parte de todo índice) e as abertas num índice à parte.
+    # Parciais: uma sequência só entra nos índices de last_seen quando fecha,
+    # perto das entradas recentes, sem mexer em páginas antigas dos índices
+    _RUN_INDEXES = (
+        "CREATE INDEX IF NOT EXISTS idx_ai_decisions_symbol_last_seen ON ai_decisions (symbol, last_seen, timestamp) "
+        "WHERE last_seen IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS idx_ai_decisions_last_seen ON ai_decisions (last_seen, timestamp) "
+        "WHERE last_seen IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS idx_ai_decisions_open_runs ON ai_decisions (symbol, timeframe) "
+        "WHERE last_seen IS NULL",
+    )
+    
+    def _create_page_indexes(self):
+        """
+        Índices da listagem paginada de trades (mais recentes primeiro, com ou sem símbolo)
+        
+        A última coluna desempata trades com o mesmo horário. Um índice por
+        transação: o escritor fica livre entre eles.
+        """
+        indexes = (
+            "CREATE INDEX IF NOT EXISTS idx_trades_symbol_open_time ON trades (symbol, open_time, id)",
+            "CREATE INDEX IF NOT EXISTS idx_trades_open_time ON trades (open_time, id)",
+        )
+        for statement in indexes:
+            with self.connections.writer("create_index") as conn:
+                conn.execute(statement)
+    
+    def _create_run_indexes(self):
+        """Índices da listagem paginada de decisões (um por transação)"""
+        for statement in self._RUN_INDEXES:
+            with self.connections.writer("create_index") as conn:
+                conn.execute(statement)
+    
+    def _migrate_indicators(self, batch: int = 20000):
+        """
+        Migra decisões antigas (indicadores em JSON) para as colunas de indicadores
+        
+        Em lotes, uma transação curta por lote, para não segurar o escritor
+        em bancos grandes.
+        """
+        migrated = 0
+        last_id = 0
+        assignments = ", ".join(f"{column} = ?" for column in INDICATOR_COLUMNS)
+        while True:
+            with self.connections.writer("migrate_indicators") as conn:
+                rows = conn.execute(
+                    "SELECT id, indicators FROM ai_decisions WHERE id > ? AND indicators IS NOT NULL ORDER BY id LIMIT ?",
+                    (last_id, batch)
+                ).fetchall()
+                if not rows:
+                    break
+                updates = []
+                for row_id, text in rows:
+                    try:
+                        indicators = json.loads(text) if text else {}
+                    except ValueError:
+                        indicators = {}
+                    values, extra = self._split_indicators(indicators)
+                    updates.append(values + (extra, row_id))
+                conn.executemany(f"UPDATE ai_decisions SET {assignments}, indicators = ? WHERE id = ?", updates)
+                last_id = rows[-1][0]
+                migrated += len(rows)
+        if migrated:
+            print(f"✅ {migrated} decisões migradas para colunas de indicadores")
+    
+    def _migrate_runs(self, batch: int = 20000):
+        """
+        Converte as decisões da v1 em sequências fechadas
+        
+        Na v1 last_seen NULL marcava uma decisão isolada e as repetições de
+        HOLD só somavam count, sem guardar horário, confiança e indicadores:
+        todas essas linhas passam a last_seen = timestamp (a única decisão
+        guardada; count é mantido). Em lotes por id, uma transação curta por
+        lote; os índices por timestamp dão lugar aos índices por last_seen e
+        as partições arquivadas recebem a mesma conversão.
+        """
+        conversion = "UPDATE ai_decisions SET last_seen = timestamp WHERE (last_seen IS NULL OR count > 1)"
+        with self.connections.reader("migrate_runs") as conn:
+            max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM ai_decisions").fetchone()[0]
+        for start in range(0, max_id, batch):
+            with self.connections.writer("migrate_runs") as conn:
+                conn.execute(conversion + " AND id > ? AND id <= ?", (start, start + batch))
+        
+        obsolete = ("idx_ai_decisions_symbol_timestamp", "idx_ai_decisions_timestamp")
+        with self.connections.writer("migrate_runs") as conn:
+            for index in obsolete:
+                conn.execute(f"DROP INDEX IF EXISTS {index}")
+        self._create_run_indexes()
+        
+        for month in self.archive.months():
+            with self.archive.writer(month) as conn:
+                if not self.archive.has_table(conn, "ai_decisions"):
+                    continue
+                conn.execute(conversion)
+                for index in obsolete:
+                    conn.execute(f"DROP INDEX IF EXISTS {index}")
+                for statement in self._RUN_INDEXES:
+                    conn.execute(statement)
+    
+    def _migrate_trade_ticket(self):
+        """
+        Ticket da posição no MT5 para registrar o fechamento dos trades
+        
+        Trades anteriores ficam com ticket NULL (não há como ligá-los a uma
+        posição). O índice parcial cobre só os trades abertos.
+        """
+        with self.connections.writer("migrate_trade_ticket") as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(trades)")}
+            if "ticket" not in columns:
+                conn.execute("ALTER TABLE trades ADD COLUMN ticket INTEGER")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_open_ticket ON trades (ticket) WHERE status = 'OPEN'")
+    
+    @staticmethod
+    def _split_indicators(indicators: Optional[Dict]) -> Tuple[tuple, Optional[str]]:
+        """(valores das INDICATOR_COLUMNS, JSON das demais chaves ou None)"""
+        indicators = indicators or {}
+        values = []
+        for column in INDICATOR_COLUMNS:
+            value = indicators.get(column)
+            values.append(None if value is None or math.isnan(value) else float(value))
+        extra = {key: value for key, value in indicators.items() if key not in INDICATOR_COLUMNS}
+        return tuple(values), json.dumps(extra) if extra else None
+    
+    @staticmethod
+    def parse_indicator_filters(filters: Optional[List[str]]) -> List[Tuple[str, str, float]]:
+        """
+        Converte filtros como "rsi<30" em (coluna, operador, valor)
+        
+        Raises:
+            ValueError: Filtro mal formado ou indicador desconhecido
+        """
+        parsed = []
+        for text in filters or []:
+            match = _FILTER_PATTERN.match(text)
+            if not match:
+                raise ValueError(f"Filtro inválido: {text!r} (formato: indicador<valor, operadores < <= > >= =)")
+            column, operator, value = match.groups()
+            if column not in INDICATOR_COLUMNS:
+                raise ValueError(f"Indicador desconhecido: {column} (disponíveis: {', '.join(INDICATOR_COLUMNS)})")
+            parsed.append((column, operator, float(value)))
+        return parsed
+    
+    @staticmethod
+    def _matches(decision: Dict, filters: List[Tuple[str, str, float]]) -> bool:
+        """Avalia filtros de parse_indicator_filters numa decisão lida (NULL não passa, como no SQLite)"""
+        return all(
+            decision[column] is not None and _FILTER_OPERATORS[op](decision[column], value)
+            for column, op, value in filters
+        )
+    
+    @staticmethod
+    def _parse_time(value: Any) -> Optional[datetime]:
+        """Horário de uma decisão (datetime ou texto ISO) ou None se ilegível"""
+        if isinstance(value, datetime):
+            return value
+        try:
+            return datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    
+    @classmethod
+    def _shift_time(cls, value: str, delta: timedelta) -> Optional[str]:
+        """Horário em texto deslocado de delta, no mesmo formato ISO (None se ilegível)"""
+        moment = cls._parse_time(value)
+        if moment is None:
+            return None
+        return (moment + delta).isoformat(" " if " " in value else "T")
+    
+    @classmethod
+    def decision_row(cls, decision: Dict, symbol: str, timeframe: str) -> tuple:
+        """Monta a linha de ai_decisions a partir da decisão (indicadores em colunas)"""
+        values, extra = cls._split_indicators(decision.get("indicators"))
+        return (
             decision["timestamp"],
             decision["action"],
             decision["confidence"],
             decision["reason"],
-            json.dumps(decision.get("indicators", {})),
+            extra,
             symbol,
             timeframe
-        ))
+        ) + values
+    
+    @staticmethod
+    def trade_row(trade: Dict) -> tuple:
+        """Monta a linha de trades a partir do trade"""
+        return (
+            trade["id"],
+            trade["symbol"],
+            trade["type"],
+            trade["entry_price"],
+            trade.get("exit_price"),
+            trade["volume"],
+            trade["stop_loss"],
+            trade["take_profit"],
+            trade.get("profit"),
+            trade["status"],
+            trade["open_time"],
+            trade.get("close_time"),
+            trade.get("ai_decision_id"),
+            trade.get("ticket")
+        )
+    
+    _INSERT_DECISION = f"""
+        INSERT INTO ai_decisions 
+        (timestamp, action, confidence, reason, indicators, symbol, timeframe, {", ".join(INDICATOR_COLUMNS)}, last_seen)
+        VALUES (?, ?, ?, ?, ?, ?, ?, {", ".join("?" * len(INDICATOR_COLUMNS))}, ?)
+    """
+    
+    _INSERT_REPEAT = f"""
+        INSERT INTO ai_decision_repeats 
+        (run_id, seq, timestamp, confidence, indicators, {", ".join(INDICATOR_COLUMNS)})
+        VALUES (?, ?, ?, ?, ?, {", ".join("?" * len(INDICATOR_COLUMNS))})
+    """
+    
+    _INSERT_TRADE = """
+        INSERT OR REPLACE INTO trades 
+        (id, symbol, type, entry_price, exit_price, volume, stop_loss, take_profit,
+         profit, status, open_time, close_time, ai_decision_id, ticket)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    
+    @staticmethod
+    def _run_tail(conn: sqlite3.Connection, run_id: int, timestamp: Any) -> Tuple[int, Any]:
+        """(count, horário da última decisão) de uma sequência pelas repetições gravadas"""
+        last = conn.execute(
+            "SELECT seq, timestamp FROM ai_decision_repeats WHERE run_id = ? ORDER BY seq DESC LIMIT 1", (run_id,)
+        ).fetchone()
+        return (last[0] + 1, last[1]) if last else (1, timestamp)
+    
+    def _open_run(self, conn: sqlite3.Connection, series: Tuple[str, str]) -> Optional[list]:
+        """Sequência aberta da série (consulta o banco só na primeira vez)"""
+        if series not in self._open_runs:
+            run = conn.execute("""
+                SELECT id, action, reason, timestamp FROM ai_decisions
+                WHERE symbol = ? AND timeframe = ? AND last_seen IS NULL
+                ORDER BY id DESC LIMIT 1
+            """, series).fetchone()
+            if run is not None:
+                count, last_seen = self._run_tail(conn, run[0], run[3])
+                run = [run[0], run[1], run[2], count, last_seen, self._parse_time(run[3]), self._parse_time(last_seen)]
+            self._open_runs[series] = run
+        return self._open_runs[series]
+    
+    @staticmethod
+    def _extends(run: list, moment: Optional[datetime]) -> bool:
+        """Se a decisão no horário moment cabe na sequência (ordem e RUN_MAX_SPAN)"""
+        if moment is None or run[5] is None or run[6] is None:
+            return False
+        try:
+            return run[6] <= moment <= run[5] + RUN_MAX_SPAN
+        except TypeError:  # horários com e sem fuso
+            return False
+    
+    def _save_decisions(self, conn: sqlite3.Connection, rows: List[tuple]) -> List[int]:
+        """
+        Grava decisões (linhas de decision_row) na transação aberta
         
-        decision_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        Uma decisão de RUN_ACTIONS com a mesma ação e motivo da sequência
+        aberta da série vira uma repetição (uma linha sem índices em
+        ai_decision_repeats, sem tocar a linha da sequência). Qualquer outra
+        decisão fecha a sequência aberta (last_seen e count gravados uma
+        vez) e insere uma linha nova; só as de RUN_ACTIONS ficam abertas.
         
-        return decision_id
+        Returns:
+            Id da linha de cada decisão (o da sequência, para repetições)
+        """
+        ids = []
+        for row in rows:
+            timestamp, action, confidence, reason, extra = row[:5]
+            series = (row[5], row[6])
+            moment = self._parse_time(timestamp)
+            run = self._open_run(conn, series)
+            if run is not None and run[1] == action and run[2] == reason and self._extends(run, moment):
+                conn.execute(self._INSERT_REPEAT, (run[0], run[3], timestamp, confidence, extra) + row[7:])
+                run[3] += 1
+                run[4], run[6] = timestamp, moment
+                ids.append(run[0])
+                continue
+            if run is not None:
+                conn.execute("UPDATE ai_decisions SET last_seen = ?, count = ? WHERE id = ?", (run[4], run[3], run[0]))
+            if action in RUN_ACTIONS:
+                row_id = conn.execute(self._INSERT_DECISION, row + (None,)).lastrowid
+                self._open_runs[series] = [row_id, action, reason, 1, timestamp, moment, moment]
+            else:
+                row_id = conn.execute(self._INSERT_DECISION, row + (timestamp,)).lastrowid
+                self._open_runs[series] = None
+            ids.append(row_id)
+        return ids
+    
+    def close_stale_runs(self, before: str) -> int:
+        """
+        Fecha as sequências abertas cuja última decisão é anterior a before
+        
+        Usado pela retenção (só sequências fechadas são arquivadas): uma
+        sequência fica aberta enquanto o bot está parado.
+        
+        Returns:
+            Quantidade de sequências fechadas
+        """
+        closed = 0
+        try:
+            with self.connections.writer("close_stale_runs") as conn:
+                runs = conn.execute(
+                    "SELECT id, symbol, timeframe, timestamp FROM ai_decisions WHERE last_seen IS NULL AND timestamp < ?",
+                    (before,)
+                ).fetchall()
+                for run_id, symbol, timeframe, timestamp in runs:
+                    count, last_seen = self._run_tail(conn, run_id, timestamp)
+                    if str(last_seen) >= before:
+                        continue
+                    conn.execute("UPDATE ai_decisions SET last_seen = ?, count = ? WHERE id = ?", (last_seen, count, run_id))
+                    cached = self._open_runs.get((symbol, timeframe))
+                    if cached is not None and cached[0] == run_id:
+                        self._open_runs[(symbol, timeframe)] = None
+                    closed += 1
+        except Exception:
+            self._open_runs.clear()  # transação desfeita: recarrega do banco
+            raise
+        return closed
+    
+    def save_ai_decision(self, decision: Dict, symbol: str, timeframe: str) -> int:
+        """Salva decisão da IA (retorna o id da linha, que pode ser de uma sequência aberta)"""
+        try:
+            with self.connections.writer("save_ai_decision") as conn:
+                return self._save_decisions(conn, [self.decision_row(decision, symbol, timeframe)])[0]
+        except Exception:
+            self._open_runs.clear()  # transação desfeita: recarrega do banco
+            raise
     
     def save_trade(self, trade: Dict) -> bool:
         """Salva trade"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO trades 
-                (id, symbol, type, entry_price, exit_price, volume, stop_loss, take_profit,
-                 profit, status, open_time, close_time, ai_decision_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                trade["id"],
-                trade["symbol"],
-                trade["type"],
-                trade["entry_price"],
-                trade.get("exit_price"),
-                trade["volume"],
-                trade["stop_loss"],
-                trade["take_profit"],
-                trade.get("profit"),
-                trade["status"],
-                trade["open_time"],
-                trade.get("close_time"),
-                trade.get("ai_decision_id")
-            ))
-            
-            conn.commit()
-            conn.close()
+            with self.connections.writer("save_trade") as conn:
+                conn.execute(self._INSERT_TRADE, self.trade_row(trade))
             return True
         except Exception as e:
             print(f"Erro ao salvar trade: {e}")
-            conn.close()
             return False
     
+    def get_open_trades(self) -> List[Dict]:
+        """Trades abertos com ticket do MT5 (id, symbol, ticket)"""
+        with self.connections.reader("get_open_trades") as conn:
+            return self._fetch_dicts(
+                conn, "SELECT id, symbol, ticket FROM trades WHERE status = 'OPEN' AND ticket IS NOT NULL", []
+            )
+    
+    def close_trades(self, closes: List[Dict]) -> int:
+        """
+        Registra o fechamento de trades abertos
+        
+        Args:
+            closes: Dicts com id, status, exit_price, profit e close_time
+            
+        Returns:
+            Quantidade de trades atualizados
+        """
+        if not closes:
+            return 0
+        with self.connections.writer("close_trades") as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE trades SET status = ?, exit_price = ?, profit = ?, close_time = ? "
+                "WHERE id = ? AND status = 'OPEN'",
+                [(c["status"], c["exit_price"], c["profit"], c["close_time"], c["id"]) for c in closes]
+            )
+            return conn.total_changes - before
+    
+    def save_batch(self, decisions: List[tuple], trades: List[tuple]):
+        """
+        Salva lote de decisões e trades em uma única transação
+        
+        Args:
+            decisions: Linhas montadas com decision_row
+            trades: Linhas montadas com trade_row
+        """
+        try:
+            with self.connections.writer("save_batch") as conn:
+                if decisions:
+                    self._save_decisions(conn, decisions)
+                if trades:
+                    conn.executemany(self._INSERT_TRADE, trades)
+        except Exception:
+            self._open_runs.clear()  # transação desfeita: recarrega do banco
+            raise
+    
+    @staticmethod
+    def encode_cursor(*key: Any) -> str:
+        """Cursor opaco com a chave de ordenação (horário, id[, seq]) do último registro de uma página"""
+        return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+    
+    @staticmethod
+    def decode_cursor(cursor: str, parts: int = 2) -> List[Any]:
+        """Decodifica um cursor de encode_cursor com parts partes (ValueError se inválido)"""
+        try:
+            key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except Exception:
+            raise ValueError("Cursor inválido")
+        if not isinstance(key, list) or len(key) != parts:
+            raise ValueError("Cursor inválido")
+        return key
+    
+    @staticmethod
+    def _fetch_dicts(conn: sqlite3.Connection, query: str, params: List[Any]) -> List[Dict]:
+        """Executa a consulta e devolve as linhas como dicts"""
+        # Tuplas simples (sem sqlite3.Row): dict(zip(...)) é bem mais barato por linha
+        result = conn.cursor()
+        result.row_factory = None
+        rows = result.execute(query, params).fetchall()
+        names = [column[0] for column in result.description]
+        return [dict(zip(names, row)) for row in rows]
+    
+    def _page(self, name: str, table: str, time_column: str, id_column: str,
+              limit: int, symbol: Optional[str], cursor: Optional[str],
+              filters: Optional[List[Tuple[str, str, float]]] = None) -> Dict:
+        """
+        Página por keyset (mais recentes primeiro): custo independe da profundidade
+        
+        Se o banco principal não completa a página, a mesma consulta segue
+        pelas partições arquivadas, do mês mais recente ao mais antigo,
+        até completar; partições mais antigas que a página não são abertas.
+        
+        Returns:
+            Dict com items e next_cursor (None na última página)
+        """
+        conditions = []
+        params: List[Any] = []
+        if symbol:
+            conditions.append("symbol = ?")
+            params.append(symbol)
+        after = None
+        if cursor:
+            after = self.decode_cursor(cursor)
+            conditions.append(f"({time_column}, {id_column}) < (?, ?)")
+            params.extend(after)
+        # Colunas e operadores já validados por parse_indicator_filters
+        for column, operator, value in filters or []:
+            conditions.append(f"{column} {operator} ?")
+            params.append(value)
+        
+        query = f"SELECT * FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {time_column} DESC, {id_column} DESC LIMIT ?"
+        params.append(limit + 1)
+        
+        with self.connections.reader(name) as conn:
+            rows = self._fetch_dicts(conn, query, params)
+        
+        # Tudo numa partição é do mês dela: meses posteriores ao cursor não são
+        # abertos, e a busca para quando a página já é mais nova que o mês
+        for month in self.archive.months(after[0] if after else None):
+            if len(rows) > limit and rows[limit][time_column][:7] > month:
+                break
+            with self.archive.reader(month) as conn:
+                if not self.archive.has_table(conn, table):
+                    continue
+                rows.extend(self._fetch_dicts(conn, query, params))
+            # Linha arquivada ainda não removida do banco principal aparece uma vez
+            unique = {row[id_column]: row for row in rows}
+            rows = sorted(unique.values(), key=lambda row: (row[time_column], row[id_column]), reverse=True)[:limit + 1]
+        
+        items = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit and items:
+            next_cursor = self.encode_cursor(items[-1][time_column], items[-1][id_column])
+        return {"items": items, "next_cursor": next_cursor}
+    
+    def get_trades_page(self, limit: int = 50, symbol: Optional[str] = None, cursor: Optional[str] = None) -> Dict:
+        """Página de trades por open_time decrescente (cursor = next_cursor da página anterior)"""
+        return self._page("get_trades", "trades", "open_time", "id", limit, symbol, cursor)
+    
     def get_trades(self, limit: int = 50, symbol: Optional[str] = None) -> List[Dict]:
         """Obtém trades"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        return self.get_trades_page(limit, symbol)["items"]
+    
+    @staticmethod
+    def _decision_key(decision: Dict) -> tuple:
+        """Chave de ordenação de uma decisão expandida"""
+        return decision["timestamp"], decision["id"], decision["seq"]
+    
+    def _decision_rows(self, conn: sqlite3.Connection, symbol: Optional[str], after: Optional[tuple],
+                       filters: List[Tuple[str, str, float]], n: int, repeats: bool = True) -> List[Dict]:
+        """
+        As n decisões mais recentes antes do cursor, com as sequências expandidas
         
-        query = "SELECT * FROM trades"
-        params = []
+        Percorre as sequências abertas e depois as fechadas por last_seen
+        decrescente, lendo as repetições de cada uma pela chave primária;
+        para quando a n-ésima decisão já é mais nova que o last_seen da
+        próxima sequência. Com cursor, só sequências iniciadas até ele e
+        terminadas até RUN_MAX_SPAN depois dele podem ter decisões na página.
         
+        Args:
+            after: Chave (timestamp, id, seq) do cursor
+            repeats: False se o banco não tem ai_decision_repeats (partição antiga)
+        """
+        conditions = []
+        params: List[Any] = []
         if symbol:
-            query += " WHERE symbol = ?"
+            conditions.append("symbol = ?")
             params.append(symbol)
+        bound = None
+        if after:
+            conditions.append("timestamp <= ?")
+            params.append(after[0])
+            bound = self._shift_time(after[0], RUN_MAX_SPAN)
+        where = "".join(f" AND {condition}" for condition in conditions)
         
-        query += " ORDER BY open_time DESC LIMIT ?"
-        params.append(limit)
+        # Colunas e operadores já validados por parse_indicator_filters
+        repeat_query = "SELECT seq, timestamp, confidence, indicators, " + ", ".join(INDICATOR_COLUMNS)
+        repeat_query += " FROM ai_decision_repeats WHERE run_id = ?"
+        repeat_params: List[Any] = []
+        if after:
+            repeat_query += " AND (timestamp, run_id, seq) < (?, ?, ?)"
+            repeat_params.extend(after)
+        for column, op, value in filters:
+            repeat_query += f" AND {column} {op} ?"
+            repeat_params.append(value)
+        repeat_query += " ORDER BY seq DESC LIMIT ?"
+        repeat_params.append(n)
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        rows: List[Dict] = []
         
-        trades = []
-        for row in rows:
-            trades.append(dict(row))
+        def expand(run: Dict):
+            last_seen, count = run.pop("last_seen"), run.pop("count")
+            run["seq"] = 0
+            if (after is None or self._decision_key(run) < after) and self._matches(run, filters):
+                rows.append(run)
+            if repeats and (last_seen is None or count > 1):
+                for repeat in self._fetch_dicts(conn, repeat_query, [run["id"]] + repeat_params):
+                    rows.append({**run, **repeat})
+            rows.sort(key=self._decision_key, reverse=True)
+            del rows[n:]
+        
+        for run in self._fetch_dicts(conn, f"SELECT * FROM ai_decisions WHERE last_seen IS NULL{where}", params):
+            expand(run)
+        
+        query = f"SELECT * FROM ai_decisions WHERE last_seen IS NOT NULL{where}"
+        if bound:
+            query += " AND last_seen <= ?"
+        query += " ORDER BY last_seen DESC, timestamp DESC, id DESC"
+        result = conn.cursor()
+        result.row_factory = None
+        result.execute(query, params + ([bound] if bound else []))
+        names = [column[0] for column in result.description]
+        while True:
+            batch = result.fetchmany(64)
+            if not batch:
+                break
+            for values in batch:
+                run = dict(zip(names, values))
+                if len(rows) >= n and rows[n - 1]["timestamp"] > run["last_seen"]:
+                    return rows
+                expand(run)
+        return rows
+    
+    def get_ai_decisions_page(
+        self,
+        limit: int = 100,
+        symbol: Optional[str] = None,
+        cursor: Optional[str] = None,
+        filters: Optional[List[str]] = None,
+        indicators: bool = True
+    ) -> Dict:
+        """
+        Página de decisões da IA por timestamp decrescente
+        
+        Sequências são expandidas: cada decisão é um item com o próprio
+        horário, confiança e indicadores; id é o da sequência e seq a
+        posição na sequência (0 = primeira).
+        
+        Args:
+            cursor: next_cursor da página anterior
+            filters: Filtros de indicador, avaliados em cada decisão, ex: ["rsi<30"]
+            indicators: False para não montar o dict de indicadores
+        """
+        parsed = self.parse_indicator_filters(filters)
+        after = None
+        if cursor:
+            after = tuple(self.decode_cursor(cursor, 3))
+            if not (isinstance(after[0], str) and isinstance(after[1], int) and isinstance(after[2], int)):
+                raise ValueError("Cursor inválido")
+        
+        n = limit + 1
+        with self.connections.reader("get_ai_decisions") as conn:
+            rows = self._decision_rows(conn, symbol, after, parsed, n)
         
-        conn.close()
-        return trades
+        # Sequências ficam na partição do mês de last_seen (até RUN_MAX_SPAN
+        # depois da primeira decisão): meses posteriores a isso não têm decisões
+        # antes do cursor, e nenhuma decisão de uma partição supera o fim do mês
+        newest = self._shift_time(after[0], RUN_MAX_SPAN) if after else None
+        for month in self.archive.months(newest):
+            if len(rows) >= n and rows[n - 1]["timestamp"][:7] > month:
+                break
+            with self.archive.reader(month) as conn:
+                if not self.archive.has_table(conn, "ai_decisions"):
+                    continue
+                repeats = self.archive.has_table(conn, "ai_decision_repeats")
+                rows.extend(self._decision_rows(conn, symbol, after, parsed, n, repeats))
+            # Sequência arquivada ainda não removida do banco principal aparece uma vez
+            unique = {self._decision_key(row): row for row in rows}
+            rows = sorted(unique.values(), key=self._decision_key, reverse=True)[:n]
+        
+        items = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit and items:
+            next_cursor = self.encode_cursor(*self._decision_key(items[-1]))
+        for decision in items:
+            values = {column: decision.pop(column) for column in INDICATOR_COLUMNS}
+            extra = decision.pop("indicators")
+            if indicators:
+                # JSON só é lido para chaves fora das colunas (raro)
+                decision["indicators"] = {key: value for key, value in values.items() if value is not None}
+                if extra:
+                    decision["indicators"].update(json.loads(extra))
+        return {"items": items, "next_cursor": next_cursor}
     
     def get_ai_decisions(self, limit: int = 100) -> List[Dict]:
         """Obtém decisões da IA"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM ai_decisions 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        """, (limit,))
-        
-        rows = cursor.fetchall()
-        decisions = []
-        for row in rows:
-            decision = dict(row)
-            # Parse indicators JSON
-            if decision.get("indicators"):
-                decision["indicators"] = json.loads(decision["indicators"])
-            decisions.append(decision)
-        
-        conn.close()
-        return decisions
+        return self.get_ai_decisions_page(limit)["items"]
     
     def save_config(self, key: str, value: str):
         """Salva configuração"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO config (key, value, updated_at)
-            VALUES (?, ?, ?)
-        """, (key, value, datetime.now().isoformat()))
-        
-        conn.commit()
-        conn.close()
+        with self.connections.writer("save_config") as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO config (key, value, updated_at)
+                VALUES (?, ?, ?)
+            """, (key, value, datetime.now().isoformat()))
     
     def get_config(self, key: str) -> Optional[str]:
         """Obtém configuração"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT value FROM config WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        
-        conn.close()
+        with self.connections.reader("get_config") as conn:
+            row = conn.execute("SELECT value FROM config WHERE key = ?", (key,)).fetchone()
         return row[0] if row else None
-
+    
+    def get_query_stats(self) -> Dict[str, Dict]:
+        """Retorna tempos por consulta do gerenciador de conexões"""
+        return self.connections.get_stats()
+    
+    def close(self):
+        """Fecha as conexões do banco"""
+        self.connections.close()
@@ -0,0 +1,269 @@
+"""
+Retenção - Arquivamento mensal e VACUUM incremental
+Mantém o banco principal pequeno (cabe no cache de páginas): decisões e
+trades fechados mais antigos que a janela de retenção vão para as
+partições mensais e o espaço liberado é devolvido ao disco aos poucos
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from storage.database import Database
+
+# (tabela, coluna de tempo, condição extra de arquivamento, tabelas filhas);
+# filha = (tabela, coluna com o id da linha mãe): vai para a partição da mãe
+ARCHIVED_TABLES = (
+    # Só sequências fechadas (last_seen preenchido), junto com as repetições
+    ("ai_decisions", "last_seen", None, (("ai_decision_repeats", "run_id"),)),
+    # Trades abertos ficam no banco principal, qualquer que seja a idade
+    # (BotService._sync_closed_trades marca os fechados pelo histórico do MT5)
+    ("trades", "open_time", "status != 'OPEN'", ()),
+)
+
+# Linhas mãe por consulta/remoção das tabelas filhas (limite de parâmetros do SQLite)
+_PARENT_CHUNK = 500
+
+class RetentionManager:
+    """
+    Move linhas antigas do Database para o ArchiveStore em segundo plano
+
+    - Lotes pequenos: cada lote é copiado para a partição do mês e depois
+      removido do banco principal numa transação curta de escrita; entre
+      lotes a thread pausa, então a fila de gravação do bot não espera
+      mais que um lote
+    - Copiar antes de remover torna a operação segura contra quedas: um
+      lote repetido é ignorado pela chave primária da partição; as linhas
+      filhas (repetições de uma sequência) saem antes da linha mãe
+    - Depois do arquivamento, PRAGMA incremental_vacuum em passos de
+      vacuum_pages páginas devolve o espaço livre ao disco (bancos criados
+      antes do auto_vacuum incremental: depois de convertidos por compact_db.py)
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        keep_days: int = 30,
+        interval: float = 6 * 3600,
+        first_run_delay: float = 300.0,
+        batch: int = 5000,
+        vacuum_pages: int = 1024,
+        pause: float = 0.05
+    ):
+        self.database = database
+        self.keep_days = keep_days
+        self.interval = interval
+        self.first_run_delay = first_run_delay
+        self.batch = max(1, batch)
+        self.vacuum_pages = max(1, vacuum_pages)
+        self.pause = pause
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._vacuum_hint = False
+        self._stats = {
+            "runs": 0, "archived": {}, "vacuumed_pages": 0, "errors": 0,
+            "last_run": None, "last_run_ms": 0.0, "last_error": None
+        }
+
+    def start(self):
+        """Inicia a thread de retenção (primeira execução após first_run_delay)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._worker, daemon=True, name="RetentionManager")
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        """Interrompe a thread (o lote em andamento termina antes)"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _worker(self):
+        delay = self.first_run_delay
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Erro na retenção: {e}")
+                with self._lock:
+                    self._stats["errors"] += 1
+                    self._stats["last_error"] = str(e)
+
+    def cutoff(self, now: Optional[datetime] = None) -> str:
+        """Data de corte (YYYY-MM-DD): linhas anteriores a ela são arquivadas"""
+        return ((now or datetime.now()) - timedelta(days=self.keep_days)).strftime("%Y-%m-%d")
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict:
+        """
+        Arquiva tudo que passou da janela de retenção e compacta o banco
+
+        Returns:
+            Dict com linhas arquivadas por tabela e páginas devolvidas ao disco
+        """
+        start = time.perf_counter()
+        cutoff = self.cutoff(now)
+        # Sequências paradas antes do corte (bot desligado) fecham para poder sair
+        self.database.close_stale_runs(cutoff)
+        archived: Dict[str, int] = {}
+        for table, time_column, condition, children in ARCHIVED_TABLES:
+            archived.update(self._archive_table(table, time_column, condition, children, cutoff))
+        vacuumed = self.vacuum()
+
+        with self._lock:
+            self._stats["runs"] += 1
+            for table, count in archived.items():
+                self._stats["archived"][table] = self._stats["archived"].get(table, 0) + count
+            self._stats["vacuumed_pages"] += vacuumed
+            self._stats["last_run"] = datetime.now().isoformat()
+            self._stats["last_run_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return {"cutoff": cutoff, "archived": archived, "vacuumed_pages": vacuumed}
+
+    def _layout(self, table: str) -> Tuple[List[str], List[Dict]]:
+        """(CREATE TABLE/INDEX, colunas) da tabela no banco principal"""
+        with self.database.connections.reader("retention_schema") as conn:
+            schema = [row[0] for row in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL ORDER BY type DESC", (table,)
+            )]
+            columns = [{"name": row[1], "type": row[2]} for row in conn.execute(f"PRAGMA table_info({table})")]
+        return schema, columns
+
+    def _archive_table(self, table: str, time_column: str, condition: Optional[str],
+                       children: Sequence[Tuple[str, str]], cutoff: str) -> Dict[str, int]:
+        """Copia e remove lotes de linhas antigas (e suas filhas) até acabar (ou stop)"""
+        schema, columns = self._layout(table)
+        child_layouts = {child: self._layout(child) for child, _ in children}
+        id_index = [column["name"] for column in columns].index("id")
+        time_index = [column["name"] for column in columns].index(time_column)
+
+        # Usa o índice da coluna de tempo; a condição extra só descarta linhas
+        query = f"SELECT * FROM {table} WHERE {time_column} < ?"
+        if condition:
+            query += f" AND {condition}"
+        query += f" ORDER BY {time_column}, id LIMIT ?"
+        totals = {table: 0, **{child: 0 for child, _ in children}}
+        while not self._stop.is_set():
+            with self.database.connections.reader("retention_select") as conn:
+                result = conn.cursor()
+                result.row_factory = None
+                rows = result.execute(query, (cutoff, self.batch)).fetchall()
+            if not rows:
+                break
+
+            months: Dict[str, List[tuple]] = {}
+            for row in rows:
+                months.setdefault(str(row[time_index])[:7], []).append(row)
+            for month, month_rows in months.items():
+                self.database.archive.append(month, table, schema, columns, month_rows)
+
+            parents = {row[id_index]: str(row[time_index])[:7] for row in rows}
+            for child, parent_column in children:
+                totals[child] += self._archive_children(child, parent_column, child_layouts[child], parents)
+
+            with self.database.connections.writer("retention_delete") as conn:
+                conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(row[id_index],) for row in rows])
+            totals[table] += len(rows)
+            self._stop.wait(self.pause)
+
+        for name, total in totals.items():
+            if total:
+                print(f"📦 {total} linhas de {name} anteriores a {cutoff} arquivadas")
+        return totals
+
+    def _archive_children(self, table: str, parent_column: str,
+                          layout: Tuple[List[str], List[Dict]], parents: Dict[Any, str]) -> int:
+        """Copia as linhas filhas para a partição da linha mãe e as remove do banco principal"""
+        schema, columns = layout
+        parent_index = [column["name"] for column in columns].index(parent_column)
+        ids = list(parents)
+        total = 0
+        for start in range(0, len(ids), _PARENT_CHUNK):
+            chunk = ids[start:start + _PARENT_CHUNK]
+            with self.database.connections.reader("retention_select") as conn:
+                result = conn.cursor()
+                result.row_factory = None
+                rows = result.execute(
+                    f"SELECT * FROM {table} WHERE {parent_column} IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            if not rows:
+                continue
+
+            months: Dict[str, List[tuple]] = {}
+            for row in rows:
+                months.setdefault(parents[row[parent_index]], []).append(row)
+            for month, month_rows in months.items():
+                self.database.archive.append(month, table, schema, columns, month_rows)
+
+            with self.database.connections.writer("retention_delete") as conn:
+                conn.executemany(f"DELETE FROM {table} WHERE {parent_column} = ?", [(row_id,) for row_id in chunk])
+            total += len(rows)
+            self._stop.wait(self.pause)
+        return total
+
+    def vacuum(self, convert: bool = False) -> int:
+        """
+        Devolve páginas livres ao disco sem bloquear o escritor por muito tempo
+
+        Bancos criados antes do auto_vacuum incremental precisam de um VACUUM
+        completo, que segura o escritor pelo tempo de reescrever o banco
+        inteiro: só roda com convert=True (compact_db.py), nunca na execução
+        agendada, que apenas avisa.
+
+        Args:
+            convert: Converter o banco para auto_vacuum incremental se preciso
+
+        Returns:
+            Páginas liberadas
+        """
+        connections = self.database.connections
+        with connections.reader("retention_vacuum_mode") as conn:
+            mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        converted = False
+        if mode != 2:
+            if not convert:
+                if not self._vacuum_hint:
+                    self._vacuum_hint = True
+                    print("⚠️ Banco sem auto_vacuum incremental: espaço arquivado não volta ao disco "
+                          "(rode python compact_db.py com o bot parado)")
+                return 0
+            print("🧹 Convertendo banco para auto_vacuum incremental (VACUUM completo, gravações aguardam)...")
+            start = time.perf_counter()
+            with connections.writer("retention_vacuum_convert") as conn:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+            converted = True
+            print(f"✅ Banco convertido para auto_vacuum incremental em {time.perf_counter() - start:.1f}s")
+        with connections.reader("retention_vacuum_free") as conn:
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+        released = 0
+        while free > 0 and not self._stop.is_set():
+            with connections.writer("retention_vacuum") as conn:
+                # fetchall executa o pragma até o fim (cada passo libera uma página)
+                conn.execute(f"PRAGMA incremental_vacuum({self.vacuum_pages})").fetchall()
+                remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            released += free - remaining
+            free = remaining
+            self._stop.wait(self.pause)
+
+        if released or converted:
+            # Leva as páginas do WAL para o arquivo principal e o trunca
+            with connections.writer("retention_checkpoint") as conn:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return released
+
+    def get_stats(self) -> Dict:
+        """Configuração, totais arquivados e partições"""
+        with self._lock:
+            stats = {**self._stats, "archived": dict(self._stats["archived"])}
+        return {
+            **stats,
+            "keep_days": self.keep_days,
+            "interval": self.interval,
+            "running": bool(self._thread and self._thread.is_alive()),
+            "archive": self.database.archive.get_stats()
+        }
@@ -0,0 +1,233 @@
+"""
+Fila Write-Behind - Gravação assíncrona em lote
+Bufferiza decisões da IA e trades e grava em uma única transação
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from storage.database import Database
+
+# Erros causados pela própria linha (constraint, tipo, valor): repetir não adianta.
+# OperationalError (banco travado, disco, I/O) é falha do banco e é repetido.
+ROW_ERRORS = (
+    sqlite3.IntegrityError,
+    sqlite3.InterfaceError,
+    sqlite3.DataError,
+    ValueError,
+    TypeError,
+    OverflowError
+)
+
+class WriteBehindQueue:
+    """
+    Estágio de escrita assíncrona na frente do Database
+
+    - enqueue_* apenas copia a linha para o buffer (microssegundos)
+    - Uma thread grava o buffer com executemany quando atinge
+      max_batch itens ou após flush_interval segundos
+    - flush() bloqueia até tudo que foi enfileirado estar gravado
+    - Um lote rejeitado por uma linha inválida (ROW_ERRORS), ou que falha
+      max_retries vezes seguidas, é gravado linha a linha: as linhas que
+      falham sozinhas são descartadas e registradas, para não travar as
+      gravações seguintes
+    - OperationalError (banco travado, disco, I/O) nunca descarta linhas:
+      o lote volta para a fila e é repetido
+    - Cada buffer guarda no máximo max_pending linhas; acima disso as mais
+      antigas são descartadas (banco indisponível por muito tempo)
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        max_batch: int = 100,
+        flush_interval: float = 1.0,
+        max_retries: int = 3,
+        max_pending: int = 50000
+    ):
+        self.database = database
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.max_retries = max(1, max_retries)
+        self.max_pending = max(self.max_batch, max_pending)
+
+        self._decisions: List[Tuple] = []
+        self._trades: List[Tuple] = []
+        self._cond = threading.Condition()
+        self._enqueued = 0
+        self._written = 0
+        self._flush_requested = False
+        self._running = True
+        self._failures = 0
+
+        self._stats = {
+            "batches": 0, "rows": 0, "errors": 0, "last_batch_ms": 0.0,
+            "dropped_invalid": 0, "dropped_overflow": 0
+        }
+
+        self._thread = threading.Thread(target=self._worker, daemon=True, name="WriteBehindQueue")
+        self._thread.start()
+
+    def enqueue_decision(self, decision: Dict, symbol: str, timeframe: str):
+        """Enfileira decisão da IA para gravação"""
+        row = Database.decision_row(decision, symbol, timeframe)
+        self._enqueue(self._decisions, row)
+
+    def enqueue_trade(self, trade: Dict):
+        """Enfileira trade para gravação"""
+        row = Database.trade_row(trade)
+        self._enqueue(self._trades, row)
+
+    def _enqueue(self, buffer: List[Tuple], row: Tuple):
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("WriteBehindQueue já foi fechada")
+            buffer.append(row)
+            self._enqueued += 1
+            self._trim(buffer)
+            if self._pending() >= self.max_batch:
+                self._cond.notify()
+
+    def _trim(self, buffer: List[Tuple]):
+        """Descarta as linhas mais antigas acima de max_pending (com o lock)"""
+        overflow = len(buffer) - self.max_pending
+        if overflow > 0:
+            del buffer[:overflow]
+            # Descartadas contam como processadas para flush() não esperar por elas
+            self._written += overflow
+            before = self._stats["dropped_overflow"]
+            self._stats["dropped_overflow"] += overflow
+            self._cond.notify_all()
+            # Aviso na primeira perda e a cada 1000 linhas, sem inundar o log
+            if before == 0 or before // 1000 != self._stats["dropped_overflow"] // 1000:
+                print(f"⚠️ Fila de gravação cheia: {self._stats['dropped_overflow']} linhas antigas descartadas até agora")
+
+    def _pending(self) -> int:
+        return len(self._decisions) + len(self._trades)
+
+    def pending(self) -> int:
+        """Quantidade de linhas aguardando gravação"""
+        with self._cond:
+            return self._pending()
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """
+        Força a gravação de tudo que já foi enfileirado
+
+        Returns:
+            bool: True se tudo foi gravado dentro do timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._enqueued
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._written < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = 10.0) -> bool:
+        """Drena a fila e encerra a thread de gravação"""
+        drained = self.flush(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        return drained
+
+    def _worker(self):
+        """Thread de gravação em lote"""
+        while True:
+            with self._cond:
+                if self._running and not self._flush_requested and self._pending() < self.max_batch:
+                    self._cond.wait(self.flush_interval)
+                if not self._running and self._pending() == 0:
+                    return
+                self._flush_requested = False
+                decisions, self._decisions = self._decisions, []
+                trades, self._trades = self._trades, []
+
+            if not decisions and not trades:
+                continue
+
+            start = time.perf_counter()
+            invalid = 0
+            retry: Tuple[List[Tuple], List[Tuple]] = ([], [])
+            try:
+                self.database.save_batch(decisions, trades)
+                self._failures = 0
+            except Exception as e:
+                print(f"Erro ao gravar lote: {e}")
+                self._failures += 1
+                if isinstance(e, ROW_ERRORS) or self._failures >= self.max_retries:
+                    self._failures = 0
+                    invalid, retry = self._save_rows(decisions, trades)
+                else:
+                    retry = (decisions, trades)
+
+            retried = len(retry[0]) + len(retry[1])
+            done = len(decisions) + len(trades) - retried
+            with self._cond:
+                if done:
+                    self._written += done
+                    self._stats["batches"] += 1
+                    self._stats["rows"] += done - invalid
+                    self._stats["dropped_invalid"] += invalid
+                    self._stats["last_batch_ms"] = round((time.perf_counter() - start) * 1000, 3)
+                    self._cond.notify_all()
+                if retried:
+                    # Devolver ao início do buffer para nova tentativa
+                    self._decisions[:0] = retry[0]
+                    self._trades[:0] = retry[1]
+                    self._trim(self._decisions)
+                    self._trim(self._trades)
+                    self._stats["errors"] += 1
+                    if not self._running:
+                        return
+            if retried:
+                time.sleep(self.flush_interval)
+
+    def _save_rows(
+        self,
+        decisions: List[Tuple],
+        trades: List[Tuple]
+    ) -> Tuple[int, Tuple[List[Tuple], List[Tuple]]]:
+        """
+        Grava o lote linha a linha para isolar linhas inválidas
+
+        Uma linha que falha sozinha é descartada e registrada. Um
+        OperationalError é falha do banco, não da linha: a gravação para e
+        a linha atual e as seguintes voltam para a fila.
+
+        Returns:
+            (linhas descartadas, (decisões, trades) a gravar de novo)
+        """
+        invalid = 0
+        rows = [(row, True) for row in decisions] + [(row, False) for row in trades]
+        for index, (row, is_decision) in enumerate(rows):
+            try:
+                if is_decision:
+                    self.database.save_batch([row], [])
+                else:
+                    self.database.save_batch([], [row])
+            except sqlite3.OperationalError as e:
+                print(f"Erro ao gravar linha, lote volta para a fila: {e}")
+                rest = rows[index:]
+                return invalid, (
+                    [r for r, d in rest if d],
+                    [r for r, d in rest if not d]
+                )
+            except Exception as e:
+                invalid += 1
+                print(f"Linha descartada na gravação ({e}): {row}")
+        return invalid, ([], [])
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas da fila"""
+        with self._cond:
+            return {**self._stats, "pending": self._pending()}